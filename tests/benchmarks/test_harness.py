@@ -0,0 +1,115 @@
+"""Micro-benchmarks of the harness's own hot paths.
+
+Run with ``pytest -m benchmark`` (see ``utils.plugins.bench``); they are
+deselected from every other run.
+"""
+
+import json
+from itertools import cycle, islice
+
+import jsonschema
+import pytest
+import requests
+import responses
+
+from tests.conftest import MOCK_BASE_URL, build_fake_store
+from utils.datagen import CatalogGenerator
+from utils.router import MockRouter
+from utils.schemas import PRODUCT_SCHEMA
+from utils.validation import get_validator, validate_many, validate_product_data
+
+pytestmark = pytest.mark.benchmark
+
+PRODUCT_URL = f"{MOCK_BASE_URL}/products/1"
+
+
+def catalog(items):
+    """``items`` products, cycling over 1000 generated ones"""
+    return list(islice(cycle(CatalogGenerator(products=1000).products), items))
+
+
+def test_mock_session_setup(benchmark, specs):
+    """Build, mount and install the mocked API (once per session)"""
+
+    def setup():
+        router = build_fake_store(specs.specs).mount(MockRouter(MOCK_BASE_URL))
+        router.install(responses.RequestsMock(assert_all_requests_are_fired=False))
+
+    benchmark(setup)
+
+
+def test_mock_api_responses_setup(
+    benchmark, mock_only, mock_router, fake_store, responses_mock
+):
+    """The per-test work of the autouse ``mock_api_responses`` fixture"""
+
+    def setup():
+        responses_mock.calls.reset()
+        with mock_router.overlay(), fake_store.overlay():
+            pass
+
+    benchmark(setup)
+
+
+@pytest.mark.parametrize("through", ["router", "responses", "client"])
+def test_request_dispatch(
+    benchmark, mock_only, mock_router, responses_mock, api_client, through
+):
+    """GET /products/1 served by the router alone, through ``responses`` with
+    a bare ``requests`` session, and through the session's shared client"""
+    if through == "router":
+        benchmark(lambda: mock_router.dispatch("GET", PRODUCT_URL))
+    elif through == "responses":
+        with requests.Session() as session:
+            benchmark(lambda: session.get(PRODUCT_URL))
+    else:
+        benchmark(lambda: api_client.get_product(1))
+    responses_mock.calls.reset()
+
+
+@pytest.mark.parametrize("items", [20, 1_000, 100_000])
+def test_response_json_decoding(benchmark, items):
+    """``response.json()`` of a product list"""
+    response = requests.Response()
+    response.status_code = 200
+    response.headers["Content-Type"] = "application/json"
+    response.encoding = "utf-8"
+    response._content = json.dumps(catalog(items)).encode()
+    benchmark(response.json)
+
+
+VALIDATORS = {
+    "jsonschema.validate": lambda product: jsonschema.validate(
+        product, PRODUCT_SCHEMA
+    ),
+    "cached_validator": lambda product: get_validator(PRODUCT_SCHEMA).validate(
+        product
+    ),
+    "validate_product_data": validate_product_data,
+}
+
+
+@pytest.mark.parametrize("validator", list(VALIDATORS))
+def test_product_validation(benchmark, validator):
+    """One product through ``jsonschema`` and through the compiled checks"""
+    product = catalog(1)[0]
+    check = VALIDATORS[validator]
+    benchmark(lambda: check(product))
+
+
+@pytest.mark.parametrize(
+    "method, items",
+    [
+        *(("validate_many", items) for items in (10, 1_000, 100_000, 1_000_000)),
+        # jsonschema is ~20x slower per item; larger lists only take longer
+        *(("jsonschema", items) for items in (10, 1_000)),
+    ],
+)
+def test_list_validation(benchmark, method, items):
+    """A whole list response checked at once"""
+    products = catalog(items)
+    if method == "validate_many":
+        benchmark(lambda: validate_many(products, PRODUCT_SCHEMA))
+    else:
+        validator = get_validator(PRODUCT_SCHEMA)
+        benchmark(lambda: [validator.validate(product) for product in products])
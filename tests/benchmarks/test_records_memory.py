@@ -0,0 +1,39 @@
+"""Memory of the catalog as plain dicts versus ``utils.records`` records.
+
+Builds the same synthetic products, carts and users both ways under
+tracemalloc and times building one record. The cost scaled to one million
+rows is kept with the measurement as ``dict_mb_per_1m`` and
+``record_mb_per_1m`` (written by ``--bench-json``).
+"""
+
+import pytest
+
+from utils.bench import retained_bytes
+from utils.datagen import CatalogGenerator
+from utils.records import RECORD_TYPES
+
+pytestmark = pytest.mark.benchmark
+
+COUNT = 20_000
+
+
+@pytest.fixture(scope="module")
+def generator():
+    return CatalogGenerator(seed=0, products=COUNT, users=COUNT, carts=COUNT)
+
+
+@pytest.mark.parametrize("resource", RECORD_TYPES)
+def test_record_memory(benchmark, generator, resource):
+    """Retained memory of ``COUNT`` rows as dicts and as records"""
+    rows = getattr(generator, resource)
+    record_type = RECORD_TYPES[resource]
+    dict_bytes, dicts = retained_bytes(lambda: list(rows))
+    record_bytes, _ = retained_bytes(lambda: [record_type.from_json(d) for d in dicts])
+    assert record_bytes < dict_bytes
+
+    scale = 1_000_000 / COUNT / 2**20
+    info = {
+        "dict_mb_per_1m": round(dict_bytes * scale),
+        "record_mb_per_1m": round(record_bytes * scale),
+    }
+    benchmark(lambda: record_type.from_json(dicts[0]), info=info)
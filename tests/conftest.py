@@ -1,7 +1,45 @@
-import jsonschema
+import asyncio
+import os
+import threading
+from http.server import ThreadingHTTPServer
+
 import pytest
 import responses
 
+from utils.aclient import AsyncFakeStoreClient, RecordingTransport, router_transport
+from utils.cassette import Cassette, CassetteWriter
+from utils.client import FakeStoreClient
+from utils.datagen import CatalogGenerator
+from utils.fakestore import FakeStore
+from utils.integrity import fetch_integrity
+from utils.parallel import distributed, is_worker, worker_id
+from utils.retry import RetryBudget, RetryPolicy
+from utils.router import MockRouter
+from utils.schemas import CART_SCHEMA, PRODUCT_SCHEMA, USER_SCHEMA  # noqa: F401
+from utils.specs import seed_rows
+from utils.standin import NAMESPACE_HEADER, StandInServer, namespace_url
+from utils.validation import (  # noqa: F401
+    validate_cart_data,
+    validate_product_data,
+    validate_user_data,
+)
+
+pytest_plugins = [
+    "utils.plugins.parallel",
+    "utils.plugins.load",
+    "utils.plugins.timing",
+    "utils.plugins.budgets",
+    "utils.plugins.reports",
+    "utils.plugins.cache",
+    "utils.plugins.faults",
+    "utils.plugins.ratelimit",
+    "utils.plugins.memprofile",
+    "utils.plugins.cpuprofile",
+    "utils.plugins.bench",
+    "utils.plugins.impact",
+    "utils.plugins.specs",
+]
+
 # Mock data for testing
 MOCK_PRODUCTS = [
     {
@@ -43,278 +81,296 @@ MOCK_USERS = [
     }
 ]
 
-# JSON Schemas for API response validation
-PRODUCT_SCHEMA = {
-    "type": "object",
-    "properties": {
-        "id": {"type": "integer"},
-        "title": {"type": "string"},
-        "price": {"type": "number"},
-        "category": {"type": "string"},
-        "image": {"type": "string"},
-        "description": {"type": "string"},
-    },
-    "required": ["id", "title", "price", "category", "image"],
-}
-
-CART_SCHEMA = {
-    "type": "object",
-    "properties": {
-        "id": {"type": "integer"},
-        "userId": {"type": "integer"},
-        "date": {"type": "string"},
-        "products": {
-            "type": "array",
-            "items": {
-                "type": "object",
-                "properties": {
-                    "productId": {"type": "integer"},
-                    "quantity": {"type": "integer"},
-                },
-                "required": ["productId", "quantity"],
-            },
-        },
-    },
-    "required": ["id", "userId", "date", "products"],
-}
-
-USER_SCHEMA = {
-    "type": "object",
-    "properties": {
-        "id": {"type": "integer"},
-        "email": {"type": "string"},
-        "username": {"type": "string"},
-        "password": {"type": "string"},
-        "name": {
-            "type": "object",
-            "properties": {
-                "firstname": {"type": "string"},
-                "lastname": {"type": "string"},
-            },
-            "required": ["firstname", "lastname"],
-        },
-        "address": {"type": "object"},
-        "phone": {"type": "string"},
-    },
-    "required": ["id", "email", "username", "password", "name", "phone"],
-}
+MOCK_BASE_URL = "https://mock-api.com"
 
+# The stand-in server shared by all workers of a --shared-backend run
+STAND_IN = pytest.StashKey()
 
-@pytest.fixture
-def base_url():
+
+def build_fake_store(specs):
+    """Seed the in-memory FakeStore from the mock datasets, padded per spec"""
+    return FakeStore(
+        products=seed_rows(specs["products"], MOCK_PRODUCTS),
+        carts=seed_rows(specs["carts"], MOCK_CARTS),
+        users=seed_rows(specs["users"], MOCK_USERS),
+    )
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--base-url",
+        default=os.environ.get("FAKESTORE_BASE_URL", MOCK_BASE_URL),
+        help="FakeStore API to test; anything but the mock URL disables mocking",
+    )
+    parser.addoption(
+        "--retry-budget",
+        type=int,
+        default=10,
+        help="transient-failure retries allowed per session, plus 10%% of requests",
+    )
+    parser.addoption(
+        "--catalog-seed",
+        type=int,
+        default=0,
+        help="seed of the synthetic catalog used by large-scale tests",
+    )
+    parser.addoption(
+        "--record-cassette",
+        metavar="PATH",
+        help="record every response from --base-url to a cassette file",
+    )
+    parser.addoption(
+        "--replay-cassette",
+        metavar="PATH",
+        help="serve responses from a recorded cassette instead of the network",
+    )
+    parser.addoption(
+        "--shared-backend",
+        action="store_true",
+        help="serve the mock over local HTTP, one backend for all -n workers",
+    )
+
+
+def pytest_configure(config):
+    if is_worker(config):
+        return
+    if config.getoption("--record-cassette") and distributed(config):
+        raise pytest.UsageError("--record-cassette writes one file; drop -n")
+    if config.getoption("--shared-backend"):
+        if config.getoption("--base-url").rstrip("/") != MOCK_BASE_URL:
+            raise pytest.UsageError("--shared-backend serves the mock, not --base-url")
+        specs = config.pluginmanager.get_plugin("fakestore-specs").catalog.specs
+        store = build_fake_store(specs)
+        router = store.mount(MockRouter(MOCK_BASE_URL))
+        config.stash[STAND_IN] = StandInServer(router, store).start()
+
+
+def pytest_unconfigure(config):
+    stand_in = config.stash.get(STAND_IN, None)
+    if stand_in is not None:
+        stand_in.stop()
+
+
+@pytest.hookimpl(optionalhook=True)
+def pytest_configure_node(node):
+    stand_in = node.config.stash.get(STAND_IN, None)
+    if stand_in is not None:
+        node.workerinput["stand_in_url"] = stand_in.url
+
+
+def stand_in_url(config):
+    """URL of the shared stand-in backend, or None"""
+    if is_worker(config):
+        return config.workerinput.get("stand_in_url")
+    stand_in = config.stash.get(STAND_IN, None)
+    return stand_in.url if stand_in is not None else None
+
+
+@pytest.fixture(scope="session")
+def cassette(request):
+    """Cassette replayed in place of the API, or None"""
+    path = request.config.getoption("--replay-cassette")
+    if path is None:
+        yield None
+        return
+    if request.config.getoption("--record-cassette"):
+        raise pytest.UsageError("--record-cassette and --replay-cassette conflict")
+    with Cassette(path) as replayed:
+        yield replayed
+
+
+@pytest.fixture(scope="session")
+def cassette_writer(request, base_url):
+    """Writer recording the session's responses, or None"""
+    path = request.config.getoption("--record-cassette")
+    if path is None:
+        yield None
+        return
+    with CassetteWriter(path, base_url) as writer:
+        yield writer
+
+
+@pytest.fixture(scope="session")
+def base_url(request, cassette):
     """Fixture providing the base URL for the API"""
-    return "https://mock-api.com"
+    if cassette is not None:
+        return cassette.base_url
+    shared = stand_in_url(request.config)
+    if shared is not None:
+        return shared
+    return request.config.getoption("--base-url").rstrip("/")
 
 
-@pytest.fixture(autouse=True)
-def mock_api_responses():
-    """Mock API responses for all tests"""
-    with responses.RequestsMock(assert_all_requests_are_fired=False) as rsps:
-        # Products endpoints
-        rsps.add(
-            responses.GET,
-            "https://mock-api.com/products",
-            json=MOCK_PRODUCTS,
-            status=200,
-        )
-        rsps.add(
-            responses.GET,
-            "https://mock-api.com/products/1",
-            json=MOCK_PRODUCTS[0],
-            status=200,
-        )
-        rsps.add(
-            responses.GET,
-            "https://mock-api.com/products/2",
-            json={**MOCK_PRODUCTS[0], "id": 2, "title": "Test Product 2"},
-            status=200,
-        )
-        rsps.add(
-            responses.GET,
-            "https://mock-api.com/products/3",
-            json={**MOCK_PRODUCTS[0], "id": 3, "title": "Test Product 3"},
-            status=200,
-        )
-        rsps.add(
-            responses.GET,
-            "https://mock-api.com/products/5",
-            json={**MOCK_PRODUCTS[0], "id": 5, "title": "Test Product 5"},
-            status=200,
-        )
-        rsps.add(
-            responses.GET,
-            "https://mock-api.com/products/10",
-            json={**MOCK_PRODUCTS[0], "id": 10, "title": "Test Product 10"},
-            status=200,
-        )
-        rsps.add(
-            responses.GET,
-            "https://mock-api.com/products/categories",
-            json=["electronics", "clothing"],
-            status=200,
-        )
-        rsps.add(
-            responses.GET,
-            "https://mock-api.com/products/category/electronics",
-            json=[MOCK_PRODUCTS[0]],
-            status=200,
-        )
-        rsps.add(
-            responses.GET,
-            "https://mock-api.com/products/category/jewelery",
-            json=[{**MOCK_PRODUCTS[0], "category": "jewelery"}],
-            status=200,
-        )
-        rsps.add(
-            responses.GET,
-            "https://mock-api.com/products/category/men's clothing",
-            json=[{**MOCK_PRODUCTS[0], "category": "men's clothing"}],
-            status=200,
-        )
-        rsps.add(
-            responses.GET,
-            "https://mock-api.com/products/category/women's clothing",
-            json=[{**MOCK_PRODUCTS[0], "category": "women's clothing"}],
-            status=200,
-        )
-        rsps.add(
-            responses.GET,
-            "https://mock-api.com/products/category/clothing",
-            json=[{**MOCK_PRODUCTS[0], "category": "clothing"}],
-            status=200,
-        )
-
-        # Carts endpoints
-        rsps.add(
-            responses.GET, "https://mock-api.com/carts", json=MOCK_CARTS, status=200
-        )
-        rsps.add(
-            responses.GET,
-            "https://mock-api.com/carts/1",
-            json=MOCK_CARTS[0],
-            status=200,
-        )
-        rsps.add(
-            responses.GET,
-            "https://mock-api.com/carts/2",
-            json={**MOCK_CARTS[0], "id": 2},
-            status=200,
-        )
-        rsps.add(
-            responses.GET,
-            "https://mock-api.com/carts/3",
-            json={**MOCK_CARTS[0], "id": 3},
-            status=200,
-        )
-        rsps.add(
-            responses.GET,
-            "https://mock-api.com/carts/5",
-            json={**MOCK_CARTS[0], "id": 5},
-            status=200,
-        )
-        rsps.add(
-            responses.POST,
-            "https://mock-api.com/carts",
-            json={
-                "id": 2,
-                "userId": 1,
-                "date": "2020-03-02",
-                "products": [
-                    {"productId": 1, "quantity": 1},
-                    {"productId": 2, "quantity": 2},
-                ],
-            },
-            status=201,
-        )
-        rsps.add(
-            responses.PUT,
-            "https://mock-api.com/carts/1",
-            json=MOCK_CARTS[0],
-            status=200,
-        )
-        rsps.add(responses.DELETE, "https://mock-api.com/carts/1", status=200)
-
-        # Users endpoints
-        rsps.add(
-            responses.GET, "https://mock-api.com/users", json=MOCK_USERS, status=200
-        )
-        rsps.add(
-            responses.GET,
-            "https://mock-api.com/users/1",
-            json=MOCK_USERS[0],
-            status=200,
-        )
-        rsps.add(
-            responses.GET,
-            "https://mock-api.com/users/2",
-            json={**MOCK_USERS[0], "id": 2, "username": "testuser2"},
-            status=200,
-        )
-        rsps.add(
-            responses.GET,
-            "https://mock-api.com/users/3",
-            json={**MOCK_USERS[0], "id": 3, "username": "testuser3"},
-            status=200,
-        )
-        rsps.add(
-            responses.GET,
-            "https://mock-api.com/users/5",
-            json={**MOCK_USERS[0], "id": 5, "username": "testuser5"},
-            status=200,
-        )
-        rsps.add(
-            responses.POST,
-            "https://mock-api.com/users",
-            json={"id": 2, **MOCK_USERS[0]},
-            status=201,
-        )
-        rsps.add(
-            responses.PUT,
-            "https://mock-api.com/users/1",
-            json={
-                "id": 1,
-                "email": "updated@example.com",
-                "username": "updateduser",
-                "password": "updatedpass",
-                "name": {"firstname": "Updated", "lastname": "User"},
-                "address": {
-                    "city": "Updated City",
-                    "street": "Updated Street",
-                    "number": 2,
-                    "zipcode": "54321",
-                    "geolocation": {"lat": "1", "long": "1"},
-                },
-                "phone": "987-654-3210",
-            },
-            status=200,
-        )
-        rsps.add(responses.DELETE, "https://mock-api.com/users/1", status=200)
-
-        # 404 for non-existent resources
-        rsps.add(
-            responses.GET, "https://mock-api.com/products/999", json={}, status=200
-        )
-        rsps.add(responses.GET, "https://mock-api.com/products/0", json={}, status=200)
-        rsps.add(responses.GET, "https://mock-api.com/products/-1", json={}, status=200)
-        rsps.add(
-            responses.GET, "https://mock-api.com/products/9999", json={}, status=200
-        )
-        rsps.add(responses.GET, "https://mock-api.com/carts/999", status=404)
-        rsps.add(responses.GET, "https://mock-api.com/users/999", status=404)
+@pytest.fixture(scope="session")
+def mocked(base_url, cassette):
+    """Whether requests are served by the in-process mock"""
+    return base_url == MOCK_BASE_URL and cassette is None
+
+
+@pytest.fixture
+def mock_only(mocked):
+    """Skip tests that exercise the in-process mock itself on live runs"""
+    if not mocked:
+        pytest.skip("requires the in-process mock")
 
+
+@pytest.fixture(scope="session")
+def backend_namespace(request):
+    """Namespace isolating this worker's writes on the shared backend, or None"""
+    if stand_in_url(request.config) is None:
+        return None
+    return worker_id(request.config)
+
+
+@pytest.fixture(scope="session")
+def api_client(
+    base_url, request, cassette_writer, http_cache, rate_limiter, backend_namespace
+):
+    """Keep-alive API client shared by the whole session"""
+    budget = RetryBudget(min_retries=request.config.getoption("--retry-budget"))
+    with FakeStoreClient(
+        base_url,
+        retry=RetryPolicy(budget=budget),
+        cache=http_cache,
+        limiter=rate_limiter,
+    ) as client:
+        if cassette_writer is not None:
+            client.add_listener(cassette_writer.on_request)
+        if backend_namespace is not None:
+            client.session.headers[NAMESPACE_HEADER] = backend_namespace
+        yield client
+
+
+@pytest.fixture(scope="session")
+def async_listeners():
+    """Request listeners shared by every ``run_async`` client of the session"""
+    return []
+
+
+@pytest.fixture
+def run_async(
+    base_url,
+    mocked,
+    mock_router,
+    cassette,
+    cassette_writer,
+    backend_namespace,
+    async_listeners,
+    rate_limiter,
+):
+    """Run ``fn(async_client, *args)`` to completion on a fresh event loop"""
+    headers = None
+    if backend_namespace is not None:
+        headers = {NAMESPACE_HEADER: backend_namespace}
+    transport = None
+    if mocked:
+        transport = router_transport(mock_router)
+    elif cassette is not None:
+        transport = router_transport(cassette)
+    if cassette_writer is not None:
+        transport = RecordingTransport(cassette_writer, transport)
+
+    def run(fn, *args):
+        async def main():
+            async with AsyncFakeStoreClient(
+                base_url,
+                transport=transport,
+                headers=headers,
+                listeners=async_listeners,
+                limiter=rate_limiter,
+            ) as client:
+                return await fn(client, *args)
+
+        return asyncio.run(main())
+
+    return run
+
+
+@pytest.fixture
+def integrity_report(api_client):
+    """Referential integrity of carts, fetched with one list request per resource"""
+    return fetch_integrity(api_client)
+
+
+@pytest.fixture(scope="session")
+def catalog(request):
+    """Lazy, seeded synthetic catalog at realistic scale"""
+    return CatalogGenerator(
+        seed=request.config.getoption("--catalog-seed"),
+        products=10_000_000,
+        users=1_000_000,
+        carts=5_000_000,
+    )
+
+
+@pytest.fixture(scope="session")
+def fake_store(specs):
+    """Stateful FakeStore backend shared by the whole session"""
+    return build_fake_store(specs.specs)
+
+
+@pytest.fixture(scope="session")
+def mock_router(fake_store):
+    """Routes for the mocked API, compiled once per session"""
+    return fake_store.mount(MockRouter(MOCK_BASE_URL))
+
+
+@pytest.fixture(scope="session")
+def responses_mock(mocked, mock_router, cassette):
+    """Session-wide ``responses`` mock serving the router or a cassette"""
+    if not mocked and cassette is None:
+        yield None
+        return
+    with responses.RequestsMock(assert_all_requests_are_fired=False) as rsps:
+        (mock_router if mocked else cassette).install(rsps)
         yield rsps
 
 
-def validate_product_data(product):
-    """Validate product data against JSON schema"""
-    jsonschema.validate(instance=product, schema=PRODUCT_SCHEMA)
+@pytest.fixture
+def local_server(responses_mock):
+    """Serve request handler classes on free local ports
+
+    ``local_server(Handler, **state)`` starts a threaded HTTP server with
+    ``state`` set as attributes of the server (``self.server.hits`` in the
+    handler), lets its URL through the session mock and returns
+    ``(server, base_url)``. Every server is stopped after the test.
+    """
+    servers = []
 
+    def serve(handler, **state):
+        server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        server.daemon_threads = True
+        for name, value in state.items():
+            setattr(server, name, value)
+        servers.append(server)
+        threading.Thread(
+            target=server.serve_forever, name="local-server", daemon=True
+        ).start()
+        base_url = f"http://127.0.0.1:{server.server_port}"
+        if responses_mock is not None:
+            responses_mock.add_passthru(base_url)
+        return server, base_url
 
-def validate_cart_data(cart):
-    """Validate cart data against JSON schema"""
-    jsonschema.validate(instance=cart, schema=CART_SCHEMA)
+    yield serve
+    for server in servers:
+        server.shutdown()
+        server.server_close()
 
 
-def validate_user_data(user):
-    """Validate user data against JSON schema"""
-    jsonschema.validate(instance=user, schema=USER_SCHEMA)
+@pytest.fixture(autouse=True)
+def isolated_namespace(base_url, api_client, backend_namespace):
+    """Drop the worker's namespace after each test so writes never leak"""
+    yield backend_namespace
+    if backend_namespace is not None:
+        api_client.session.delete(namespace_url(base_url, backend_namespace))
+
+
+@pytest.fixture(autouse=True)
+def mock_api_responses(mocked, mock_router, fake_store, responses_mock):
+    """Mock API responses for all tests, isolated by a copy-on-write overlay"""
+    if not mocked:
+        yield None
+        return
+    responses_mock.calls.reset()
+    with mock_router.overlay(), fake_store.overlay():
+        yield mock_router
@@ -0,0 +1,35 @@
+import asyncio
+import time
+
+import allure
+import pytest
+
+from utils.aclient import gather_bounded
+
+
+@pytest.mark.harness
+@allure.feature("Async client")
+@allure.story("Bounded gather")
+def test_gather_bounded_caps_concurrency_and_keeps_order():
+    """Test that fan-out respects the limit and returns results in order"""
+    in_flight = 0
+    peak = 0
+
+    async def job(value):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        # Later jobs finish first, so the results come back out of order
+        await asyncio.sleep(0.01 * (8 - value))
+        in_flight -= 1
+        return value
+
+    async def main():
+        return await gather_bounded([job(i) for i in range(8)], limit=4)
+
+    started = time.perf_counter()
+    assert asyncio.run(main()) == list(range(8))
+    elapsed = time.perf_counter() - started
+    assert peak == 4
+    # About 90ms with four slots, not the 360ms of eight sequential sleeps
+    assert elapsed < 0.3
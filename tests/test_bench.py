@@ -0,0 +1,57 @@
+import time
+from types import SimpleNamespace
+
+import allure
+import pytest
+
+from utils.bench import Measurement, calibrate, measure, summarize
+from utils.plugins.bench import selected
+
+
+@pytest.mark.harness
+@allure.feature("Benchmarks")
+@allure.story("Timing")
+def test_rounds_are_calibrated_to_the_minimum_time():
+    """Test that a fast call is looped until a round lasts min_time"""
+    calls = []
+    loops = calibrate(lambda: calls.append(None), min_time=0.01)
+    assert loops > 1000
+    measurement = measure(lambda: time.sleep(0.002), "sleep", min_time=0.01, repeat=3)
+    assert measurement.loops >= 4
+    assert len(measurement.samples_us) == 3
+    assert all(sample >= 2000 for sample in measurement.samples_us)
+
+
+@pytest.mark.harness
+@allure.feature("Benchmarks")
+@allure.story("Timing")
+def test_summary_of_samples():
+    """Test the median, minimum, interquartile range and rate"""
+    measurement = Measurement("m", {}, 10, [5.0, 1.0, 4.0, 2.0, 3.0, 100.0, 2.5, 3.5])
+    assert summarize(measurement) == {
+        "median_us": 3.25,
+        "min_us": 1.0,
+        "iqr_us": 1.5,
+        "ops_per_s": 307692,
+    }
+
+
+@pytest.mark.harness
+@allure.feature("Benchmarks")
+@allure.story("Selection")
+@pytest.mark.parametrize(
+    "markexpr, expected",
+    [
+        ("", False),
+        ("benchmark", True),
+        ("benchmark and not slow", True),
+        ("smoke or benchmark", True),
+        ("not benchmark", False),
+        ("regression and not benchmark", False),
+        ("benchmarks", False),
+    ],
+)
+def test_benchmarks_run_only_when_the_expression_selects_them(markexpr, expected):
+    """Test that -m selects benchmarks by evaluating the expression"""
+    config = SimpleNamespace(getoption=lambda name: markexpr)
+    assert selected(config) is expected
@@ -1,42 +1,30 @@
 import allure
 import pytest
-import requests
 
-
-def validate_cart_data(cart):
-    """Helper function to validate cart data types and required fields"""
-    assert isinstance(cart["id"], int)
-    assert isinstance(cart["userId"], int)
-    assert "date" in cart
-    assert isinstance(cart["products"], list)
-    for item in cart["products"]:
-        assert isinstance(item["productId"], int)
-        assert isinstance(item["quantity"], int)
+from utils.jsonstream import iter_json_items
+from utils.schemas import CART_SCHEMA
+from utils.validation import assert_stream_valid, validate_cart_data
 
 
 @pytest.mark.smoke
 @allure.feature("Carts API")
 @allure.story("Get all carts")
-def test_get_all_carts(base_url):
+def test_get_all_carts(api_client):
     """Test retrieving all carts from Fake Store API"""
-    response = requests.get(f"{base_url}/carts")
+    response = api_client.list_carts(stream=True)
     assert response.status_code == 200
-    carts = response.json()
-    assert isinstance(carts, list)
-    assert len(carts) > 0
-    # Check first 3 carts
-    for cart in carts[:3]:
-        validate_cart_data(cart)
+    count = assert_stream_valid(iter_json_items(response), CART_SCHEMA)
+    assert count > 0
 
 
 @pytest.mark.smoke
 @pytest.mark.regression
-@pytest.mark.parametrize("cart_id", [1, 2, 3, 5])
+@pytest.mark.spec("carts", "get")
 @allure.feature("Carts API")
 @allure.story("Get single cart")
-def test_get_single_cart(base_url, cart_id):
+def test_get_single_cart(api_client, cart_id):
     """Test retrieving a single cart"""
-    response = requests.get(f"{base_url}/carts/{cart_id}")
+    response = api_client.get_cart(cart_id)
     assert response.status_code == 200
     cart = response.json()
     assert cart["id"] == cart_id
@@ -46,14 +34,14 @@ def test_get_single_cart(base_url, cart_id):
 @pytest.mark.regression
 @allure.feature("Carts API")
 @allure.story("Create cart")
-def test_create_cart(base_url):
+def test_create_cart(api_client):
     """Test creating a new cart"""
     new_cart = {
         "userId": 1,
         "date": "2020-03-02",
         "products": [{"productId": 1, "quantity": 1}, {"productId": 2, "quantity": 2}],
     }
-    response = requests.post(f"{base_url}/carts", json=new_cart)
+    response = api_client.create_cart(new_cart)
     assert response.status_code == 201
     cart = response.json()
     validate_cart_data(cart)
@@ -64,7 +52,7 @@ def test_create_cart(base_url):
 @pytest.mark.regression
 @allure.feature("Carts API")
 @allure.story("Update cart")
-def test_update_cart(base_url):
+def test_update_cart(api_client):
     """Test updating an existing cart"""
     cart_id = 1
     update_data = {
@@ -72,7 +60,7 @@ def test_update_cart(base_url):
         "date": "2020-03-02",
         "products": [{"productId": 1, "quantity": 5}],
     }
-    response = requests.put(f"{base_url}/carts/{cart_id}", json=update_data)
+    response = api_client.update_cart(cart_id, update_data)
     assert response.status_code == 200
     cart = response.json()
     validate_cart_data(cart)
@@ -82,8 +70,8 @@ def test_update_cart(base_url):
 @pytest.mark.regression
 @allure.feature("Carts API")
 @allure.story("Delete cart")
-def test_delete_cart(base_url):
+def test_delete_cart(api_client):
     """Test deleting a cart"""
     cart_id = 1
-    response = requests.delete(f"{base_url}/carts/{cart_id}")
+    response = api_client.delete_cart(cart_id)
     assert response.status_code == 200
@@ -0,0 +1,148 @@
+import asyncio
+import gzip
+import json
+from http.server import BaseHTTPRequestHandler
+
+import allure
+import pytest
+import responses
+
+from utils.aclient import AsyncFakeStoreClient, RecordingTransport, router_transport
+from utils.cassette import Cassette, CassetteError, CassetteMiss, CassetteWriter
+from utils.client import FakeStoreClient
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """Local HTTP stand-in for the live API"""
+
+    def _reply(self, payload, status=200):
+        body = json.dumps(payload).encode()
+        self.server.hits += 1
+        compress = "gzip" in self.headers.get("Accept-Encoding", "")
+        if compress:
+            body = gzip.compress(body)
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        if compress:
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path.startswith("/missing"):
+            self._reply({"error": "not found"}, status=404)
+        else:
+            self._reply({"path": self.path, "hit": self.server.hits})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        self._reply({"echo": json.loads(self.rfile.read(length))}, status=201)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stand_in(local_server):
+    """Serve ``StandInHandler`` on a free local port"""
+    return local_server(StandInHandler, hits=0)
+
+
+def record_session(base_url, path):
+    """Make a few requests against ``base_url`` and record them"""
+    with CassetteWriter(path, base_url) as writer:
+        with FakeStoreClient(base_url) as client:
+            client.add_listener(writer.on_request)
+            live = [
+                client.get_product(1).json(),
+                client.list_products(limit=2).json(),
+                client.get("/missing/1").status_code,
+                client.create_cart({"userId": 1}).json(),
+                client.create_cart({"userId": 2}).json(),
+            ]
+    return live
+
+
+@pytest.mark.harness
+@allure.feature("Cassettes")
+@allure.story("Record and replay")
+def test_replay_serves_recorded_responses_offline(stand_in, tmp_path):
+    """Test that a replayed session matches the live one without the network"""
+    server, base_url = stand_in
+    path = tmp_path / "session.cassette"
+    live = record_session(base_url, path)
+    hits = server.hits
+
+    rsps = responses.RequestsMock(assert_all_requests_are_fired=False)
+    with Cassette(path) as cassette, rsps:
+        assert cassette.base_url == base_url
+        assert len(cassette) == 5
+        cassette.install(rsps)
+        with FakeStoreClient(base_url) as client:
+            replayed = [
+                client.get_product(1).json(),
+                client.list_products(limit=2).json(),
+                client.get("/missing/1").status_code,
+                client.create_cart({"userId": 1}).json(),
+                client.create_cart({"userId": 2}).json(),
+            ]
+            with pytest.raises(CassetteMiss):
+                client.get_product(2)
+    assert replayed == live
+    assert live[3] != live[4]
+    assert server.hits == hits
+
+
+@pytest.mark.harness
+@allure.feature("Cassettes")
+@allure.story("Record and replay")
+def test_async_requests_are_recorded_and_replayed(stand_in, tmp_path):
+    """Test that the asyncio client records through and replays from a cassette"""
+    _, base_url = stand_in
+    path = tmp_path / "async.cassette"
+
+    async def fetch(transport):
+        async with AsyncFakeStoreClient(base_url, transport=transport) as client:
+            responses_ = await asyncio.gather(client.get_product(3), client.get_user(4))
+            return [response.json() for response in responses_]
+
+    with CassetteWriter(path, base_url) as writer:
+        live = asyncio.run(fetch(RecordingTransport(writer)))
+    with Cassette(path) as cassette:
+        assert asyncio.run(fetch(router_transport(cassette))) == live
+
+
+@pytest.mark.harness
+@allure.feature("Cassettes")
+@allure.story("Indexed format")
+def test_lookups_use_the_index(tmp_path):
+    """Test that every entry of a large cassette is found by key"""
+    path = tmp_path / "large.cassette"
+    with CassetteWriter(path, "http://api") as writer:
+        for i in range(5000):
+            writer.record("GET", f"http://api/products/{i}", None, 200, {}, f"{i}")
+        # Repeated requests keep their first response
+        assert not writer.record("GET", "http://api/products/1", None, 500, {}, "")
+    with Cassette(path) as cassette:
+        for i in (0, 1, 2500, 4999):
+            status, _, body = cassette.get("GET", f"http://api/products/{i}")
+            assert (status, bytes(body)) == (200, str(i).encode())
+        assert cassette.get("GET", "http://api/products/5000") is None
+        assert cassette.get("POST", "http://api/products/1") is None
+
+
+@pytest.mark.harness
+@allure.feature("Cassettes")
+@allure.story("Indexed format")
+def test_unfinished_cassette_is_rejected(tmp_path):
+    """Test that a cassette without its index cannot be opened"""
+    path = tmp_path / "partial.cassette"
+    writer = CassetteWriter(path)
+    writer.record("GET", "http://api/carts", None, 200, {}, "[]")
+    writer._file.flush()
+    with pytest.raises(CassetteError):
+        Cassette(path)
+    writer.close()
+    with Cassette(path) as cassette:
+        assert len(cassette) == 1
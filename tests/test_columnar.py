@@ -0,0 +1,126 @@
+import math
+import time
+
+import allure
+import numpy as np
+import pytest
+
+from utils.columnar import (
+    CartColumns,
+    ProductColumns,
+    assert_no_violations,
+    check_carts,
+    check_products,
+)
+from utils.datagen import CATEGORIES, CatalogGenerator
+from utils.records import Cart
+
+
+def indices(violations):
+    return {check: list(found) for check, found in violations}
+
+
+@pytest.mark.harness
+@allure.feature("Columnar checks")
+@allure.story("Generated catalog")
+def test_generated_catalog_has_no_violations():
+    """Test that a consistent synthetic catalog passes every invariant"""
+    generator = CatalogGenerator(seed=2, products=2000, users=200, carts=1000)
+    assert_no_violations(check_products(generator.products, CATEGORIES))
+    assert_no_violations(
+        check_carts(
+            generator.carts,
+            product_ids=np.arange(1, 2001),
+            user_ids=np.arange(1, 201),
+        )
+    )
+
+
+@pytest.mark.harness
+@allure.feature("Columnar checks")
+@allure.story("Product invariants")
+def test_product_violations_report_row_indices():
+    """Test that each broken product invariant reports the offending rows"""
+    products = [
+        {"id": 1, "price": 9.5, "category": "books"},
+        {"id": 2, "price": 0, "category": "books"},
+        {"id": 1, "price": math.inf, "category": "toys"},
+        {"id": "3", "price": "12", "category": "books"},
+        {"price": 1.0, "category": None},
+    ]
+    assert indices(check_products(products, ["books"])) == {
+        "id is missing": [3, 4],
+        "id is not unique": [2],
+        "price is not positive and finite": [1, 2, 3],
+        "category is unknown": [2, 4],
+    }
+
+
+@pytest.mark.harness
+@allure.feature("Columnar checks")
+@allure.story("Cart invariants")
+def test_cart_violations_report_cart_rows():
+    """Test that line-level failures point at the cart holding the line"""
+    carts = [
+        {"id": 1, "userId": 1, "products": [{"productId": 1, "quantity": 2}]},
+        {"id": 2, "userId": 9, "products": [{"productId": 7, "quantity": 1}]},
+        {
+            "id": 3,
+            "userId": 1,
+            "products": [
+                {"productId": 1, "quantity": 1},
+                {"productId": 2, "quantity": 0},
+            ],
+        },
+        Cart.from_json(
+            {"id": 3, "userId": 2, "products": [{"productId": 2, "quantity": -1}]}
+        ),
+    ]
+    violations = check_carts(carts, product_ids=[1, 2], user_ids=[1, 2])
+    assert indices(violations) == {
+        "id is not unique": [3],
+        "quantity is below 1": [2, 3],
+        "productId is unknown": [1],
+        "userId is unknown": [1],
+    }
+    expected = r"quantity is below 1: 2 row\(s\) \[2, 3\]"
+    with pytest.raises(AssertionError, match=expected):
+        assert_no_violations(violations)
+
+
+@pytest.mark.harness
+@allure.feature("Columnar checks")
+@allure.story("Compact records")
+def test_cart_records_are_read_from_their_buffers():
+    """Test that Cart records and dicts give the same line columns"""
+    data = [
+        {"id": 1, "userId": 1, "products": [{"productId": 4, "quantity": 2}]},
+        {"id": 2, "userId": 1, "products": []},
+        {"id": 3, "userId": 2, "products": [{"productId": 5, "quantity": 1}] * 2},
+    ]
+    from_dicts = CartColumns.from_items(data)
+    from_records = CartColumns.from_items([Cart.from_json(cart) for cart in data])
+    for name in ("offsets", "line_carts", "product_ids", "quantities"):
+        assert list(getattr(from_dicts, name)) == list(getattr(from_records, name))
+    assert list(from_dicts.offsets) == [0, 1, 1, 3]
+    assert list(from_dicts.line_carts) == [0, 2, 2]
+
+
+@pytest.mark.harness
+@allure.feature("Columnar checks")
+@allure.story("Scale")
+def test_million_row_checks_are_vectorized():
+    """Test that the invariants run over a million rows in well under a second"""
+    count = 1_000_000
+    columns = ProductColumns(
+        ids=np.arange(1, count + 1),
+        prices=np.full(count, 9.99),
+        category_codes=np.zeros(count, dtype=np.int32),
+        categories=["books"],
+    )
+    columns.prices[123_456] = -1.0
+    start = time.perf_counter()
+    violations = check_products(columns)
+    elapsed = time.perf_counter() - start
+    assert indices(violations) == {"price is not positive and finite": [123_456]}
+    assert elapsed < 1.0
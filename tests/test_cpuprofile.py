@@ -0,0 +1,110 @@
+import threading
+import time
+
+import allure
+import pytest
+
+from utils.cpuprofile import (
+    Frame,
+    StackSampler,
+    charged_subsystem,
+    collapse,
+    self_times,
+    speedscope,
+    subsystem,
+    subsystem_times,
+)
+
+
+def spin(seconds):
+    deadline = time.thread_time() + seconds
+    while time.thread_time() < deadline:
+        pass
+
+
+@pytest.mark.harness
+@allure.feature("CPU profiling")
+@allure.story("Subsystems")
+def test_samples_are_charged_to_the_innermost_known_subsystem():
+    """Test that library frames count for the subsystem that called them"""
+    assert subsystem("utils/router.py") == "mock"
+    assert subsystem("/usr/lib/python3/site-packages/jsonschema/validators.py") == (
+        "validation"
+    )
+    assert subsystem("/usr/lib/python3.11/json/decoder.py") == "json"
+    assert subsystem("/usr/lib/python3/site-packages/urllib3/response.py") == (
+        "http client"
+    )
+    assert subsystem("tests/test_products.py") == "test code"
+    assert subsystem("/usr/lib/python3.11/re/__init__.py") == "other"
+    stack = (
+        Frame("test_x", "tests/test_x.py", 1),
+        Frame("_find_match", "/site-packages/responses/__init__.py", 2),
+        Frame("match", "/usr/lib/python3.11/re/__init__.py", 3),
+    )
+    assert charged_subsystem(stack) == "mock"
+
+
+@pytest.mark.harness
+@allure.feature("CPU profiling")
+@allure.story("Sampling")
+@pytest.mark.skipif(
+    not hasattr(time, "pthread_getcpuclockid"), reason="needs per-thread CPU clocks"
+)
+def test_sampler_weighs_busy_threads_and_skips_idle_ones(request):
+    """Test that CPU goes to the spinning function, not the sleeping thread"""
+    sampler = StackSampler(request.config.rootpath, interval=0.001).start()
+    try:
+        idle = threading.Thread(target=time.sleep, args=(0.3,))
+        sampler.begin()
+        idle.start()
+        spin(0.2)
+        idle.join()
+        stacks = sampler.end()
+    finally:
+        sampler.stop()
+    times = self_times(stacks)
+    hottest, weight = times.most_common(1)[0]
+    assert hottest.name == "spin"
+    assert hottest.file == "tests/test_cpuprofile.py"
+    assert weight >= 100_000
+    assert all(frame.name != "sleep" for stack in stacks for frame in stack)
+    # The pytest frames around the test are stripped from the root
+    spinning = [stack for stack in stacks if stack[-1] == hottest]
+    assert {stack[0] for stack in spinning} == {
+        Frame(
+            "test_sampler_weighs_busy_threads_and_skips_idle_ones",
+            "tests/test_cpuprofile.py",
+            spinning[0][0].line,
+        )
+    }
+    assert subsystem_times(stacks)["test code"] >= weight
+
+
+@pytest.mark.harness
+@allure.feature("CPU profiling")
+@allure.story("Flame graphs")
+def test_profiles_export_as_collapsed_stacks_and_speedscope():
+    """Test both flame graph formats from the same samples"""
+    test = Frame("test_get", "tests/test_products.py", 10)
+    dispatch = Frame("dispatch", "utils/router.py", 20)
+    validate = Frame("validate", "utils/validation.py", 30)
+    stacks = {(test, dispatch): 300, (test, validate): 500, (test,): 100}
+    assert collapse(stacks) == [
+        "[test code] test_get (tests/test_products.py:10);"
+        "[validation] validate (utils/validation.py:30) 500",
+        "[test code] test_get (tests/test_products.py:10);"
+        "[mock] dispatch (utils/router.py:20) 300",
+        "[test code] test_get (tests/test_products.py:10) 100",
+    ]
+    document = speedscope([("session", stacks), ("test_get", {(test,): 100})])
+    frames = [frame["name"] for frame in document["shared"]["frames"]]
+    assert len(frames) == 3
+    session, single = document["profiles"]
+    assert session["endValue"] == 900
+    assert [[frames[i] for i in sample] for sample in session["samples"]][0] == [
+        "[test code] test_get (tests/test_products.py:10)",
+        "[mock] dispatch (utils/router.py:20)",
+    ]
+    # Frames are shared between profiles
+    assert single["samples"] == [[session["samples"][0][0]]]
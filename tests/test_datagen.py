@@ -0,0 +1,72 @@
+from collections import Counter
+from itertools import islice
+
+import allure
+import pytest
+
+from utils.datagen import CatalogGenerator
+from utils.fakestore import FakeStore
+from utils.schemas import CART_SCHEMA, PRODUCT_SCHEMA, USER_SCHEMA
+from utils.validation import assert_all_valid
+
+
+@pytest.mark.harness
+@allure.feature("Synthetic data")
+@allure.story("Determinism")
+def test_records_are_addressable_and_deterministic(catalog):
+    """Test that random access, streaming and reseeding all agree"""
+    assert len(catalog.products) == 10_000_000
+    last = catalog.products.by_id(10_000_000)
+    assert last["id"] == 10_000_000
+    assert catalog.products[-1] == last
+
+    again = CatalogGenerator(seed=catalog.seed, products=10_000_000)
+    assert again.products.by_id(10_000_000) == last
+    assert list(islice(catalog.users, 3)) == catalog.users[:3]
+    assert CatalogGenerator(seed=catalog.seed + 1).product(1) != catalog.product(1)
+
+
+@pytest.mark.harness
+@allure.feature("Synthetic data")
+@allure.story("Schema conformance")
+def test_generated_records_match_schemas(catalog):
+    """Test that generated products, users and carts validate"""
+    assert_all_valid(catalog.products[:2000], PRODUCT_SCHEMA)
+    assert_all_valid(catalog.users[:500], USER_SCHEMA)
+    carts = catalog.carts[:2000]
+    assert_all_valid(carts, CART_SCHEMA)
+    for cart in carts:
+        assert 1 <= cart["userId"] <= len(catalog.users)
+        assert all(
+            1 <= p["productId"] <= len(catalog.products) for p in cart["products"]
+        )
+
+
+@pytest.mark.harness
+@allure.feature("Synthetic data")
+@allure.story("Distributions")
+def test_distributions_are_skewed():
+    """Test that categories, cart sizes and user activity are long-tailed"""
+    generator = CatalogGenerator(seed=3, products=5000, users=200, carts=5000)
+    categories = Counter(p["category"] for p in generator.products).most_common()
+    assert categories[0][1] > 5 * categories[-1][1]
+
+    carts = list(generator.carts)
+    sizes = Counter(len(cart["products"]) for cart in carts)
+    assert sizes[1] > sizes[2] > sizes[4]
+    activity = Counter(cart["userId"] for cart in carts)
+    assert activity[1] > 10 * activity[150]
+
+
+@pytest.mark.harness
+@allure.feature("Synthetic data")
+@allure.story("FakeStore seeding")
+def test_fake_store_serves_generated_catalog():
+    """Test that a generated catalog loads into the in-memory FakeStore"""
+    generator = CatalogGenerator(seed=5, products=3000, users=100, carts=1000)
+    store = FakeStore(generator.products, generator.carts, generator.users)
+
+    assert store.count("products") == 3000
+    for category in store.categories():
+        expected = sum(p["category"] == category for p in generator.products)
+        assert len(store.products_in_category(category)) == expected
@@ -0,0 +1,116 @@
+import allure
+import pytest
+
+from utils.fakestore import FakeStore
+from utils.router import MockRouter
+
+pytestmark = pytest.mark.usefixtures("mock_only")
+
+
+@pytest.mark.harness
+@allure.feature("Mock layer")
+@allure.story("Stateful CRUD")
+def test_created_cart_is_readable(api_client):
+    """Test that a created cart can be read back and queried by user"""
+    new_cart = {"userId": 3, "date": "2020-03-02", "products": []}
+    response = api_client.create_cart(new_cart)
+    assert response.status_code == 201
+    cart_id = response.json()["id"]
+
+    response = api_client.get_cart(cart_id)
+    assert response.status_code == 200
+    assert response.json()["userId"] == 3
+
+    response = api_client.list_user_carts(3)
+    assert cart_id in [cart["id"] for cart in response.json()]
+
+
+@pytest.mark.harness
+@allure.feature("Mock layer")
+@allure.story("Stateful CRUD")
+def test_deleted_user_is_gone(api_client):
+    """Test that a deleted user is no longer served"""
+    assert api_client.delete_user(2).status_code == 200
+    assert api_client.get_user(2).status_code == 404
+
+
+@pytest.mark.harness
+@allure.feature("Mock layer")
+@allure.story("Stateful CRUD")
+def test_mutations_do_not_leak_between_tests(api_client):
+    """Test that the previous test's delete was rolled back"""
+    assert api_client.get_user(2).status_code == 200
+
+
+@pytest.mark.harness
+@allure.feature("Mock layer")
+@allure.story("Secondary indexes")
+def test_indexes_follow_updates():
+    """Test that category and date indexes track writes inside an overlay"""
+    store = FakeStore(
+        products=[{"id": 1, "category": "a"}, {"id": 2, "category": "b"}],
+        carts=[
+            {"id": 1, "userId": 1, "date": "2020-01-01"},
+            {"id": 2, "userId": 2, "date": "2020-02-01"},
+        ],
+    )
+    with store.overlay():
+        store.update("products", 2, {"category": "a"})
+        store.update("carts", 1, {"date": "2020-03-01"})
+        assert [p["id"] for p in store.products_in_category("a")] == [1, 2]
+        assert store.categories() == ["a"]
+        carts = store.carts_between("2020-01-15", "2020-03-31")
+        assert [c["id"] for c in carts] == [2, 1]
+
+    assert [p["id"] for p in store.products_in_category("a")] == [1]
+    assert [c["id"] for c in store.carts_between("2020-01-01", "2020-01-31")] == [1]
+
+
+@pytest.mark.harness
+@allure.feature("Mock layer")
+@allure.story("Secondary indexes")
+def test_same_date_update_in_overlay_is_listed_once():
+    """Test that rewriting a cart without changing its date keeps one entry"""
+    store = FakeStore(carts=[{"id": 1, "userId": 1, "date": "2020-01-01"}])
+    with store.overlay():
+        store.update("carts", 1, {"userId": 2})
+        carts = store.carts_between("2020-01-01", "2020-12-31")
+        assert [c["id"] for c in carts] == [1]
+        assert carts[0]["userId"] == 2
+    assert [c["id"] for c in store.carts_between()] == [1]
+
+
+@pytest.mark.harness
+@allure.feature("Mock layer")
+@allure.story("Namespaces")
+def test_namespace_forks_its_parent():
+    """Test that a namespace forked from another ignores later overlay writes"""
+    store = FakeStore(users=[{"id": 1}, {"id": 2}])
+    with store.namespace("base"):
+        pass
+    with store.overlay():
+        store.delete("users", 1)
+        with store.namespace("child", parent="base"):
+            store.delete("users", 2)
+            assert [u["id"] for u in store.list("users")] == [1]
+        with store.namespace("other", parent="base"):
+            assert [u["id"] for u in store.list("users")] == [1, 2]
+    assert store.drop_namespace("child")
+
+
+@pytest.mark.harness
+@allure.feature("Mock layer")
+@allure.story("Paging")
+@pytest.mark.parametrize(
+    "query", ["limit=abc", "limit=-1", "sort=sideways", "limit=2&sort=up"]
+)
+def test_invalid_paging_is_rejected(query):
+    """Test that a malformed limit or sort answers 400 instead of raising"""
+    router = FakeStore(products=[{"id": 1, "category": "a"}]).mount(
+        MockRouter("http://store.invalid")
+    )
+    for path in ("/products", "/products/category/a", "/carts", "/carts/user/1"):
+        status, _, _ = router.dispatch("GET", f"http://store.invalid{path}?{query}")
+        assert status == 400
+    status, _, _ = router.dispatch("GET", "http://store.invalid/products?limit=1")
+    assert status == 200
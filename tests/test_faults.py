@@ -0,0 +1,170 @@
+import random
+import time
+
+import allure
+import httpx
+import pytest
+import requests
+
+from utils.aclient import gather_bounded
+from utils.client import FakeStoreClient
+from utils.fakestore import FakeStore
+from utils.faults import FaultProfile, FixedLatency, HistogramLatency, LogNormalLatency
+from utils.hedging import DeadlineExceeded, HedgePolicy
+from utils.histogram import LatencyHistogram
+from utils.router import MockRouter
+from utils.standin import StandInServer
+
+pytestmark = pytest.mark.usefixtures("mock_only")
+
+
+def tail_histogram():
+    """1ms for 95% of requests, 150ms for the slowest 5%"""
+    histogram = LatencyHistogram()
+    histogram.record(1_000, count=95)
+    histogram.record(150_000, count=5)
+    return histogram
+
+
+def p99(client, requests_made=100):
+    latencies = []
+    for _ in range(requests_made):
+        started = time.perf_counter()
+        assert client.get_product(1).status_code == 200
+        latencies.append(time.perf_counter() - started)
+    return sorted(latencies)[98]
+
+
+@pytest.mark.harness
+@allure.feature("Fault injection")
+@allure.story("Latency distributions")
+def test_latency_distributions():
+    """Test that each distribution samples delays of the configured shape"""
+    rng = random.Random(0)
+    assert FixedLatency(20).sample(rng) == 0.02
+    samples = sorted(LogNormalLatency(10, sigma=1.0).sample(rng) for _ in range(2001))
+    assert 0.008 < samples[1000] < 0.012
+    assert LogNormalLatency(10, sigma=3.0, max_ms=50).sample(rng) <= 0.05
+    delays = {HistogramLatency(tail_histogram()).sample(rng) for _ in range(500)}
+    assert min(delays) == pytest.approx(0.001, rel=0.01)
+    assert max(delays) == pytest.approx(0.15, rel=0.01)
+
+
+@pytest.mark.harness
+@pytest.mark.faults(error_rates={"GET /carts/{id}": 1.0})
+@allure.feature("Fault injection")
+@allure.story("Per-endpoint error rates")
+def test_error_rate_applies_per_endpoint(api_client, fault_profile):
+    """Test that an endpoint's error rate leaves other endpoints alone"""
+    assert api_client.get_cart(1).status_code == 500
+    assert api_client.get_product(1).status_code == 200
+    assert fault_profile.injected["errors"] == 1
+
+
+@pytest.mark.harness
+@pytest.mark.faults(throttle_rate=1.0, retry_after=3)
+@allure.feature("Fault injection")
+@allure.story("Throttling")
+def test_throttled_requests_carry_retry_after(base_url):
+    """Test that throttled responses are 429s with a Retry-After header"""
+    with FakeStoreClient(base_url) as client:
+        response = client.get_product(1)
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "3"
+
+
+@pytest.mark.harness
+@pytest.mark.faults(reset_rate=1.0)
+@allure.feature("Fault injection")
+@allure.story("Connection resets")
+def test_connection_resets_raise_connection_errors(base_url):
+    """Test that injected resets surface as requests connection errors"""
+    with FakeStoreClient(base_url) as client:
+        with pytest.raises(requests.ConnectionError):
+            client.get_product(1)
+
+
+@pytest.mark.harness
+@pytest.mark.faults(slow_body_bps=20_000)
+@allure.feature("Fault injection")
+@allure.story("Slow bodies")
+def test_slow_bodies_are_streamed_slowly(api_client):
+    """Test that the body arrives at the injected rate and decodes intact"""
+    started = time.perf_counter()
+    response = api_client.list_products()
+    elapsed = time.perf_counter() - started
+    assert response.json()
+    assert elapsed >= len(response.content) / 20_000 * 0.9
+
+
+@pytest.mark.harness
+@pytest.mark.faults(latency=FixedLatency(300))
+@allure.feature("Fault injection")
+@allure.story("Deadlines")
+def test_deadline_bounds_a_slow_request(base_url):
+    """Test that a deadline gives up long before the slow response arrives"""
+    with FakeStoreClient(base_url, deadline=0.05) as client:
+        started = time.perf_counter()
+        with pytest.raises(DeadlineExceeded):
+            client.get_product(1)
+        assert time.perf_counter() - started < 0.25
+
+
+@pytest.mark.harness
+@pytest.mark.faults(latency=HistogramLatency(tail_histogram()), seed=1)
+@allure.feature("Fault injection")
+@allure.story("Hedging")
+def test_hedging_bounds_p99_under_tail_latency(base_url):
+    """Test that hedged requests keep p99 far below the injected tail"""
+    with FakeStoreClient(base_url) as client:
+        unhedged = p99(client)
+    hedge = HedgePolicy(after=0.02)
+    with FakeStoreClient(base_url, hedge=hedge) as client:
+        hedged = p99(client)
+    assert unhedged >= 0.14
+    assert hedged < 0.1
+    assert hedge.sent >= 1
+    assert hedge.won >= 1
+
+
+@pytest.mark.harness
+@pytest.mark.faults(latency=FixedLatency(100), error_rates={"GET /carts/{id}": 1.0})
+@allure.feature("Fault injection")
+@allure.story("Transports")
+def test_faults_apply_to_async_requests(run_async, fault_profile):
+    """Test that async requests are delayed and failed without serializing"""
+
+    async def fan_out(client):
+        products = [client.get_product(i) for i in range(1, 9)]
+        return await gather_bounded([*products, client.get_cart(1)], limit=10)
+
+    started = time.perf_counter()
+    responses = run_async(fan_out)
+    assert time.perf_counter() - started < 0.5
+    assert [r.status_code for r in responses] == [200] * 8 + [500]
+    assert fault_profile.injected["delayed"] == 9
+
+    fault_profile.reset_rate = 1.0
+    with pytest.raises(httpx.ReadError):
+        run_async(lambda client: client.get_product(1))
+
+
+@pytest.mark.harness
+@allure.feature("Fault injection")
+@allure.story("Transports")
+def test_faults_apply_to_the_stand_in_server(responses_mock):
+    """Test that a profile on the stand-in's router shapes its HTTP responses"""
+    router = FakeStore().mount(MockRouter("http://stand-in"))
+    with StandInServer(router) as server, FakeStoreClient(server.url) as client:
+        responses_mock.add_passthru(server.url)
+        expected = client.list_products().json()
+        with router.inject_faults(FaultProfile(error_rate=1.0)):
+            assert client.get_product(1).status_code == 500
+        with router.inject_faults(FaultProfile(slow_body_bps=200_000)):
+            started = time.perf_counter()
+            response = client.list_products()
+            assert time.perf_counter() - started >= len(response.content) / 200_000
+            assert response.json() == expected
+        with router.inject_faults(FaultProfile(reset_rate=1.0)):
+            with pytest.raises(requests.ConnectionError):
+                client.get_product(1)
@@ -0,0 +1,176 @@
+import json
+from http.server import BaseHTTPRequestHandler
+
+import allure
+import pytest
+
+from utils.client import FakeStoreClient
+from utils.httpcache import ResponseCache, collection_url
+from utils.ratelimit import RateLimiter
+
+
+class CachingHandler(BaseHTTPRequestHandler):
+    """Local stand-in sending cache headers chosen by the request path"""
+
+    def _send(self, status, payload=None, headers=()):
+        self.server.hits.append((self.command, self.path))
+        body = b"" if payload is None else json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        etag = f'"v{self.server.version}"'
+        if self.path.startswith("/etag"):
+            if self.headers.get("If-None-Match") == etag:
+                self._send(304, headers=[("ETag", etag)])
+            else:
+                self._send(200, {"version": self.server.version}, [("ETag", etag)])
+        elif self.path.startswith("/nostore"):
+            self._send(200, {"path": self.path}, [("Cache-Control", "no-store")])
+        else:
+            control = ("Cache-Control", "max-age=60")
+            self._send(200, {"path": self.path, "pad": "x" * 100}, [control])
+
+    def do_PUT(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self._send(200, {})
+
+    def log_message(self, *args):
+        pass
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def cached_client(local_server):
+    """Client with a small cache talking to a ``CachingHandler`` stand-in"""
+    server, base_url = local_server(CachingHandler, hits=[], version=1)
+    clock = FakeClock()
+    cache = ResponseCache(max_bytes=450, clock=clock)
+    with FakeStoreClient(base_url, cache=cache) as client:
+        yield client, server, clock
+
+
+@pytest.mark.harness
+@allure.feature("HTTP cache")
+@allure.story("Freshness")
+def test_fresh_responses_are_served_without_a_request(cached_client):
+    """Test that max-age responses are reused until they expire"""
+    client, server, clock = cached_client
+    first = client.get("/products/1")
+    second = client.get("/products/1")
+    assert second.json() == first.json()
+    assert getattr(second, "from_cache", False)
+    assert second.timing.status == 200
+    assert len(server.hits) == 1
+
+    clock.now += 61
+    assert not getattr(client.get("/products/1"), "from_cache", False)
+    assert len(server.hits) == 2
+    assert client.cache.stats.hits == 1
+
+
+@pytest.mark.harness
+@allure.feature("HTTP cache")
+@allure.story("Revalidation")
+def test_etag_entries_are_revalidated(cached_client):
+    """Test that stale entries are revalidated and 304s served from the cache"""
+    client, server, _ = cached_client
+    assert client.get("/etag").json() == {"version": 1}
+    response = client.get("/etag")
+    assert response.status_code == 200
+    assert response.json() == {"version": 1}
+    assert response.timing.status == 304
+    assert client.cache.stats.revalidated == 1
+
+    server.version = 2
+    assert client.get("/etag").json() == {"version": 2}
+    assert len(server.hits) == 3
+
+
+@pytest.mark.harness
+@allure.feature("HTTP cache")
+@allure.story("Cache-Control")
+def test_no_store_and_no_cache_bypass_the_cache(cached_client):
+    """Test that no-store responses and no-cache requests skip cached copies"""
+    client, server, _ = cached_client
+    client.get("/nostore")
+    client.get("/nostore")
+    client.get("/products/2")
+    client.get("/products/2", headers={"Cache-Control": "no-cache"})
+    assert len(server.hits) == 4
+    assert client.cache.stats.hits == 0
+
+
+@pytest.mark.harness
+@allure.feature("HTTP cache")
+@allure.story("LRU eviction")
+def test_least_recently_used_entries_are_evicted(cached_client):
+    """Test that the cache stays under its byte limit by evicting LRU entries"""
+    client, server, _ = cached_client
+    for product_id in (1, 2, 3, 1, 4):
+        client.get(f"/products/{product_id}")
+    assert client.cache.size <= client.cache.max_bytes
+    assert client.cache.stats.evictions >= 1
+    server.hits.clear()
+    client.get("/products/1")
+    client.get("/products/2")
+    # 1 was used recently and kept, 2 was the least recently used
+    assert server.hits == [("GET", "/products/2")]
+
+
+@pytest.mark.harness
+@allure.feature("HTTP cache")
+@allure.story("Invalidation")
+def test_writes_invalidate_the_collection(cached_client):
+    """Test that a write drops cached reads of the same collection only"""
+    client, server, _ = cached_client
+    for path in ("/carts", "/carts/user/1", "/users/1"):
+        client.get(path)
+    client.put("/carts/5", json={"userId": 1})
+    server.hits.clear()
+    for path in ("/carts", "/carts/user/1", "/users/1"):
+        client.get(path)
+    assert server.hits == [("GET", "/carts"), ("GET", "/carts/user/1")]
+
+
+@pytest.mark.harness
+@pytest.mark.parametrize(
+    "url, expected",
+    [
+        ("http://api/carts/5", "http://api/carts"),
+        ("http://api/carts", "http://api/carts"),
+        ("http://api/carts/?x=1", "http://api/carts"),
+        ("http://api/v1/users/12", "http://api/v1/users"),
+    ],
+)
+@allure.feature("HTTP cache")
+@allure.story("Invalidation")
+def test_collection_url(url, expected):
+    assert collection_url(url) == expected
+
+
+@pytest.mark.harness
+@allure.feature("HTTP cache")
+@allure.story("Rate limiting")
+def test_cache_hits_do_not_wait_for_the_rate_limiter(cached_client):
+    """Test that only requests sent to the server take rate limiter tokens"""
+    client, server, _ = cached_client
+    limiter = RateLimiter(["1/s:burst=1"], sleep=lambda seconds: None)
+    limited = FakeStoreClient(client.base_url, cache=client.cache, limiter=limiter)
+    with limited:
+        for _ in range(5):
+            limited.get("/products/1")
+    assert len(server.hits) == 1
+    assert limiter.waited == 0
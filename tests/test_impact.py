@@ -0,0 +1,124 @@
+from types import SimpleNamespace
+
+import allure
+import pytest
+
+from utils.fakestore import FakeStore
+from utils.impact import DependencyScanner, ImpactCache, ImpactEntry
+from utils.plugins.impact import ImpactPlugin
+from utils.router import MockRouter, json_response
+from utils.validation import validate_product_data
+
+
+def _total(order):
+    return sum(line["quantity"] for line in order["products"])
+
+
+@pytest.mark.harness
+@allure.feature("Impact Analysis")
+@allure.story("Dependencies")
+def test_scanner_reaches_helpers_and_schemas(request):
+    """Test that a test's dependencies include the schema its helpers use"""
+
+    def check(product):
+        validate_product_data(product)
+
+    scanner = DependencyScanner(request.config.rootpath)
+    keys = scanner.reach(check)
+    assert "src:utils.validation:validate_product_data" in keys
+    assert "const:utils.validation:PRODUCT_SCHEMA" in keys
+    assert scanner.hash("const:utils.validation:PRODUCT_SCHEMA") is not None
+    assert scanner.hash("src:utils.validation:no_such_function") is None
+
+
+@pytest.mark.harness
+@allure.feature("Impact Analysis")
+@allure.story("Dependencies")
+def test_route_hash_follows_its_handler(request):
+    """Test that a route's hash changes with its handler but not other routes"""
+
+    def hashes(handler):
+        router = MockRouter("http://impact.invalid")
+        router.add("GET", "/orders/{id}", handler)
+        router.add("GET", "/status", json={"ok": True})
+        scanner = DependencyScanner(request.config.rootpath)
+        scanner.add_routes(router)
+        return scanner.routes
+
+    def total(req):
+        return json_response({"total": _total(req.json())})
+
+    def count(req):
+        return json_response({"total": len(req.json()["products"])})
+
+    before, after = hashes(total), hashes(count)
+    assert before["GET /orders/{id}"] != after["GET /orders/{id}"]
+    assert before["GET /status"] == after["GET /status"]
+
+
+@pytest.mark.harness
+@allure.feature("Impact Analysis")
+@allure.story("Cache")
+def test_cache_round_trip_and_changed_keys(request, tmp_path):
+    """Test that stored hashes survive a reload and stale ones are reported"""
+    scanner = DependencyScanner(request.config.rootpath)
+    current = scanner.hash("src:utils.validation:validate_product_data")
+    path = str(tmp_path / "impact.json")
+    cache = ImpactCache(path)
+    cache.entries["tests/test_x.py::test_a"] = ImpactEntry(
+        {
+            "src:utils.validation:validate_product_data": current,
+            "file:pytest.ini": "0" * 16,
+        },
+        ["mocked"],
+        ["GET /products"],
+        "passed",
+    )
+    cache.save()
+    entry = ImpactCache.load(path).entries["tests/test_x.py::test_a"]
+    assert entry.fixtures == ["mocked"]
+    assert scanner.changed(entry.deps) == ["file:pytest.ini"]
+
+
+@pytest.mark.harness
+@allure.feature("Impact Analysis")
+@allure.story("Dependencies")
+def test_direct_backend_use_is_tracked_statically(request, fake_store):
+    """Test that a test naming FakeStore depends on it, unlike mock fixtures"""
+    FakeStore().carts_between()
+    plugin = ImpactPlugin(request.config)
+    keys = plugin.analyze(request.node)
+    assert "src:utils.fakestore:SortedIndex.range" in keys
+    # The ``fake_store`` fixture builds one too, but is tracked through routes
+    fixture = request.node._fixtureinfo.name2fixturedefs["fake_store"][-1].func
+    fixture_keys = plugin.scanner.reach(fixture)
+    assert "src:utils.fakestore:FakeStore" not in fixture_keys
+
+
+@pytest.mark.harness
+@allure.feature("Impact Analysis")
+@allure.story("Cache")
+def test_skipped_tests_are_recorded_as_skipped(request):
+    """Test that a skipped test is not recorded as passed, so it reruns"""
+    plugin = ImpactPlugin(request.config)
+    for nodeid in ("tests/test_x.py::test_skip", "tests/test_x.py::test_pass"):
+        plugin.analyzed[nodeid] = (set(), [], None)
+    for when, skipped in (("setup", True), ("teardown", False)):
+        plugin.pytest_runtest_logreport(
+            SimpleNamespace(
+                nodeid="tests/test_x.py::test_skip",
+                when=when,
+                failed=False,
+                skipped=skipped,
+            )
+        )
+    plugin.pytest_runtest_logreport(
+        SimpleNamespace(
+            nodeid="tests/test_x.py::test_pass",
+            when="teardown",
+            failed=False,
+            skipped=False,
+        )
+    )
+    assert plugin.recorded["tests/test_x.py::test_skip"].outcome == "skipped"
+    assert plugin.recorded["tests/test_x.py::test_pass"].outcome == "passed"
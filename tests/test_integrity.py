@@ -0,0 +1,63 @@
+import allure
+import pytest
+
+from utils.datagen import CatalogGenerator
+from utils.integrity import Orphan, assert_integrity, check_integrity
+
+
+@pytest.mark.regression
+@allure.feature("Referential integrity")
+@allure.story("Carts reference real products and users")
+def test_carts_reference_existing_products_and_users(integrity_report):
+    """Test that every cart's userId and productIds resolve"""
+    assert_integrity(integrity_report)
+    assert integrity_report.cart_totals
+    assert all(total is not None for total in integrity_report.cart_totals)
+
+
+@pytest.mark.harness
+@allure.feature("Referential integrity")
+@allure.story("One request per resource")
+@pytest.mark.usefixtures("mock_only")
+def test_integrity_is_fetched_without_n_plus_one(responses_mock, integrity_report):
+    """Test that the check lists each resource once and computes cart totals"""
+    paths = [call.request.path_url for call in responses_mock.calls]
+    assert paths == ["/products", "/users", "/carts"]
+    # The first mock cart holds two units of product 1 at 10.99
+    assert integrity_report.cart_totals[0] == 21.98
+
+
+@pytest.mark.harness
+@allure.feature("Referential integrity")
+@allure.story("Orphans and duplicates")
+def test_orphans_and_duplicates_are_reported():
+    """Test that dangling references and repeated IDs are all listed"""
+    products = [{"id": 1, "price": 2.5}, {"id": 2, "price": 4.0}, {"id": 2}]
+    users = [{"id": 1}]
+    carts = [
+        {"id": 1, "userId": 1, "products": [{"productId": 2, "quantity": 3}]},
+        {"id": 2, "userId": 7, "products": [{"productId": 9, "quantity": 1}]},
+        {"id": 2, "userId": 1, "products": []},
+    ]
+    report = check_integrity(products, users, carts)
+    assert not report.ok
+    assert report.duplicates == {"products": [2], "users": [], "carts": [2]}
+    assert report.orphans == [
+        Orphan(1, 2, "userId", 7),
+        Orphan(1, 2, "productId", 9),
+    ]
+    # Totals are per position: the orphaned cart 2 and its duplicate both stay
+    assert report.cart_totals == [12.0, None, 0.0]
+    with pytest.raises(AssertionError, match="4 referential integrity problem"):
+        assert_integrity(report)
+
+
+@pytest.mark.harness
+@allure.feature("Referential integrity")
+@allure.story("Generated catalog")
+def test_generated_catalog_is_consistent():
+    """Test that a large synthetic catalog joins without orphans"""
+    generator = CatalogGenerator(seed=4, products=5000, users=500, carts=5000)
+    report = check_integrity(generator.products, generator.users, generator.carts)
+    assert_integrity(report)
+    assert len(report.cart_totals) == 5000
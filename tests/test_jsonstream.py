@@ -0,0 +1,155 @@
+import json
+import random
+import tracemalloc
+
+import allure
+import pytest
+
+from utils.datagen import CatalogGenerator
+from utils.jsonstream import iter_json_array, iter_json_items
+from utils.schemas import PRODUCT_SCHEMA
+from utils.validation import assert_stream_valid
+
+
+def split_randomly(raw, rng, pieces):
+    cuts = sorted(rng.sample(range(1, len(raw)), min(pieces, len(raw) - 1)))
+    return [raw[a:b] for a, b in zip([0, *cuts], [*cuts, len(raw)])]
+
+
+def streamed_catalog(count, chunk_size=8192):
+    """Yield a ``count``-product JSON array in chunks without building it"""
+    products = CatalogGenerator(products=count).products
+    buffer = bytearray(b"[")
+    for index, product in enumerate(products):
+        if index:
+            buffer += b","
+        buffer += json.dumps(product).encode()
+        if len(buffer) >= chunk_size:
+            yield bytes(buffer)
+            buffer.clear()
+    yield bytes(buffer + b"]")
+
+
+@pytest.mark.harness
+@allure.feature("Streaming JSON")
+@allure.story("Chunk boundaries")
+def test_items_survive_any_chunk_boundary():
+    """Test that splitting the body anywhere decodes to the same items"""
+    rng = random.Random(0)
+    values = [
+        1,
+        -2.5e3,
+        1e-7,
+        'é"]}\U0001f600',
+        None,
+        False,
+        {"a": [1, {"b": "}"}]},
+        [],
+    ]
+    for _ in range(300):
+        items = [rng.choice(values) for _ in range(rng.randint(0, 15))]
+        raw = json.dumps(items, ensure_ascii=rng.random() < 0.5).encode()
+        chunks = split_randomly(raw, rng, rng.randint(0, 20))
+        assert list(iter_json_array(chunks)) == items
+
+
+@pytest.mark.harness
+@allure.feature("Streaming JSON")
+@allure.story("Malformed bodies")
+@pytest.mark.parametrize("body", [b'{"a": 1}', b"[1, 2", b"[1 2]", b"[1,]", b"[1] x"])
+def test_malformed_bodies_raise(body):
+    """Test that non-arrays and broken arrays raise JSONDecodeError"""
+    with pytest.raises(json.JSONDecodeError):
+        list(iter_json_array([body[:3], body[3:]]))
+
+
+@pytest.mark.harness
+@allure.feature("Streaming JSON")
+@allure.story("Malformed bodies")
+@pytest.mark.parametrize(
+    "item",
+    [b'{"a" 1}', b'{"a": tx}', b'["\\q"]', b'"\\u12G4"', b'{"a": 1,}'],
+    ids=[
+        "missing-colon",
+        "bad-literal",
+        "bad-escape",
+        "bad-unicode-escape",
+        "trailing-comma",
+    ],
+)
+def test_malformed_items_raise_without_reading_on(item):
+    """Test that an item broken inside the buffer fails before the next chunk"""
+    read = []
+
+    def chunks():
+        yield b"[1, " + item
+        for index in range(100):
+            read.append(index)
+            yield b", 1"
+        yield b"]"
+
+    with pytest.raises(json.JSONDecodeError):
+        list(iter_json_array(chunks()))
+    assert read == []
+
+
+@pytest.mark.harness
+@allure.feature("Streaming JSON")
+@allure.story("Constant memory")
+def test_peak_memory_does_not_grow_with_response_size():
+    """Test that streaming validation memory is flat in the item count"""
+
+    def peak(count):
+        # --memprofile may already be tracing the whole session
+        tracing = tracemalloc.is_tracing()
+        if not tracing:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        start = tracemalloc.get_traced_memory()[0]
+        try:
+            checked = assert_stream_valid(
+                iter_json_array(streamed_catalog(count)), PRODUCT_SCHEMA
+            )
+            return checked, tracemalloc.get_traced_memory()[1] - start
+        finally:
+            if not tracing:
+                tracemalloc.stop()
+
+    small_count, small_peak = peak(1_000)
+    large_count, large_peak = peak(20_000)
+    assert (small_count, large_count) == (1_000, 20_000)
+    assert large_peak < small_peak * 1.5
+
+
+@pytest.mark.harness
+@allure.feature("Streaming JSON")
+@allure.story("Early failure")
+def test_first_invalid_item_fails_before_the_download_ends():
+    """Test that a bad item is reported while later chunks are unread"""
+    sent = []
+
+    def chunks():
+        yield b'[{"id": 1, "title": "ok", "price": 1, "category": "c", "image": "i"},'
+        yield b'{"id": "two"},'
+        for index in range(1000):
+            sent.append(index)
+            yield b'{"id": 3},'
+        yield b"{}]"
+
+    with pytest.raises(AssertionError, match=r"item \[1\] id"):
+        assert_stream_valid(iter_json_array(chunks()), PRODUCT_SCHEMA)
+    assert len(sent) <= 1
+
+
+@pytest.mark.harness
+@allure.feature("Streaming JSON")
+@allure.story("Response streaming")
+def test_streamed_response_is_timed(mock_only, api_client, http_timings):
+    """Test that streamed bytes and decode time land in the timing record"""
+    response = api_client.list_users(stream=True)
+    users = list(iter_json_items(response, chunk_size=64))
+
+    assert len(users) > 0
+    timing = http_timings[-1]
+    assert timing.bytes == len(json.dumps(users).encode())
+    assert timing.decode > 0
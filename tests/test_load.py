@@ -0,0 +1,90 @@
+import random
+
+import allure
+import pytest
+
+from utils.histogram import LatencyHistogram
+from utils.loadtest import LoadSpec, LoadStats, Scenario, parse_load_spec, run_load
+
+
+@pytest.mark.harness
+@allure.feature("Load testing")
+@allure.story("Load spec")
+def test_parse_load_spec():
+    """Test parsing of the --load option"""
+    spec = parse_load_spec("users=200,duration=60s,rate=500/s")
+    assert spec == LoadSpec(users=200, duration=60.0, rate=500.0)
+    assert parse_load_spec("duration=2m,rate=120/m") == LoadSpec(10, 120.0, 2.0)
+    with pytest.raises(ValueError):
+        parse_load_spec("workers=3")
+
+
+@pytest.mark.harness
+@allure.feature("Load testing")
+@allure.story("Latency histogram")
+def test_histogram_percentiles_within_precision():
+    """Test that bucketed percentiles stay within the histogram precision"""
+    rng = random.Random(7)
+    values = sorted(int(rng.lognormvariate(8, 1.5)) for _ in range(20000))
+    histogram = LatencyHistogram()
+    for value in values:
+        histogram.record(value)
+    for percent in (50, 95, 99):
+        exact = values[round(len(values) * percent / 100) - 1]
+        assert abs(histogram.percentile(percent) - exact) <= exact / 64 + 1
+    assert histogram.percentile(100) == values[-1]
+    assert len(histogram._counts) < 4096
+
+
+@pytest.mark.harness
+@allure.feature("Load testing")
+@allure.story("Offline load run")
+def test_run_load_against_mock(api_client, mock_router):
+    """Test a short paced load run against the in-process mock"""
+    stats = LoadStats()
+    listener = stats.request_listener(mock_router.endpoint_for)
+    api_client.add_listener(listener)
+    try:
+        run_load(
+            [
+                Scenario("product", lambda: api_client.get_product(3), 3),
+                Scenario("carts", lambda: api_client.list_carts(), 1),
+            ],
+            LoadSpec(users=4, duration=0.5, rate=200),
+            stats=stats,
+        )
+    finally:
+        api_client.remove_listener(listener)
+
+    report = stats.report()
+    endpoints = {row["name"]: row for row in report["endpoints"]}
+    assert set(endpoints) == {"GET /products/{id}", "GET /carts"}
+    assert endpoints["GET /products/{id}"]["count"] > endpoints["GET /carts"]["count"]
+    total = sum(row["count"] for row in report["scenarios"])
+    # Paced at 200/s for 0.5s
+    assert 50 <= total <= 101
+    assert all(row["errors"] == 0 for row in report["scenarios"])
+
+
+@pytest.mark.harness
+@allure.feature("Load testing")
+@allure.story("Offline load run")
+def test_load_counts_client_errors_and_async_requests(
+    api_client, mock_router, run_async, async_listeners
+):
+    """Test that 4xx responses are errors and async requests are recorded"""
+    stats = LoadStats()
+    listener = stats.request_listener(mock_router.endpoint_for)
+    api_client.add_listener(listener)
+    async_listeners.append(listener)
+    try:
+        api_client.request("GET", "/carts?limit=abc")
+        run_async(lambda client: client.get_cart(1))
+    finally:
+        api_client.remove_listener(listener)
+        async_listeners.remove(listener)
+
+    endpoints = {row["name"]: row for row in stats.report()["endpoints"]}
+    assert endpoints["GET /carts"]["errors"] == 1
+    assert endpoints["GET /carts/{id}"]["count"] == 1
+    assert endpoints["GET /carts/{id}"]["errors"] == 0
@@ -0,0 +1,50 @@
+import tracemalloc
+
+import allure
+import pytest
+
+from utils.memprofile import allocation_sites, check_peak
+
+
+@pytest.fixture
+def tracing():
+    """tracemalloc with a few frames, unless --memprofile is already tracing"""
+    started = not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start(4)
+    tracemalloc.clear_traces()
+    yield
+    if started:
+        tracemalloc.stop()
+
+
+@pytest.mark.harness
+@allure.feature("Memory profiling")
+@allure.story("Peak baselines")
+def test_peak_growth_needs_threshold_and_floor():
+    """Test that only growth past both the ratio and the floor is flagged"""
+    samples = [1000, 1200, 1100]
+    assert check_peak("t", 1100 * 1024, []) is None
+    # 45% over the median but only 500KB: under the floor
+    assert check_peak("t", 1600 * 1024, samples, floor_kb=600) is None
+    # 600KB over but only 9%: under the threshold
+    assert check_peak("t", 1700 * 1024, [5500] * 3, floor_kb=256) is None
+    regression = check_peak("t", 2200 * 1024, samples)
+    assert regression == ("t", 1100, 2200.0, 2.0)
+
+
+@pytest.mark.harness
+@allure.feature("Memory profiling")
+@allure.story("Allocation sites")
+def test_allocation_sites_point_at_the_allocating_line(request, tracing):
+    """Test that the largest site is the line that built the big list"""
+    kept = [str(index) * 10 for index in range(50_000)]
+    sites = allocation_sites(
+        tracemalloc.take_snapshot(), request.config.rootpath, limit=3
+    )
+    assert len(sites) <= 3
+    top = sites[0]
+    assert top.location.startswith("tests/test_memprofile.py:")
+    assert top.size >= 50_000 * 40
+    assert top.count >= 50_000
+    del kept
@@ -0,0 +1,100 @@
+import allure
+import pytest
+
+from utils.client import FakeStoreClient
+from utils.fakestore import FakeStore
+from utils.parallel import case_group, expected_durations, plan_shards
+from utils.perfstats import Baseline
+from utils.plugins.timing import EndpointTimings
+from utils.router import MockRouter
+from utils.standin import NAMESPACE_HEADER, StandInServer, namespace_url
+from utils.timing import RequestTiming
+
+
+@pytest.fixture
+def stand_in(responses_mock):
+    """A small FakeStore served over local HTTP"""
+    store = FakeStore(
+        carts=[{"id": 1, "userId": 1, "date": "2020-03-02", "products": []}]
+    )
+    router = store.mount(MockRouter("http://stand-in"))
+    with StandInServer(router, store) as server:
+        if responses_mock is not None:
+            responses_mock.add_passthru(server.url)
+        yield server.url
+
+
+def shard_names(nodeids, shards):
+    return [[nodeids[index] for index in shard] for shard in shards]
+
+
+@pytest.mark.harness
+@allure.feature("Parallel runs")
+@allure.story("Sharding")
+def test_shards_balance_recorded_durations():
+    """Test that a slow test gets a shard of its own"""
+    nodeids = ["t.py::slow", *(f"t.py::fast[{i}]" for i in range(6))]
+    shards = plan_shards(nodeids, [60, 10, 10, 10, 10, 10, 10], workers=2)
+    assert shard_names(nodeids, shards)[0] == ["t.py::slow"]
+    assert len(shards[1]) == 6
+
+
+@pytest.mark.harness
+@allure.feature("Parallel runs")
+@allure.story("Sharding")
+def test_shards_spread_parametrized_cases():
+    """Test that each test's cases are spread over every worker"""
+    nodeids = [f"t.py::{name}[{i}]" for name in ("a", "b") for i in range(6)]
+    shards = plan_shards(nodeids, [1.0] * len(nodeids), workers=3)
+    for shard in shard_names(nodeids, shards):
+        groups = [case_group(nodeid) for nodeid in shard]
+        assert groups.count("t.py::a") == 2
+        assert groups.count("t.py::b") == 2
+        # Collection order within the shard
+        assert shard == sorted(shard, key=nodeids.index)
+
+
+@pytest.mark.harness
+@allure.feature("Parallel runs")
+@allure.story("Sharding")
+def test_unrecorded_tests_count_as_the_median(tmp_path):
+    """Test that tests missing from the baseline get the median duration"""
+    baseline = Baseline(str(tmp_path / "baseline.json"))
+    baseline.extend("tests", "a", [10, 30, 20])
+    baseline.extend("tests", "b", [40])
+    assert expected_durations(["a", "b", "new"], baseline) == [20, 40, 30]
+    assert expected_durations(["new"], Baseline("missing.json")) == [1.0]
+
+
+@pytest.mark.harness
+@allure.feature("Parallel runs")
+@allure.story("Merged reports")
+def test_worker_timings_merge():
+    """Test that endpoint totals sent by workers merge into the same table"""
+    merged, single = EndpointTimings(), EndpointTimings()
+    for total in (0.001, 0.002, 0.010):
+        timing = RequestTiming("GET", "https://api.test/products/1")
+        timing.status, timing.total = 200, total
+        single.add(timing)
+        worker = EndpointTimings()
+        worker.add(timing)
+        merged.merge(worker.as_dict())
+    assert merged.row() == single.row()
+
+
+@pytest.mark.harness
+@allure.feature("Parallel runs")
+@allure.story("Shared backend")
+def test_namespaces_isolate_writes_on_a_shared_backend(stand_in):
+    """Test that one worker's writes are invisible to others until dropped"""
+    with FakeStoreClient(stand_in) as gw0, FakeStoreClient(stand_in) as gw1:
+        gw0.session.headers[NAMESPACE_HEADER] = "gw0"
+        gw1.session.headers[NAMESPACE_HEADER] = "gw1"
+        assert gw0.delete_cart(1).status_code == 200
+        assert gw0.get_cart(1).status_code == 404
+        assert gw1.get_cart(1).status_code == 200
+        created = gw1.create_cart({"userId": 2, "products": []}).json()
+        assert gw0.get_cart(created["id"]).status_code == 404
+
+        assert gw0.session.delete(namespace_url(stand_in, "gw0")).status_code == 200
+        assert gw0.get_cart(1).status_code == 200
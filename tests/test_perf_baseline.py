@@ -0,0 +1,59 @@
+import random
+
+import allure
+import pytest
+
+from utils.perfstats import Baseline, detect_regression, mann_whitney_u
+
+
+@pytest.mark.harness
+@allure.feature("Latency baselines")
+@allure.story("Mann-Whitney U")
+def test_mann_whitney_detects_shift_only():
+    """Test that a real shift is significant and identical samples are not"""
+    rng = random.Random(1)
+    baseline = [rng.gauss(20, 2) for _ in range(50)]
+    slower = [rng.gauss(30, 2) for _ in range(50)]
+    same = [rng.gauss(20, 2) for _ in range(50)]
+    assert mann_whitney_u(slower, baseline) < 0.001
+    assert mann_whitney_u(same, baseline) > 0.05
+    assert mann_whitney_u(baseline, slower) > 0.99
+
+
+@pytest.mark.harness
+@allure.feature("Latency baselines")
+@allure.story("Regression detection")
+def test_noise_floor_and_threshold_suppress_flaky_failures():
+    """Test that small absolute or relative slowdowns are not flagged"""
+    baseline = [0.2 + i * 0.001 for i in range(50)]
+    # 5x slower but only ~1ms in absolute terms: below the noise floor
+    assert detect_regression("k", [1.0] * 20, baseline) is None
+    # Significant but only 10% slower: below the threshold
+    assert detect_regression("k", [110.0] * 20, [100.0] * 50, threshold=0.25) is None
+    regression = detect_regression(
+        "k", [150.0] * 20, [100.0 + i % 3 for i in range(50)]
+    )
+    assert regression is not None and regression.ratio == pytest.approx(1.49, abs=0.01)
+
+
+@pytest.mark.harness
+@allure.feature("Latency baselines")
+@allure.story("Baseline file")
+def test_baseline_keeps_rolling_window(tmp_path):
+    """Test that the baseline keeps the most recent samples per key"""
+    path = str(tmp_path / "baseline.json")
+    baseline = Baseline(path, window=3)
+    baseline.extend("endpoints", "GET /products", [1, 2])
+    baseline.extend("endpoints", "GET /products", [3, 4])
+    baseline.save()
+    assert Baseline.load(path).get("endpoints", "GET /products") == [2, 3, 4]
+
+
+@pytest.mark.harness
+@pytest.mark.latency_budget(p95_ms=0.000001)
+@allure.feature("Latency baselines")
+@allure.story("Latency budget")
+@pytest.mark.xfail(reason="any request exceeds a 1ns budget", strict=True)
+def test_latency_budget_fails_slow_test(api_client):
+    """Test that exceeding the latency budget fails the test"""
+    assert api_client.get_product(1).status_code == 200
@@ -1,58 +1,50 @@
 import allure
 import pytest
-import requests
 
-
-def validate_product_data(product):
-    """Helper function to validate product data types and required fields"""
-    assert isinstance(product["id"], int)
-    assert isinstance(product["title"], str)
-    assert isinstance(product["price"], (int, float))
-    assert isinstance(product["category"], str)
-    assert isinstance(product["image"], str)
-    if "description" in product:
-        assert isinstance(product["description"], str)
+from utils.aclient import gather_bounded
+from utils.columnar import assert_no_violations, check_products
+from utils.jsonstream import iter_json_items
+from utils.schemas import PRODUCT_SCHEMA
+from utils.validation import assert_stream_valid, validate_product_data
 
 
 @pytest.mark.smoke
 @pytest.mark.regression
+@pytest.mark.latency_budget(p95_ms=2000)
 @allure.feature("Products API")
 @allure.story("Get all products")
-def test_get_all_products(base_url):
+def test_get_all_products(api_client):
     """Test retrieving all products from Fake Store API"""
-    response = requests.get(f"{base_url}/products")
+    response = api_client.list_products(stream=True)
     assert response.status_code == 200
-    products = response.json()
-    assert isinstance(products, list)
-    assert len(products) > 0
-    # Check that each product has required fields
-    for product in products[:5]:  # Check first 5
-        assert "id" in product
-        assert "title" in product
-        assert "price" in product
-        # Data type validation
-        validate_product_data(product)
+    # Items are validated as they are decoded; the list is never materialized
+    count = assert_stream_valid(iter_json_items(response), PRODUCT_SCHEMA)
+    assert count > 0
 
 
 @pytest.mark.regression
 @allure.feature("Products API")
 @allure.story("Get all products not empty")
-def test_get_all_products_not_empty(base_url):
-    response = requests.get(f"{base_url}/products")
+def test_get_all_products_not_empty(api_client):
+    response = api_client.list_products()
     products = response.json()
 
     assert len(products) > 0
     assert products[-1]["id"] is not None
+    # Unique IDs, valid prices and known categories across the whole list
+    categories = api_client.list_categories().json()
+    assert_no_violations(check_products(products, categories))
 
 
 @pytest.mark.smoke
 @pytest.mark.regression
-@pytest.mark.parametrize("product_id", [1, 2, 3, 5, 10])
+@pytest.mark.latency_budget(p95_ms=1000)
+@pytest.mark.spec("products", "get")
 @allure.feature("Products API")
 @allure.story("Get single product")
-def test_get_single_product(base_url, product_id):
+def test_get_single_product(api_client, product_id):
     """Test retrieving a single product"""
-    response = requests.get(f"{base_url}/products/{product_id}")
+    response = api_client.get_product(product_id)
     assert response.status_code == 200
     product = response.json()
     assert product["id"] == product_id
@@ -66,9 +58,9 @@ def test_get_single_product(base_url, product_id):
 @pytest.mark.smoke
 @allure.feature("Products API")
 @allure.story("Get product categories")
-def test_get_product_categories(base_url):
+def test_get_product_categories(api_client):
     """Test retrieving product categories"""
-    response = requests.get(f"{base_url}/products/categories")
+    response = api_client.list_categories()
     assert response.status_code == 200
     categories = response.json()
     assert isinstance(categories, list)
@@ -76,14 +68,12 @@ def test_get_product_categories(base_url):
 
 
 @pytest.mark.regression
-@pytest.mark.parametrize(
-    "category", ["electronics", "jewelery", "men's clothing", "women's clothing"]
-)
+@pytest.mark.spec("products", "category")
 @allure.feature("Products API")
 @allure.story("Get products by category")
-def test_get_products_by_category(base_url, category):
+def test_get_products_by_category(api_client, category):
     """Test retrieving products by category"""
-    response = requests.get(f"{base_url}/products/category/{category}")
+    response = api_client.list_products_in_category(category)
     assert response.status_code == 200
     products = response.json()
     assert isinstance(products, list)
@@ -96,16 +86,20 @@ def test_get_products_by_category(base_url, category):
 @pytest.mark.regression
 @allure.feature("Products API")
 @allure.story("Last product in each category")
-def test_last_product_in_each_category(base_url):
+def test_last_product_in_each_category(api_client, run_async):
     """Test that the last product in each category has the correct category"""
     # Get all categories
-    response = requests.get(f"{base_url}/products/categories")
+    response = api_client.list_categories()
     assert response.status_code == 200
     categories = response.json()
 
-    # For each category, get products and check the last one
-    for category in categories:
-        response = requests.get(f"{base_url}/products/category/{category}")
+    # Fetch every category concurrently, then check the last product of each
+    async def fetch_categories(client):
+        return await gather_bounded(
+            [client.list_products_in_category(category) for category in categories]
+        )
+
+    for category, response in zip(categories, run_async(fetch_categories)):
         assert response.status_code == 200
         products = response.json()
         assert isinstance(products, list)
@@ -119,11 +113,11 @@ def test_last_product_in_each_category(base_url):
 
 
 @pytest.mark.regression
-@pytest.mark.parametrize("product_id", [9999, 0, -1])
+@pytest.mark.spec("products", "missing")
 @allure.feature("Products API")
 @allure.story("Nonexistent product")
-def test_nonexistent_product(base_url, product_id):
-    response = requests.get(f"{base_url}/products/{product_id}")
+def test_nonexistent_product(api_client, product_id):
+    response = api_client.get_product(product_id)
     assert (
         response.status_code == 200
     )  # Fake Store API always returns 200 for these IDs
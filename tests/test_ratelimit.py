@@ -0,0 +1,227 @@
+import asyncio
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler
+
+import allure
+import pytest
+
+from utils.aclient import AsyncFakeStoreClient, gather_bounded, router_transport
+from utils.client import FakeStoreClient
+from utils.faults import FaultProfile, FixedLatency
+from utils.ratelimit import (
+    AdaptiveConcurrency,
+    LimitRule,
+    RateLimiter,
+    TokenBucket,
+    parse_rule,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class LimitingHandler(BaseHTTPRequestHandler):
+    """Stand-in that throttles like a public API: 429 over the rate, 503 over
+    the number of requests in flight"""
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            now = time.monotonic()
+            server.tokens = min(
+                server.burst, server.tokens + (now - server.updated) * server.rate
+            )
+            server.updated = now
+            if server.tokens >= 1:
+                server.tokens -= 1
+                status = 200
+            else:
+                status = 429
+            if status == 200 and server.in_flight >= server.max_in_flight:
+                status = 503
+            server.statuses.append(status)
+            server.in_flight += status == 200
+        if status == 200:
+            time.sleep(server.delay)
+            with server.lock:
+                server.in_flight -= 1
+        body = json.dumps({"status": status}).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        if status == 429:
+            self.send_header("Retry-After", "1")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def limited_api(local_server):
+    """Serve ``LimitingHandler`` with the given limits on a free local port"""
+
+    def serve(rate, burst, max_in_flight=1000, delay=0.0):
+        return local_server(
+            LimitingHandler,
+            rate=rate,
+            burst=burst,
+            tokens=burst,
+            updated=time.monotonic(),
+            max_in_flight=max_in_flight,
+            in_flight=0,
+            delay=delay,
+            statuses=[],
+            lock=threading.Lock(),
+        )
+
+    return serve
+
+
+def hammer(client, requests_made, workers):
+    with ThreadPoolExecutor(workers) as pool:
+        list(pool.map(lambda i: client.get_product(i).close(), range(requests_made)))
+
+
+@pytest.mark.harness
+@allure.feature("Rate limiting")
+@allure.story("Rules")
+def test_parse_rule():
+    """Test that rate limit rules parse host, path, rate and burst"""
+    assert parse_rule("10/s") == LimitRule(None, None, 10.0, None)
+    assert parse_rule("fakestoreapi.com=2.5/s:burst=5") == LimitRule(
+        "fakestoreapi.com", None, 2.5, 5
+    )
+    assert parse_rule("/carts=1/s") == LimitRule(None, "/carts", 1.0, None)
+    assert parse_rule("fakestoreapi.com/carts=3/s").path == "/carts"
+    with pytest.raises(ValueError):
+        parse_rule("fast")
+
+
+@pytest.mark.harness
+@allure.feature("Rate limiting")
+@allure.story("Token bucket")
+def test_token_bucket_allows_bursts_then_paces():
+    """Test that the bucket spends its burst and then spaces out requests"""
+    clock = FakeClock()
+    bucket = TokenBucket(rate=10, burst=3, clock=clock)
+    assert [bucket.reserve() for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert bucket.reserve() == pytest.approx(0.1)
+    assert bucket.reserve() == pytest.approx(0.2)
+    clock.now = 1.0
+    assert bucket.reserve() == 0.0
+
+
+@pytest.mark.harness
+@allure.feature("Rate limiting")
+@allure.story("Rules")
+def test_rules_apply_by_host_and_path():
+    """Test that a request is paced by every rule it matches and no others"""
+    clock = FakeClock()
+    limiter = RateLimiter(
+        ["api.test/carts=1/s:burst=1", "other.test=1/s:burst=1"],
+        clock=clock,
+        sleep=clock.sleep,
+    )
+    for _ in range(3):
+        limiter.acquire("https://api.test/products/1")
+    assert limiter.waited == 0
+    limiter.acquire("https://api.test/carts/1")
+    limiter.acquire("https://api.test/carts/2")
+    assert limiter.waited == pytest.approx(1.0)
+
+
+@pytest.mark.harness
+@allure.feature("Rate limiting")
+@allure.story("Adaptive concurrency")
+def test_adaptive_concurrency_is_aimd():
+    """Test additive increase on success and one halving per round trip"""
+    clock = FakeClock()
+    concurrency = AdaptiveConcurrency(initial=4, maximum=5, clock=clock)
+    for _ in range(5):
+        concurrency.acquire()
+        concurrency.release(0.1, congested=False)
+    assert concurrency.limit == 5
+    for _ in range(3):
+        concurrency.acquire()
+    for _ in range(3):
+        concurrency.release(0.1, congested=True)
+    assert concurrency.limit == pytest.approx(2.5, abs=0.05)
+    assert concurrency.decreases == 1
+    clock.now = 1.0
+    concurrency.acquire()
+    concurrency.release(1.0, congested=False)
+    assert concurrency.decreases == 2
+
+
+@pytest.mark.harness
+@allure.feature("Rate limiting")
+@allure.story("Token bucket")
+def test_rate_limit_avoids_429s(limited_api):
+    """Test that pacing below the server's rate avoids throttling"""
+    server, base_url = limited_api(rate=50, burst=5)
+    with FakeStoreClient(base_url) as client:
+        hammer(client, 30, workers=8)
+    assert 429 in server.statuses
+
+    # Half the server's rate leaves room for scheduling jitter between threads
+    server, base_url = limited_api(rate=50, burst=5)
+    limiter = RateLimiter(["25/s:burst=3"])
+    with FakeStoreClient(base_url, limiter=limiter) as client:
+        hammer(client, 30, workers=8)
+    assert server.statuses.count(200) == 30
+    assert limiter.throttled == 0
+    assert limiter.waited > 0
+
+
+@pytest.mark.harness
+@allure.feature("Rate limiting")
+@allure.story("Adaptive concurrency")
+def test_adaptive_concurrency_backs_off_on_503s(limited_api):
+    """Test that the limit backs off when the server rejects overload"""
+    server, base_url = limited_api(rate=1000, burst=1000, max_in_flight=2, delay=0.02)
+    concurrency = AdaptiveConcurrency(initial=8, maximum=8)
+    limiter = RateLimiter(concurrency=concurrency)
+    with FakeStoreClient(base_url, limiter=limiter) as client:
+        hammer(client, 60, workers=8)
+    assert concurrency.decreases >= 1
+    assert concurrency.limit < 8
+    assert server.statuses.count(503) == limiter.throttled
+
+
+@pytest.mark.harness
+@allure.feature("Rate limiting")
+@allure.story("Async client")
+def test_async_requests_go_through_the_limiter(mock_only, base_url, mock_router):
+    """Test that async fan-out is paced and capped by the shared limiter"""
+    concurrency = AdaptiveConcurrency(initial=2, maximum=2)
+    limiter = RateLimiter(["100/s:burst=1"], concurrency=concurrency)
+
+    async def main():
+        transport = router_transport(mock_router)
+        async with AsyncFakeStoreClient(
+            base_url, transport=transport, limiter=limiter
+        ) as client:
+            requests = [client.get_product(i) for i in range(1, 7)]
+            return await gather_bounded(requests, limit=6)
+
+    started = time.perf_counter()
+    with mock_router.inject_faults(FaultProfile(latency=FixedLatency(50))):
+        responses = asyncio.run(main())
+    # Three waves of two 50ms requests, not one wave of six
+    assert time.perf_counter() - started >= 0.15
+    assert [r.status_code for r in responses] == [200] * 6
+    assert limiter.waited > 0
+    assert concurrency.in_flight == 0
@@ -0,0 +1,124 @@
+import json
+from array import array
+
+import allure
+import pytest
+
+from utils.bench import retained_bytes
+from utils.datagen import CatalogGenerator
+from utils.fakestore import FakeStore
+from utils.jsonstream import iter_json_array
+from utils.records import RECORD_TYPES, Cart, Product, iter_records
+from utils.router import MockRouter
+
+
+@pytest.mark.harness
+@allure.feature("Compact records")
+@allure.story("JSON round trip")
+@pytest.mark.parametrize("resource", RECORD_TYPES)
+def test_records_round_trip_generated_catalog(resource):
+    """Test that records convert back to exactly the JSON they came from"""
+    generator = CatalogGenerator(seed=3, products=200, users=200, carts=200)
+    rows = getattr(generator, resource)
+    for row in rows:
+        record = RECORD_TYPES[resource].from_json(row)
+        assert record == row
+        assert record.to_json() == row
+        assert list(record) == list(row)
+        assert json.dumps(record.to_json()) == json.dumps(row)
+
+
+@pytest.mark.harness
+@allure.feature("Compact records")
+@allure.story("Compact layout")
+def test_cart_products_are_parallel_int_arrays():
+    """Test that cart lines are stored as array('i') and read back as dicts"""
+    lines = [{"productId": 5, "quantity": 1}, {"productId": 7, "quantity": 3}]
+    cart = Cart.from_json({"id": 1, "userId": 2, "date": "2020-01", "products": lines})
+    assert cart.product_ids == array("i", [5, 7])
+    assert cart.quantities == array("i", [1, 3])
+    assert cart["products"] == lines
+    assert cart.extra is None
+
+
+@pytest.mark.harness
+@allure.feature("Compact records")
+@allure.story("Unknown shapes")
+@pytest.mark.parametrize(
+    "data",
+    [
+        {"id": 1, "products": [{"productId": 2**40, "quantity": 1}]},
+        {"id": 1, "products": [{"productId": "5", "quantity": 1}]},
+        {"id": 1, "products": [{"productId": 5, "quantity": 1, "note": "x"}]},
+        {"id": 1, "products": "none"},
+        {"id": 1, "coupon": "SAVE10"},
+    ],
+)
+def test_unexpected_values_are_kept_verbatim(data):
+    """Test that keys or values that do not fit the layout survive unchanged"""
+    record = Cart.from_json(data)
+    assert record.to_json() == data
+    assert record.extra
+
+
+@pytest.mark.harness
+@allure.feature("Compact records")
+@allure.story("Zero copy")
+def test_from_json_keeps_parsed_values():
+    """Test that strings are referenced, not copied, from the decoded JSON"""
+    data = {"id": 1, "title": "x" * 100, "rating": {"rate": 4.5, "count": 2}}
+    record = Product.from_json(data)
+    assert record["title"] is data["title"]
+    assert "price" not in record
+    with pytest.raises(KeyError):
+        record["price"]
+
+
+@pytest.mark.harness
+@allure.feature("Compact records")
+@allure.story("Response parsing")
+def test_streamed_items_parse_into_records():
+    """Test that a streamed list response can be parsed into records"""
+    products = list(CatalogGenerator(products=50).products)
+    chunks = [json.dumps(products).encode()]
+    records = list(iter_records(iter_json_array(chunks), Product))
+    assert all(isinstance(record, Product) for record in records)
+    assert records == products
+
+
+@pytest.mark.harness
+@allure.feature("Compact records")
+@allure.story("FakeStore backend")
+def test_compact_store_serves_json_and_accepts_writes():
+    """Test that a compact FakeStore answers with the same JSON as a dict store"""
+    generator = CatalogGenerator(seed=1, products=20, users=20, carts=20)
+    rows = (generator.products, generator.carts, generator.users)
+    plain = FakeStore(*rows)
+    store = FakeStore(*rows, compact=True)
+    plain_router = plain.mount(MockRouter("http://mock"))
+    compact_router = store.mount(MockRouter("http://mock"))
+
+    paths = ("/products/3", "/carts?startdate=2020-01-01", "/users", "/carts/user/4")
+    for path in paths:
+        url = f"http://mock{path}"
+        assert compact_router.dispatch("GET", url) == plain_router.dispatch("GET", url)
+
+    updated = store.update("carts", 2, {"products": [{"productId": 9, "quantity": 4}]})
+    assert isinstance(updated, Cart)
+    assert list(updated.product_ids) == [9]
+    assert store.carts_for_user(updated["userId"])
+
+
+@pytest.mark.harness
+@allure.feature("Compact records")
+@allure.story("Memory")
+def test_records_use_less_memory_than_dicts():
+    """Test that every record type is smaller than the equivalent dicts"""
+    generator = CatalogGenerator(products=2_000, users=2_000, carts=2_000)
+    for resource, record_type in RECORD_TYPES.items():
+        rows = getattr(generator, resource)
+        dict_bytes, dicts = retained_bytes(lambda: list(rows))
+        record_bytes, _ = retained_bytes(
+            lambda: [record_type.from_json(d) for d in dicts]
+        )
+        assert record_bytes < dict_bytes * 0.8, resource
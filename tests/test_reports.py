@@ -0,0 +1,56 @@
+import json
+
+import allure
+import pytest
+
+from utils.plugins.reports import split_allure_results, split_path
+
+
+def write_json(path, payload):
+    path.write_text(json.dumps(payload))
+
+
+@pytest.mark.harness
+@allure.feature("Reporting")
+@allure.story("Per-marker reports")
+def test_split_path_prefixes_the_marker():
+    """Test that split reports are written next to the main report"""
+    assert split_path("report.html", "smoke") == "smoke-report.html"
+    assert split_path("out/report.html", "regression") == "out/regression-report.html"
+
+
+@pytest.mark.harness
+@allure.feature("Reporting")
+@allure.story("Per-marker reports")
+def test_allure_results_are_split_by_tag(tmp_path):
+    """Test that only tagged results, their fixtures and attachments are copied"""
+    source = tmp_path / "allure-results"
+    source.mkdir()
+    write_json(
+        source / "a-result.json",
+        {
+            "uuid": "a",
+            "labels": [{"name": "tag", "value": "smoke"}],
+            "attachments": [{"source": "a1-attachment.json"}],
+            "steps": [{"attachments": [{"source": "a2-attachment.txt"}]}],
+        },
+    )
+    write_json(
+        source / "b-result.json",
+        {"uuid": "b", "labels": [{"name": "tag", "value": "regression"}]},
+    )
+    write_json(source / "c-container.json", {"uuid": "c", "children": ["a", "b"]})
+    write_json(source / "d-container.json", {"uuid": "d", "children": ["b"]})
+    for name in ("a1-attachment.json", "a2-attachment.txt", "environment.properties"):
+        (source / name).write_text("x")
+
+    target = tmp_path / "allure-results-smoke"
+    assert split_allure_results(source, target, "smoke") == 1
+
+    assert sorted(path.name for path in target.iterdir()) == [
+        "a-result.json",
+        "a1-attachment.json",
+        "a2-attachment.txt",
+        "c-container.json",
+        "environment.properties",
+    ]
@@ -0,0 +1,110 @@
+import allure
+import pytest
+import requests
+
+from utils.client import FakeStoreClient
+from utils.retry import RetryBudget, RetryPolicy, parse_retry_after
+from utils.router import json_response
+
+
+def flaky(statuses, headers=None):
+    """Handler answering with ``statuses`` in turn, then 200"""
+    remaining = list(statuses)
+
+    def handler(request):
+        if remaining:
+            return json_response({}, status=remaining.pop(0), headers=headers)
+        return json_response({"id": 1})
+
+    return handler
+
+
+@pytest.fixture
+def retrying_client(mock_only, base_url):
+    sleeps = []
+    policy = RetryPolicy(max_attempts=3, sleep=sleeps.append)
+    with FakeStoreClient(base_url, retry=policy) as client:
+        client.sleeps = sleeps
+        yield client
+
+
+@pytest.mark.harness
+@allure.feature("Retries")
+@allure.story("Transient failures")
+def test_transient_statuses_are_retried(retrying_client, mock_api_responses):
+    """Test that 503/502 responses are retried with jittered backoff"""
+    mock_api_responses.add("GET", "/products/{id:int}", handler=flaky([503, 502]))
+
+    response = retrying_client.get_product(1)
+
+    assert response.status_code == 200
+    assert len(retrying_client.sleeps) == 2
+    assert 0 <= retrying_client.sleeps[0] <= 0.2
+    assert 0 <= retrying_client.sleeps[1] <= 0.4
+
+
+@pytest.mark.harness
+@allure.feature("Retries")
+@allure.story("Transient failures")
+def test_retry_after_is_honoured(retrying_client, mock_api_responses):
+    """Test that a 429 waits for the server's Retry-After, even for POST"""
+    mock_api_responses.add(
+        "POST", "/carts", handler=flaky([429], headers={"Retry-After": "2"})
+    )
+
+    response = retrying_client.create_cart({"userId": 1, "products": []})
+
+    assert response.status_code == 200
+    assert retrying_client.sleeps == [2.0]
+
+
+@pytest.mark.harness
+@allure.feature("Retries")
+@allure.story("Permanent failures")
+@pytest.mark.parametrize(
+    "method, status",
+    [("GET", 500), ("GET", 404), ("POST", 502), ("PATCH", 504)],
+)
+def test_non_transient_failures_are_not_retried(
+    retrying_client, mock_api_responses, method, status
+):
+    """Test that server bugs and unsafe resends fail on the first attempt"""
+    mock_api_responses.add(method, "/products/{id:int}", handler=flaky([status]))
+
+    response = retrying_client.request(method, "/products/1")
+
+    assert response.status_code == status
+    assert retrying_client.sleeps == []
+
+
+@pytest.mark.harness
+@allure.feature("Retries")
+@allure.story("Budget")
+def test_budget_caps_retries_across_requests():
+    """Test that the shared budget stops retrying once it is spent"""
+    budget = RetryBudget(ratio=0.5, min_retries=1)
+    policy = RetryPolicy(max_attempts=5, budget=budget)
+    for _ in range(4):
+        budget.record_request()
+
+    timeout = requests.ReadTimeout()
+    allowed = [policy.should_retry(1, "GET", error=timeout) for _ in range(5)]
+
+    assert sum(delay is not None for delay in allowed) == 3
+    assert budget.retries == 3 and budget.exhausted == 2
+
+
+@pytest.mark.harness
+@allure.feature("Retries")
+@allure.story("Classification")
+def test_classification_and_retry_after_parsing():
+    """Test error classification and both Retry-After formats"""
+    policy = RetryPolicy()
+
+    assert policy.classify("GET", error=requests.ConnectionError())
+    assert policy.classify("POST", error=requests.ConnectTimeout())
+    assert not policy.classify("POST", error=requests.ReadTimeout())
+    assert not policy.classify("GET", error=requests.exceptions.InvalidURL())
+    assert parse_retry_after("7") == 7.0
+    assert parse_retry_after("Thu, 01 Jan 1970 00:00:10 GMT", now=4) == 6.0
+    assert parse_retry_after("soon") is None
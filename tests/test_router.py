@@ -0,0 +1,40 @@
+import allure
+import pytest
+
+pytestmark = pytest.mark.usefixtures("mock_only")
+
+
+@pytest.mark.harness
+@allure.feature("Mock layer")
+@allure.story("Patterned routes")
+def test_patterned_route_resolves_template(mock_api_responses):
+    """Test that patterned routes resolve to their template and parameters"""
+    route, params = mock_api_responses.match("GET", "/products/category/men's clothing")
+    assert route.template == "/products/category/{category}"
+    assert params == {"category": "men's clothing"}
+    assert mock_api_responses.template_for("GET", "/carts/5") == "/carts/{id}"
+
+
+@pytest.mark.harness
+@allure.feature("Mock layer")
+@allure.story("Copy-on-write overlay")
+def test_overlay_route_shadows_session_route(api_client, mock_api_responses):
+    """Test that a per-test route overrides the session route"""
+    mock_api_responses.add("GET", "/products/categories", json=["books"])
+    response = api_client.list_categories()
+    assert response.json() == ["books"]
+
+    mock_api_responses.remove("GET", "/products/{id:int}")
+    response = api_client.get_product(1)
+    assert response.status_code == 404
+
+
+@pytest.mark.harness
+@allure.feature("Mock layer")
+@allure.story("Copy-on-write overlay")
+def test_overlay_is_discarded_after_test(api_client, specs):
+    """Test that routes changed by the previous test are restored"""
+    categories = api_client.list_categories().json()
+    assert "books" not in categories
+    assert set(specs.specs["products"].categories) <= set(categories)
+    assert api_client.get_product(1).status_code == 200
@@ -0,0 +1,108 @@
+import json
+
+import allure
+import pytest
+
+from utils.fakestore import FakeStore
+from utils.router import MockRouter
+from utils.specs import SpecCatalog, SpecError, expand, parse_spec, seed_rows
+
+SPEC = {
+    "resource": "products",
+    "schema": "PRODUCT_SCHEMA",
+    "ids": {"start": 1, "stop": 6},
+    "categories": ["electronics", "jewelery"],
+    "derive": {"title": "Product {id}", "category": "{category}"},
+    "endpoints": {
+        "get": {"path": "/products/{product_id}", "cases": {"product_id": "ids"}},
+        "page": {
+            "path": "/products/category/{category}?limit={limit}",
+            "cases": {"category": "categories", "limit": [1, 5]},
+        },
+    },
+}
+
+SEED = {
+    "id": 1,
+    "title": "Seed",
+    "price": 1.5,
+    "category": "electronics",
+    "image": "https://example.com/1.jpg",
+    "description": "Seed product",
+}
+
+
+def _router():
+    return FakeStore().mount(MockRouter("http://specs.invalid"))
+
+
+@pytest.mark.harness
+@allure.feature("Endpoint Specs")
+@allure.story("Cases")
+def test_endpoint_cases_are_expanded_from_the_spec():
+    """Test that ranges, named value lists and products of them become cases"""
+    spec = parse_spec(SPEC)
+    cases = expand(spec, spec.endpoints["get"], _router())
+    assert [case.id for case in cases] == ["1", "2", "3", "4", "5", "6"]
+    assert cases[4].path == "/products/5"
+    assert cases[4].values == {"product_id": 5}
+    page = expand(spec, spec.endpoints["page"], _router())
+    assert [case.id for case in page] == [
+        "electronics-1",
+        "electronics-5",
+        "jewelery-1",
+        "jewelery-5",
+    ]
+
+    orders = {"path": "/orders/{id}", "cases": {"id": [1]}}
+    unrouted = parse_spec({**SPEC, "endpoints": {"x": orders}})
+    with pytest.raises(SpecError, match="no stand-in route for GET /orders/1"):
+        expand(unrouted, unrouted.endpoints["x"], _router())
+
+
+@pytest.mark.harness
+@allure.feature("Endpoint Specs")
+@allure.story("Stand-in data")
+def test_seed_rows_are_padded_to_the_id_range():
+    """Test that derived rows fill the ID range and are schema-checked"""
+    rows = seed_rows(parse_spec(SPEC), [SEED])
+    assert [row["id"] for row in rows] == [1, 2, 3, 4, 5, 6]
+    assert rows[0] == SEED
+    assert rows[1]["title"] == "Product 2"
+    assert [row["category"] for row in rows[1:]] == [
+        "jewelery",
+        "electronics",
+        "jewelery",
+        "electronics",
+        "jewelery",
+    ]
+    broken = parse_spec({**SPEC, "derive": {"price": "{id}"}})
+    with pytest.raises(SpecError, match="derived row 2 is invalid"):
+        seed_rows(broken, [SEED])
+
+
+@pytest.mark.harness
+@allure.feature("Endpoint Specs")
+@allure.story("Collection cache")
+def test_cases_are_cached_per_spec_hash(tmp_path):
+    """Test that unchanged specs load their cases and changed ones re-expand"""
+    directory = tmp_path / "specs"
+    directory.mkdir()
+    (directory / "products.json").write_text(json.dumps(SPEC))
+    cache = str(tmp_path / "cache.json")
+
+    first = SpecCatalog(str(directory), router=_router())
+    first.save(cache)
+    assert first.expanded == {"products"}
+
+    second = SpecCatalog(str(directory), router=_router())
+    second.load(cache)
+    assert second.values("products", "get", "product_id") == [1, 2, 3, 4, 5, 6]
+    assert second.expanded == set()
+
+    wider = {**SPEC, "ids": {"start": 1, "stop": 8}}
+    (directory / "products.json").write_text(json.dumps(wider))
+    third = SpecCatalog(str(directory), router=_router())
+    third.load(cache)
+    assert len(third.cases("products", "get")) == 8
+    assert third.expanded == {"products"}
@@ -0,0 +1,22 @@
+import allure
+import pytest
+
+
+@pytest.mark.harness
+@allure.feature("Instrumentation")
+@allure.story("Per-request timings")
+def test_requests_are_timed_per_endpoint(api_client, http_timings):
+    """Test that each request gets a timing record with its route template"""
+    api_client.get_product(3).json()
+    api_client.list_categories()
+
+    assert [timing.endpoint for timing in http_timings] == [
+        "GET /products/{id}",
+        "GET /products/categories",
+    ]
+    product = http_timings[0]
+    assert product.status == 200
+    assert product.bytes > 0
+    assert product.total >= product.ttfb > 0
+    assert product.decode > 0
+    assert http_timings[1].decode == 0
@@ -1,44 +1,30 @@
 import allure
 import pytest
-import requests
 
-
-def validate_user_data(user):
-    """Helper function to validate user data types and required fields"""
-    assert isinstance(user["id"], int)
-    assert isinstance(user["email"], str)
-    assert isinstance(user["username"], str)
-    assert isinstance(user["password"], str)
-    assert isinstance(user["name"], dict)
-    assert "firstname" in user["name"]
-    assert "lastname" in user["name"]
-    assert isinstance(user["phone"], str)
-    assert isinstance(user["address"], dict)
+from utils.jsonstream import iter_json_items
+from utils.schemas import USER_SCHEMA
+from utils.validation import assert_stream_valid, validate_user_data
 
 
 @pytest.mark.smoke
 @allure.feature("Users API")
 @allure.story("Get all users")
-def test_get_all_users(base_url):
+def test_get_all_users(api_client):
     """Test retrieving all users from Fake Store API"""
-    response = requests.get(f"{base_url}/users")
+    response = api_client.list_users(stream=True)
     assert response.status_code == 200
-    users = response.json()
-    assert isinstance(users, list)
-    assert len(users) > 0
-    # Check first 3 users
-    for user in users[:3]:
-        validate_user_data(user)
+    count = assert_stream_valid(iter_json_items(response), USER_SCHEMA)
+    assert count > 0
 
 
 @pytest.mark.smoke
 @pytest.mark.regression
-@pytest.mark.parametrize("user_id", [1, 2, 3, 5])
+@pytest.mark.spec("users", "get")
 @allure.feature("Users API")
 @allure.story("Get single user")
-def test_get_single_user(base_url, user_id):
+def test_get_single_user(api_client, user_id):
     """Test retrieving a single user"""
-    response = requests.get(f"{base_url}/users/{user_id}")
+    response = api_client.get_user(user_id)
     assert response.status_code == 200
     user = response.json()
     assert user["id"] == user_id
@@ -48,7 +34,7 @@ def test_get_single_user(base_url, user_id):
 @pytest.mark.regression
 @allure.feature("Users API")
 @allure.story("Create user")
-def test_create_user(base_url):
+def test_create_user(api_client):
     """Test creating a new user"""
     new_user = {
         "email": "test@example.com",
@@ -64,7 +50,7 @@ def test_create_user(base_url):
         },
         "phone": "123-456-7890",
     }
-    response = requests.post(f"{base_url}/users", json=new_user)
+    response = api_client.create_user(new_user)
     assert response.status_code == 201
     user = response.json()
     assert "id" in user
@@ -74,7 +60,7 @@ def test_create_user(base_url):
 @pytest.mark.regression
 @allure.feature("Users API")
 @allure.story("Update user")
-def test_update_user(base_url):
+def test_update_user(api_client):
     """Test updating an existing user"""
     user_id = 1
     update_data = {
@@ -91,7 +77,7 @@ def test_update_user(base_url):
         },
         "phone": "987-654-3210",
     }
-    response = requests.put(f"{base_url}/users/{user_id}", json=update_data)
+    response = api_client.update_user(user_id, update_data)
     assert response.status_code == 200
     user = response.json()
     assert user["email"] == update_data["email"]
@@ -101,8 +87,8 @@ def test_update_user(base_url):
 @pytest.mark.regression
 @allure.feature("Users API")
 @allure.story("Delete user")
-def test_delete_user(base_url):
+def test_delete_user(api_client):
     """Test deleting a user"""
     user_id = 1
-    response = requests.delete(f"{base_url}/users/{user_id}")
+    response = api_client.delete_user(user_id)
     assert response.status_code == 200
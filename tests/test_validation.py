@@ -0,0 +1,28 @@
+import allure
+import pytest
+from jsonschema import ValidationError
+
+from utils.schemas import PRODUCT_SCHEMA
+from utils.validation import get_validator, validate_many, validate_product_data
+
+
+@pytest.mark.harness
+@allure.feature("Validation")
+@allure.story("Bulk validation")
+def test_validate_many_collects_every_error():
+    """Test that all invalid items are reported in one pass"""
+    product = {"id": 1, "title": "t", "price": 1.0, "category": "c", "image": "i"}
+    items = [product, {**product, "price": "free"}, {"id": 3}, product]
+    errors = validate_many(items, PRODUCT_SCHEMA)
+    assert {error.index for error in errors} == {1, 2}
+    assert any(error.path == "price" for error in errors)
+
+
+@pytest.mark.harness
+@allure.feature("Validation")
+@allure.story("Cached validators")
+def test_validators_are_compiled_once():
+    """Test that the same validator instance is reused across calls"""
+    assert get_validator(PRODUCT_SCHEMA) is get_validator(PRODUCT_SCHEMA)
+    with pytest.raises(ValidationError):
+        validate_product_data({"id": True, "title": "t"})
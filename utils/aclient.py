@@ -0,0 +1,177 @@
+"""asyncio client for fan-out request flows.
+
+Tests that fetch one resource and then N dependent ones (categories, then
+each category's products) should wait for the slowest request rather than
+the sum of all of them. ``AsyncFakeStoreClient`` wraps ``httpx.AsyncClient``
+and ``gather_bounded`` runs the requests concurrently under a cap. Against
+the mock, ``router_transport`` serves requests from the same ``MockRouter``
+the ``responses`` mock uses, so both clients see the same routes and state.
+It serves a replayed ``Cassette`` the same way, and ``RecordingTransport``
+records live responses into one.
+"""
+
+import asyncio
+import time
+from urllib.parse import quote
+
+import httpx
+
+from utils.cassette import replayable_headers
+from utils.client import DEFAULT_TIMEOUT, RequestEvent
+from utils.faults import InjectedReset
+
+
+async def _read_chunks(body, size=64 * 1024):
+    # A slowly streamed fault body, read without holding up the event loop
+    while True:
+        chunk = await asyncio.to_thread(body.read, size)
+        if not chunk:
+            return
+        yield chunk
+
+
+def router_transport(router):
+    """Build an httpx transport that dispatches through a ``MockRouter``
+
+    Injected connection resets surface as ``httpx.ReadError``.
+    """
+
+    async def handler(request):
+        try:
+            status, headers, body = await router.dispatch_async(
+                request.method, str(request.url), request.content
+            )
+        except InjectedReset as exc:
+            raise httpx.ReadError(str(exc), request=request) from exc
+        if hasattr(body, "read"):
+            body = _read_chunks(body)
+        return httpx.Response(status, headers=headers, content=body)
+
+    return httpx.MockTransport(handler)
+
+
+class RecordingTransport(httpx.AsyncBaseTransport):
+    """Send requests through ``transport`` and record them to a cassette"""
+
+    def __init__(self, writer, transport=None):
+        self.writer = writer
+        self.transport = transport or httpx.AsyncHTTPTransport()
+
+    async def handle_async_request(self, request):
+        response = await self.transport.handle_async_request(request)
+        try:
+            body = await response.aread()
+        finally:
+            await response.aclose()
+        self.writer.record(
+            request.method,
+            str(request.url),
+            request.content,
+            response.status_code,
+            response.headers,
+            body,
+        )
+        return httpx.Response(
+            response.status_code,
+            headers=replayable_headers(response.headers),
+            content=body,
+        )
+
+    async def aclose(self):
+        await self.transport.aclose()
+
+
+async def gather_bounded(awaitables, limit=10, return_exceptions=False):
+    """Await all ``awaitables`` with at most ``limit`` in flight, keeping order"""
+    semaphore = asyncio.Semaphore(limit)
+
+    async def bounded(awaitable):
+        async with semaphore:
+            return await awaitable
+
+    return await asyncio.gather(
+        *(bounded(awaitable) for awaitable in awaitables),
+        return_exceptions=return_exceptions,
+    )
+
+
+class AsyncFakeStoreClient:
+    """Async counterpart of ``FakeStoreClient`` for concurrent fan-out"""
+
+    def __init__(
+        self,
+        base_url,
+        transport=None,
+        timeout=DEFAULT_TIMEOUT,
+        limit=10,
+        headers=None,
+        listeners=None,
+        limiter=None,
+    ):
+        connect, read = timeout
+        self.base_url = base_url.rstrip("/")
+        # ``utils.ratelimit.RateLimiter`` shared with the sync client, if any
+        self.limiter = limiter
+        # Called with a ``RequestEvent`` after every request, like
+        # ``FakeStoreClient.add_listener``; a shared list sees later additions
+        self.listeners = listeners if listeners is not None else []
+        self._client = httpx.AsyncClient(
+            base_url=self.base_url,
+            transport=transport,
+            timeout=httpx.Timeout(read, connect=connect),
+            limits=httpx.Limits(max_connections=limit, max_keepalive_connections=limit),
+            headers={"Accept": "application/json", **(headers or {})},
+        )
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    async def aclose(self):
+        await self._client.aclose()
+
+    async def request(self, method, path, **kwargs):
+        url = f"{self.base_url}/{path.lstrip('/')}"
+        started = time.perf_counter()
+        response = error = None
+        try:
+            response = await self._send(method, url, kwargs)
+            return response
+        except httpx.HTTPError as e:
+            error = e
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            for listener in list(self.listeners):
+                listener(RequestEvent(method, url, response, elapsed, error))
+
+    async def _send(self, method, url, kwargs):
+        if self.limiter is None:
+            return await self._client.request(method, url, **kwargs)
+        async with self.limiter.slot_async(url) as record:
+            response = await self._client.request(method, url, **kwargs)
+            record(response)
+        return response
+
+    async def get(self, path, **kwargs):
+        return await self.request("GET", path, **kwargs)
+
+    async def list_products(self):
+        return await self.get("/products")
+
+    async def get_product(self, product_id):
+        return await self.get(f"/products/{product_id}")
+
+    async def list_categories(self):
+        return await self.get("/products/categories")
+
+    async def list_products_in_category(self, category):
+        return await self.get(f"/products/category/{quote(category)}")
+
+    async def get_cart(self, cart_id):
+        return await self.get(f"/carts/{cart_id}")
+
+    async def get_user(self, user_id):
+        return await self.get(f"/users/{user_id}")
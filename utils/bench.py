@@ -0,0 +1,78 @@
+"""Timing of small harness operations for the ``tests/benchmarks/`` suite.
+
+``measure`` works like ``timeit``: it calibrates how many calls make up one
+round of at least ``min_time`` seconds, then times ``repeat`` rounds and
+keeps every round's mean time per call as a sample. The samples, in
+microseconds, are what a run stores in its baseline and what the
+Mann-Whitney check in ``utils.perfstats`` compares. ``retained_bytes``
+measures memory instead, with tracemalloc.
+"""
+
+import gc
+import time
+import tracemalloc
+from collections import namedtuple
+from statistics import median
+
+Measurement = namedtuple("Measurement", ["name", "params", "loops", "samples_us"])
+
+
+def _time(func, loops):
+    start = time.perf_counter()
+    for _ in range(loops):
+        func()
+    return time.perf_counter() - start
+
+
+def calibrate(func, min_time=0.05):
+    """The number of calls of ``func`` taking at least ``min_time`` seconds"""
+    loops = 1
+    while True:
+        elapsed = _time(func, loops)
+        if elapsed >= min_time:
+            return loops
+        # Aim a little past min_time, at most 10x more calls per step
+        if elapsed > 0:
+            wanted = int(loops * min_time * 1.2 / elapsed)
+            loops = max(loops + 1, min(loops * 10, wanted))
+        else:
+            loops *= 10
+
+
+def measure(func, name, params=None, repeat=5, min_time=0.05):
+    """Time ``func`` and return a ``Measurement`` of microseconds per call"""
+    loops = calibrate(func, min_time)
+    gc_was_enabled = gc.isenabled()
+    gc.collect()
+    gc.disable()
+    try:
+        samples = [_time(func, loops) / loops * 1e6 for _ in range(repeat)]
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+    return Measurement(name, dict(params or {}), loops, [round(s, 3) for s in samples])
+
+
+def summarize(measurement):
+    """Median, minimum, spread and rate of a measurement"""
+    samples = sorted(measurement.samples_us)
+    middle = median(samples)
+    quarter = len(samples) // 4
+    return {
+        "median_us": round(middle, 3),
+        "min_us": samples[0],
+        "iqr_us": round(samples[-1 - quarter] - samples[quarter], 3),
+        "ops_per_s": round(1e6 / middle) if middle else None,
+    }
+
+
+def retained_bytes(build):
+    """Return the bytes retained by the result of ``build()``, and the result"""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        result = build()
+        return tracemalloc.get_traced_memory()[0] - before, result
+    finally:
+        tracemalloc.stop()
@@ -0,0 +1,237 @@
+"""Record/replay cassettes of real API responses.
+
+Hand-written mock data drifts from the real API. A cassette records the
+responses of a live run so later runs can replay them without the network.
+
+The file is written append-only while recording and read through ``mmap``
+while replaying, so a large cassette is neither parsed up front nor loaded
+into memory; only the entries a test asks for are touched. Layout, all
+integers little-endian::
+
+    MAGIC
+    entry*     status:u16 key_len:u32 headers_len:u32 body_len:u32
+               key headers(JSON) body
+    meta       JSON object, e.g. {"base_url": ...}
+    index      (key_hash:u64 offset:u64)* sorted by key_hash
+    footer     meta_offset:u64 meta_len:u64 index_offset:u64 count:u64 MAGIC
+
+Entries are keyed by ``"METHOD URL"`` plus a digest of the request body when
+there is one. Lookups binary-search the index and compare the stored key, so
+hash collisions are resolved exactly.
+"""
+
+import hashlib
+import json
+import mmap
+import re
+import struct
+
+from utils.router import METHODS
+
+MAGIC = b"FSCASS1\n"
+
+_ENTRY = struct.Struct("<HIII")
+_INDEX = struct.Struct("<QQ")
+_FOOTER = struct.Struct("<QQQQ")
+
+# Recorded bodies are already decoded and de-chunked, so these no longer apply
+_SKIPPED_HEADERS = {
+    "connection",
+    "content-encoding",
+    "content-length",
+    "keep-alive",
+    "transfer-encoding",
+}
+
+
+class CassetteError(Exception):
+    """Raised for a file that is not a valid cassette"""
+
+
+class CassetteMiss(LookupError):
+    """Raised on replay for a request that was never recorded"""
+
+
+def request_key(method, url, body=None):
+    """Return the cassette key of a request"""
+    key = f"{method.upper()} {url}"
+    if body:
+        if isinstance(body, str):
+            body = body.encode()
+        key += " " + hashlib.sha256(body).hexdigest()[:16]
+    return key.encode()
+
+
+def replayable_headers(headers):
+    """Drop the transfer headers that no longer apply to a decoded body"""
+    return {
+        name: value
+        for name, value in headers.items()
+        if name.lower() not in _SKIPPED_HEADERS
+    }
+
+
+def _key_hash(key):
+    return int.from_bytes(hashlib.blake2b(key, digest_size=8).digest(), "little")
+
+
+class CassetteWriter:
+    """Append recorded responses to a cassette file"""
+
+    def __init__(self, path, base_url=None):
+        self.path = path
+        self.base_url = base_url
+        self._file = open(path, "wb")
+        self._file.write(MAGIC)
+        self._index = []
+        self._keys = set()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        return len(self._index)
+
+    def record(self, method, url, request_body, status, headers, body):
+        """Store a response; only the first response of each request is kept"""
+        key = request_key(method, url, request_body)
+        if key in self._keys:
+            return False
+        self._keys.add(key)
+        raw_headers = json.dumps(replayable_headers(headers)).encode()
+        body = body.encode() if isinstance(body, str) else bytes(body or b"")
+        self._index.append((_key_hash(key), self._file.tell()))
+        self._file.write(_ENTRY.pack(status, len(key), len(raw_headers), len(body)))
+        self._file.write(key)
+        self._file.write(raw_headers)
+        self._file.write(body)
+        return True
+
+    def record_response(self, response):
+        """Store a ``requests`` response together with its request"""
+        request = response.request
+        self.record(
+            request.method,
+            request.url,
+            request.body,
+            response.status_code,
+            response.headers,
+            response.content,
+        )
+
+    def on_request(self, event):
+        """``FakeStoreClient`` listener recording every received response"""
+        if event.response is not None:
+            self.record_response(event.response)
+
+    def close(self):
+        """Write the metadata and index; the cassette is readable afterwards"""
+        if self._file.closed:
+            return
+        meta = json.dumps({"base_url": self.base_url}).encode()
+        meta_offset = self._file.tell()
+        self._file.write(meta)
+        index_offset = self._file.tell()
+        for entry in sorted(self._index):
+            self._file.write(_INDEX.pack(*entry))
+        self._file.write(
+            _FOOTER.pack(meta_offset, len(meta), index_offset, len(self._index))
+        )
+        self._file.write(MAGIC)
+        self._file.close()
+
+
+class Cassette:
+    """Memory-mapped, read-only view of a recorded cassette"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as file:
+            try:
+                self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                raise CassetteError(f"{path}: empty file") from None
+        tail = len(self._map) - len(MAGIC)
+        if (
+            tail < len(MAGIC) + _FOOTER.size
+            or self._map[: len(MAGIC)] != MAGIC
+            or self._map[tail:] != MAGIC
+        ):
+            self._map.close()
+            raise CassetteError(f"{path}: not a cassette or not closed")
+        meta_offset, meta_len, self._index_offset, self._count = _FOOTER.unpack_from(
+            self._map, tail - _FOOTER.size
+        )
+        meta = json.loads(self._map[meta_offset : meta_offset + meta_len])
+        self.base_url = meta.get("base_url")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        return self._count
+
+    def close(self):
+        self._map.close()
+
+    def _hash_at(self, position):
+        offset = self._index_offset + position * _INDEX.size
+        return _INDEX.unpack_from(self._map, offset)
+
+    def _find(self, key):
+        """Return the offset of the entry stored under ``key``, or None"""
+        target = _key_hash(key)
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            if self._hash_at(middle)[0] < target:
+                low = middle + 1
+            else:
+                high = middle
+        for position in range(low, self._count):
+            key_hash, offset = self._hash_at(position)
+            if key_hash != target:
+                break
+            key_len = _ENTRY.unpack_from(self._map, offset)[1]
+            start = offset + _ENTRY.size
+            if self._map[start : start + key_len] == key:
+                return offset
+        return None
+
+    def get(self, method, url, body=None):
+        """Return the recorded ``(status, headers, body)``, or None"""
+        offset = self._find(request_key(method, url, body))
+        if offset is None:
+            return None
+        status, key_len, headers_len, body_len = _ENTRY.unpack_from(self._map, offset)
+        start = offset + _ENTRY.size + key_len
+        headers = json.loads(self._map[start : start + headers_len])
+        start += headers_len
+        return status, headers, self._map[start : start + body_len]
+
+    def dispatch(self, method, url, body=None):
+        """Serve a recorded request like ``MockRouter.dispatch``"""
+        response = self.get(method, url, body)
+        if response is None:
+            raise CassetteMiss(f"{method.upper()} {url} is not in {self.path}")
+        return response
+
+    async def dispatch_async(self, method, url, body=None):
+        """Serve a recorded request like ``MockRouter.dispatch_async``"""
+        return self.dispatch(method, url, body)
+
+    def install(self, rsps):
+        """Serve every request to the recorded ``base_url`` from the cassette"""
+        pattern = re.compile(re.escape(self.base_url) + r"(?:[/?#].*)?$")
+        for method in METHODS:
+            rsps.add_callback(method, pattern, callback=self._on_request)
+        return rsps
+
+    def _on_request(self, request):
+        return self.dispatch(request.method, request.url, request.body)
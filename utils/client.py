@@ -0,0 +1,239 @@
+"""Pooled HTTP client for the FakeStore API.
+
+One ``requests.Session`` is shared for the whole test session so that
+connections are kept alive and reused instead of paying a new TCP and TLS
+handshake per call, as module-level ``requests.get`` does. Every response
+carries a ``timing`` record from ``utils.timing.InstrumentedAdapter``. With a
+``utils.httpcache.ResponseCache`` GET responses are cached and revalidated,
+with a ``utils.hedging.HedgePolicy`` or a ``deadline`` slow requests are
+hedged or abandoned, and a ``utils.ratelimit.RateLimiter`` paces every attempt
+that goes out over the network (cache hits are not held back).
+"""
+
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote
+
+import requests
+
+from utils.hedging import race
+from utils.httpcache import CachingAdapter
+from utils.timing import InstrumentedAdapter
+
+# (connect, read) timeouts in seconds
+DEFAULT_TIMEOUT = (3.05, 10)
+
+# Passed to listeners after every request; ``response`` is None on errors
+RequestEvent = namedtuple(
+    "RequestEvent", ["method", "url", "response", "elapsed", "error"]
+)
+
+
+class FakeStoreClient:
+    """Keep-alive client with resource helpers for the FakeStore API"""
+
+    def __init__(
+        self,
+        base_url,
+        timeout=DEFAULT_TIMEOUT,
+        pool_connections=4,
+        pool_maxsize=16,
+        retry=None,
+        cache=None,
+        hedge=None,
+        deadline=None,
+        limiter=None,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.retry = retry
+        self.cache = cache
+        self.hedge = hedge
+        # Wall-clock limit in seconds for each attempt, hedges included
+        self.deadline = deadline
+        self.limiter = limiter
+        self._executor = None
+        pool = {
+            "pool_connections": pool_connections,
+            "pool_maxsize": pool_maxsize,
+            "max_retries": 0,
+            "limiter": limiter,
+        }
+        if cache is not None:
+            self.adapter = CachingAdapter(cache, **pool)
+        else:
+            self.adapter = InstrumentedAdapter(**pool)
+        self.session = requests.Session()
+        self.session.mount("https://", self.adapter)
+        self.session.mount("http://", self.adapter)
+        self.session.headers.update(
+            {"Accept": "application/json", "Connection": "keep-alive"}
+        )
+        self._listeners = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+        self.session.close()
+
+    def url(self, path):
+        return f"{self.base_url}/{path.lstrip('/')}"
+
+    def add_listener(self, listener):
+        """Call ``listener(event)`` with a ``RequestEvent`` after every request"""
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener):
+        self._listeners.remove(listener)
+
+    def _notify(self, event):
+        for listener in list(self._listeners):
+            listener(event)
+
+    def request(self, method, path, **kwargs):
+        """Send a request relative to ``base_url`` with the default timeout
+
+        Transient failures are retried according to ``self.retry``.
+        """
+        kwargs.setdefault("timeout", self.timeout)
+        url = self.url(path)
+        if self.retry is not None and self.retry.budget is not None:
+            self.retry.budget.record_request()
+        attempt = 1
+        while True:
+            response, error = self._send(method, url, kwargs)
+            delay = None
+            if self.retry is not None:
+                delay = self.retry.should_retry(attempt, method, response, error)
+            if delay is None:
+                if error is not None:
+                    raise error
+                return response
+            if response is not None:
+                response.close()
+            self.retry.sleep(delay)
+            attempt += 1
+
+    def _send(self, method, url, kwargs):
+        hedge = self.hedge if self.hedge and self.hedge.applies_to(method) else None
+        started = time.perf_counter()
+        if hedge is None and self.deadline is None:
+            response, error = self._perform(method, url, kwargs)
+        else:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(thread_name_prefix="hedge")
+            response, error = race(
+                self._executor,
+                lambda: self._perform(method, url, kwargs),
+                hedge=hedge,
+                deadline=self.deadline,
+            )
+        elapsed = time.perf_counter() - started
+        self._notify(RequestEvent(method, url, response, elapsed, error))
+        return response, error
+
+    def _perform(self, method, url, kwargs):
+        try:
+            return self.session.request(method, url, **kwargs), None
+        except requests.RequestException as exc:
+            return None, exc
+
+    def get(self, path, **kwargs):
+        return self.request("GET", path, **kwargs)
+
+    def post(self, path, **kwargs):
+        return self.request("POST", path, **kwargs)
+
+    def put(self, path, **kwargs):
+        return self.request("PUT", path, **kwargs)
+
+    def patch(self, path, **kwargs):
+        return self.request("PATCH", path, **kwargs)
+
+    def delete(self, path, **kwargs):
+        return self.request("DELETE", path, **kwargs)
+
+    # Products
+
+    def list_products(self, limit=None, sort=None, stream=False):
+        return self.get("/products", params=_paging(limit, sort), stream=stream)
+
+    def get_product(self, product_id):
+        return self.get(f"/products/{product_id}")
+
+    def list_categories(self):
+        return self.get("/products/categories")
+
+    def list_products_in_category(self, category, limit=None, sort=None):
+        return self.get(
+            f"/products/category/{quote(category)}", params=_paging(limit, sort)
+        )
+
+    def create_product(self, product):
+        return self.post("/products", json=product)
+
+    def update_product(self, product_id, product):
+        return self.put(f"/products/{product_id}", json=product)
+
+    def delete_product(self, product_id):
+        return self.delete(f"/products/{product_id}")
+
+    # Carts
+
+    def list_carts(
+        self, limit=None, sort=None, startdate=None, enddate=None, stream=False
+    ):
+        params = _paging(limit, sort)
+        if startdate is not None:
+            params["startdate"] = startdate
+        if enddate is not None:
+            params["enddate"] = enddate
+        return self.get("/carts", params=params, stream=stream)
+
+    def get_cart(self, cart_id):
+        return self.get(f"/carts/{cart_id}")
+
+    def list_user_carts(self, user_id):
+        return self.get(f"/carts/user/{user_id}")
+
+    def create_cart(self, cart):
+        return self.post("/carts", json=cart)
+
+    def update_cart(self, cart_id, cart):
+        return self.put(f"/carts/{cart_id}", json=cart)
+
+    def delete_cart(self, cart_id):
+        return self.delete(f"/carts/{cart_id}")
+
+    # Users
+
+    def list_users(self, limit=None, sort=None, stream=False):
+        return self.get("/users", params=_paging(limit, sort), stream=stream)
+
+    def get_user(self, user_id):
+        return self.get(f"/users/{user_id}")
+
+    def create_user(self, user):
+        return self.post("/users", json=user)
+
+    def update_user(self, user_id, user):
+        return self.put(f"/users/{user_id}", json=user)
+
+    def delete_user(self, user_id):
+        return self.delete(f"/users/{user_id}")
+
+
+def _paging(limit, sort):
+    params = {}
+    if limit is not None:
+        params["limit"] = limit
+    if sort is not None:
+        params["sort"] = sort
+    return params
@@ -0,0 +1,237 @@
+"""Columnar bulk invariant checks over whole list responses.
+
+Schema validation looks at one item at a time; properties of a whole catalog
+(unique IDs, every category known, no empty cart lines) are cheaper to check
+as array operations. ``ProductColumns`` and ``CartColumns`` pull the fields
+these checks need out of a list response into NumPy columns in one pass, and
+``check_products`` / ``check_carts`` run every invariant as vector operations
+over them. Failures are returned as ``Violation`` tuples holding the indices
+of the offending rows, so a million-row dump is checked in milliseconds and
+still points at the exact items to look at.
+
+Values that are missing or of the wrong type become ``NaN`` (floats) or the
+column's sentinel (integers), so they are reported by the matching invariant
+instead of aborting the conversion. Cart lines, including those held by
+``utils.records.Cart`` records as ``array('i')``, are flattened into one
+line column with per-cart offsets.
+"""
+
+import math
+from collections import namedtuple
+
+import numpy as np
+
+from utils.records import Cart
+
+Violation = namedtuple("Violation", ["check", "indices"])
+
+# Integer sentinel for missing or non-integer IDs and quantities
+MISSING_INT = np.iinfo(np.int64).min
+_MAX_INT = np.iinfo(np.int64).max
+
+
+def _int_or_missing(value):
+    if type(value) is int and MISSING_INT < value <= _MAX_INT:
+        return value
+    if type(value) is float and value.is_integer() and abs(value) < 2**63:
+        return int(value)
+    return MISSING_INT
+
+
+def _float_or_nan(value):
+    if type(value) in (int, float):
+        return value
+    return math.nan
+
+
+def _column(values, dtype, coerce):
+    """Build a column from a list of JSON values in a single pass"""
+    return np.fromiter(map(coerce, values), dtype=dtype, count=len(values))
+
+
+def _int_column(values):
+    """``_column`` of int64 values, converted at once when all are plain ints"""
+    column = np.array(values)
+    if column.dtype == np.int64 and bool not in set(map(type, values)):
+        return column
+    return _column(values, np.int64, _int_or_missing)
+
+
+def _field(items, key):
+    return [item.get(key) for item in items]
+
+
+def id_column(items):
+    """The ``id`` of every decoded item, ``MISSING_INT`` where it is not an int"""
+    items = items if isinstance(items, list) else list(items)
+    return _column(_field(items, "id"), np.int64, _int_or_missing)
+
+
+class ProductColumns:
+    """Product IDs, prices and category codes of a list response"""
+
+    def __init__(self, ids, prices, category_codes, categories):
+        self.ids = ids
+        self.prices = prices
+        # Index into ``categories``, or -1 for a category outside it
+        self.category_codes = category_codes
+        self.categories = tuple(categories)
+
+    @classmethod
+    def from_items(cls, products, categories=None):
+        """Build columns from decoded products
+
+        ``categories`` is the known category list, e.g. the body of
+        ``/products/categories``. Without it the categories seen in the data
+        are used, so every code is valid.
+        """
+        products = products if isinstance(products, list) else list(products)
+        names = _field(products, "category")
+        if categories is None:
+            categories = list(dict.fromkeys(n for n in names if isinstance(n, str)))
+        lookup = {name: code for code, name in enumerate(categories)}
+        codes = np.fromiter(
+            (lookup.get(name, -1) if isinstance(name, str) else -1 for name in names),
+            dtype=np.int32,
+            count=len(names),
+        )
+        return cls(
+            ids=_column(_field(products, "id"), np.int64, _int_or_missing),
+            prices=_column(_field(products, "price"), np.float64, _float_or_nan),
+            category_codes=codes,
+            categories=categories,
+        )
+
+    def __len__(self):
+        return len(self.ids)
+
+
+class CartColumns:
+    """Cart IDs and user IDs, plus every cart line flattened across carts"""
+
+    def __init__(self, ids, user_ids, offsets, product_ids, quantities):
+        self.ids = ids
+        self.user_ids = user_ids
+        # Lines of cart ``i`` are ``offsets[i]:offsets[i + 1]``
+        self.offsets = offsets
+        self.product_ids = product_ids
+        self.quantities = quantities
+        # Row index of the cart each line belongs to
+        self.line_carts = np.repeat(np.arange(len(ids)), np.diff(offsets))
+
+    @classmethod
+    def from_items(cls, carts):
+        """Build columns from decoded carts or ``Cart`` records
+
+        All lines are gathered into two flat lists in one pass over the
+        carts and converted to arrays once.
+        """
+        carts = carts if isinstance(carts, list) else list(carts)
+        product_ids, quantities, offsets = [], [], [0]
+        for cart in carts:
+            # ``type`` rather than ``isinstance``: Cart is a Mapping ABC
+            if type(cart) is Cart and cart.extra is None:
+                product_ids.extend(cart.product_ids)
+                quantities.extend(cart.quantities)
+            else:
+                lines = cart.get("products")
+                for line in lines if isinstance(lines, list) else ():
+                    line = line if isinstance(line, dict) else {}
+                    product_ids.append(line.get("productId"))
+                    quantities.append(line.get("quantity"))
+            offsets.append(len(product_ids))
+        return cls(
+            ids=_column(_field(carts, "id"), np.int64, _int_or_missing),
+            user_ids=_column(_field(carts, "userId"), np.int64, _int_or_missing),
+            offsets=np.array(offsets, dtype=np.int64),
+            product_ids=_int_column(product_ids),
+            quantities=_int_column(quantities),
+        )
+
+    def __len__(self):
+        return len(self.ids)
+
+
+def duplicated(values, ignore=None):
+    """Indices of values equal to an earlier value (the first one is kept)"""
+    order = np.argsort(values, kind="stable")
+    ordered = values[order]
+    repeats = ordered[1:] == ordered[:-1]
+    if ignore is not None:
+        repeats &= ordered[1:] != ignore
+    return np.sort(order[1:][repeats])
+
+
+def not_positive_finite(values):
+    """Indices of values that are NaN, infinite, zero or negative"""
+    return np.flatnonzero(~(np.isfinite(values) & (values > 0)))
+
+
+def below(values, minimum):
+    """Indices of values smaller than ``minimum`` (missing values included)"""
+    return np.flatnonzero(values < minimum)
+
+
+def not_in(values, allowed):
+    """Indices of values that are not in ``allowed``"""
+    return np.flatnonzero(~np.isin(values, np.asarray(allowed)))
+
+
+def _violations(checks):
+    return [Violation(name, indices) for name, indices in checks if len(indices)]
+
+
+def check_products(products, categories=None):
+    """Run the product invariants and return the failing ones as ``Violation``"""
+    columns = (
+        products
+        if isinstance(products, ProductColumns)
+        else ProductColumns.from_items(products, categories)
+    )
+    return _violations(
+        [
+            ("id is missing", np.flatnonzero(columns.ids == MISSING_INT)),
+            ("id is not unique", duplicated(columns.ids, ignore=MISSING_INT)),
+            ("price is not positive and finite", not_positive_finite(columns.prices)),
+            ("category is unknown", np.flatnonzero(columns.category_codes < 0)),
+        ]
+    )
+
+
+def check_carts(carts, product_ids=None, user_ids=None):
+    """Run the cart invariants and return the failing ones as ``Violation``
+
+    Line-level failures report the index of the cart holding the line.
+    ``product_ids`` and ``user_ids``, when given, are the IDs a cart may
+    reference.
+    """
+    columns = carts if isinstance(carts, CartColumns) else CartColumns.from_items(carts)
+    checks = [
+        ("id is missing", np.flatnonzero(columns.ids == MISSING_INT)),
+        ("id is not unique", duplicated(columns.ids, ignore=MISSING_INT)),
+        ("userId is missing", np.flatnonzero(columns.user_ids == MISSING_INT)),
+        (
+            "quantity is below 1",
+            np.unique(columns.line_carts[below(columns.quantities, 1)]),
+        ),
+    ]
+    if product_ids is not None:
+        unknown = not_in(columns.product_ids, product_ids)
+        checks.append(("productId is unknown", np.unique(columns.line_carts[unknown])))
+    if user_ids is not None:
+        checks.append(("userId is unknown", not_in(columns.user_ids, user_ids)))
+    return _violations(checks)
+
+
+def assert_no_violations(violations, max_reported=10):
+    """Fail with the offending row indices of every violated invariant"""
+    if violations:
+        lines = []
+        for check, indices in violations:
+            shown = ", ".join(str(i) for i in indices[:max_reported])
+            more = len(indices) - max_reported
+            suffix = f", ... and {more} more" if more > 0 else ""
+            lines.append(f"{check}: {len(indices)} row(s) [{shown}{suffix}]")
+        raise AssertionError(
+            f"{len(violations)} invariant(s) violated:\n" + "\n".join(lines)
+        )
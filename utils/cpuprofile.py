@@ -0,0 +1,294 @@
+"""Sampling CPU profiler for the test harness, in pure Python.
+
+``StackSampler`` runs a thread that every ``interval`` seconds reads the
+stack of every other thread from ``sys._current_frames()``. A sample is
+weighted by the CPU time its thread used since the previous sample (per
+thread CPU clocks, where the platform has them), so threads blocked on a
+socket or a lock add nothing and the profile shows where CPU goes rather
+than where tests wait. Without per-thread clocks every sample weighs one
+interval of wall time.
+
+Stacks are kept per function, with the pytest and pluggy frames that wrap
+every test stripped from their root, and every frame belongs to a
+subsystem: the mock layer, the HTTP client, validation, JSON decoding or
+test code. A sample is charged to the innermost frame with a subsystem, so
+``re`` matching done for ``responses`` counts as mock time.
+
+Profiles are written as collapsed stacks (``flamegraph.pl``, speedscope,
+inferno) and as a speedscope JSON file with one profile per test.
+"""
+
+import os
+import sys
+import threading
+import time
+from collections import Counter, namedtuple
+
+Frame = namedtuple("Frame", ["name", "file", "line"])
+
+# Checked in order against "/" + the path relative to the project
+SUBSYSTEMS = (
+    (
+        "mock",
+        (
+            "/utils/router.py",
+            "/utils/fakestore.py",
+            "/utils/faults.py",
+            "/utils/standin.py",
+            "/utils/cassette.py",
+            "/utils/datagen.py",
+            "/responses/",
+        ),
+    ),
+    (
+        "validation",
+        (
+            "/utils/validation.py",
+            "/utils/columnar.py",
+            "/utils/integrity.py",
+            "/utils/schemas.py",
+            "/jsonschema/",
+            "/jsonschema_specifications/",
+            "/referencing/",
+        ),
+    ),
+    ("json", ("/utils/jsonstream.py", "/json/")),
+    (
+        "http client",
+        (
+            "/utils/client.py",
+            "/utils/aclient.py",
+            "/utils/retry.py",
+            "/utils/hedging.py",
+            "/utils/ratelimit.py",
+            "/utils/httpcache.py",
+            "/utils/timing.py",
+            "/requests/",
+            "/urllib3/",
+            "/httpx/",
+            "/httpcore/",
+            "/http/client.py",
+            "/socket.py",
+            "/ssl.py",
+        ),
+    ),
+    ("test code", ("/tests/",)),
+    (
+        "pytest",
+        (
+            "/_pytest/",
+            "/pluggy/",
+            "/pytest/",
+            "/xdist/",
+            "/execnet/",
+            "/allure_pytest/",
+            "/pytest_html/",
+            "/utils/plugins/",
+            "/runpy.py",
+            "<frozen runpy>",
+            "/bin/pytest",
+        ),
+    ),
+)
+
+OTHER = "other"
+
+_HAS_THREAD_CLOCKS = hasattr(time, "pthread_getcpuclockid")
+
+# Idents of running sampler threads, which never sample each other
+_SAMPLER_THREADS = set()
+
+
+def subsystem(filename):
+    """The subsystem of the code in ``filename``, or ``OTHER``"""
+    path = "/" + filename.replace(os.sep, "/")
+    for name, patterns in SUBSYSTEMS:
+        if any(pattern in path for pattern in patterns):
+            return name
+    return OTHER
+
+
+def charged_subsystem(stack):
+    """The subsystem a sample with ``stack`` (root first) is charged to"""
+    for frame in reversed(stack):
+        name = subsystem(frame.file)
+        if name != OTHER:
+            return name
+    return OTHER
+
+
+def _thread_cpu(ident):
+    try:
+        return time.clock_gettime(time.pthread_getcpuclockid(ident))
+    except (OSError, OverflowError):
+        # The thread ended since its frame was read
+        return None
+
+
+class StackSampler:
+    """Sample the stacks of all other threads between ``begin`` and ``end``"""
+
+    def __init__(self, rootpath, interval=0.005):
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._bucket = None
+        self._cpu = {}
+        self._frames = {}
+        # Files under the project root are labelled relative to it
+        self._root = os.path.join(str(rootpath), "")
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="fakestore-cpuprofile", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+    def begin(self):
+        """Start collecting samples into a new profile"""
+        with self._lock:
+            self._bucket = Counter()
+            if _HAS_THREAD_CLOCKS:
+                self._cpu = {
+                    ident: _thread_cpu(ident) for ident in sys._current_frames()
+                }
+
+    def end(self):
+        """Stop collecting; return the profile as ``{stack: microseconds}``"""
+        with self._lock:
+            bucket, self._bucket = self._bucket, None
+        stacks = Counter()
+        for codes, weight in (bucket or {}).items():
+            stacks[self._stack(codes)] += weight
+        return stacks
+
+    def _run(self):
+        _SAMPLER_THREADS.add(threading.get_ident())
+        try:
+            while not self._stop.wait(self.interval):
+                with self._lock:
+                    if self._bucket is not None:
+                        self._sample()
+        finally:
+            _SAMPLER_THREADS.discard(threading.get_ident())
+
+    def _sample(self):
+        for ident, frame in sys._current_frames().items():
+            if ident in _SAMPLER_THREADS:
+                continue
+            if _HAS_THREAD_CLOCKS:
+                cpu = _thread_cpu(ident)
+                last = self._cpu.get(ident)
+                self._cpu[ident] = cpu
+                if cpu is None or last is None or cpu <= last:
+                    continue
+                weight = round((cpu - last) * 1e6)
+            else:
+                weight = round(self.interval * 1e6)
+            codes = []
+            while frame is not None:
+                codes.append(frame.f_code)
+                frame = frame.f_back
+            self._bucket[tuple(codes)] += weight
+
+    def _frame(self, code):
+        frame = self._frames.get(code)
+        if frame is None:
+            filename = code.co_filename
+            if filename.startswith(self._root):
+                filename = os.path.relpath(filename, self._root)
+            name = getattr(code, "co_qualname", code.co_name)
+            frame = self._frames[code] = Frame(name, filename, code.co_firstlineno)
+        return frame
+
+    def _stack(self, codes):
+        """Root-first frames of ``codes`` (innermost first), minus the runner"""
+        stack = [self._frame(code) for code in reversed(codes)]
+        # Up to the last runner frame before the first frame of a subsystem;
+        # the bootstrap of an xdist worker is not a pytest frame itself
+        start = 0
+        for index, frame in enumerate(stack[:-1]):
+            group = subsystem(frame.file)
+            if group == "pytest":
+                start = index + 1
+            elif group != OTHER:
+                break
+        return tuple(stack[start:])
+
+
+def label(frame):
+    """A frame's name in collapsed stacks and speedscope"""
+    group = subsystem(frame.file)
+    prefix = f"[{group}] " if group != OTHER else ""
+    return f"{prefix}{frame.name} ({frame.file}:{frame.line})".replace(";", ":")
+
+
+def collapse(stacks):
+    """Collapsed-stack lines (``root;...;leaf microseconds``), heaviest first"""
+    return [
+        f"{';'.join(label(frame) for frame in stack)} {weight}"
+        for stack, weight in sorted(stacks.items(), key=lambda item: -item[1])
+    ]
+
+
+def speedscope(profiles, name="fakestore-api-tests"):
+    """A speedscope file holding one sampled profile per ``(name, stacks)``"""
+    frames, index = [], {}
+    documents = []
+    for title, stacks in profiles:
+        samples, weights = [], []
+        for stack, weight in stacks.items():
+            sample = []
+            for frame in stack:
+                if frame not in index:
+                    index[frame] = len(frames)
+                    frames.append(
+                        {"name": label(frame), "file": frame.file, "line": frame.line}
+                    )
+                sample.append(index[frame])
+            samples.append(sample)
+            weights.append(weight)
+        documents.append(
+            {
+                "type": "sampled",
+                "name": title,
+                "unit": "microseconds",
+                "startValue": 0,
+                "endValue": sum(weights),
+                "samples": samples,
+                "weights": weights,
+            }
+        )
+    return {
+        "$schema": "https://www.speedscope.app/file-format-schema.json",
+        "name": name,
+        "activeProfileIndex": 0,
+        "exporter": "utils.cpuprofile",
+        "shared": {"frames": frames},
+        "profiles": documents,
+    }
+
+
+def self_times(stacks):
+    """Microseconds spent in each function itself (the leaf of a sample)"""
+    times = Counter()
+    for stack, weight in stacks.items():
+        times[stack[-1]] += weight
+    return times
+
+
+def subsystem_times(stacks):
+    """Microseconds charged to each subsystem"""
+    times = Counter()
+    for stack, weight in stacks.items():
+        times[charged_subsystem(stack)] += weight
+    return times
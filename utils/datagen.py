@@ -0,0 +1,197 @@
+"""Seeded synthetic FakeStore catalog of any size.
+
+Every record is derived from ``(seed, resource, id)`` alone, so any product,
+cart or user can be built on its own without generating the ones before it,
+and the same seed always yields the same data. ``CatalogGenerator.products``
+and friends are lazy sequences: a catalog of ten million products costs
+nothing until records are read.
+
+Distributions are skewed the way a real store is: category sizes and the
+popularity of products and users follow a Zipf-like law, cart sizes are
+geometric and prices log-normal.
+"""
+
+import bisect
+import math
+import random
+from collections.abc import Sequence
+from datetime import date, timedelta
+
+CATEGORIES = (
+    "electronics",
+    "women's clothing",
+    "men's clothing",
+    "jewelery",
+    "home",
+    "books",
+    "sports",
+    "toys",
+    "beauty",
+    "garden",
+)
+FIRST_NAMES = (
+    "john david kevin don derek miriam william "
+    "kate jimmie anna maria li sofia omar yuki"
+).split()
+LAST_NAMES = (
+    "doe morrison ryan romer powell russell snyer hopkins "
+    "hale kerr novak garcia chen rossi haddad sato"
+).split()
+CITIES = (
+    "kilcoole",
+    "cullman",
+    "san antonio",
+    "el paso",
+    "fresno",
+    "mesa",
+    "lyon",
+    "porto",
+    "osaka",
+    "krakow",
+)
+ADJECTIVES = (
+    "classic slim premium casual solid rechargeable "
+    "lightweight vintage wireless organic compact deluxe"
+).split()
+NOUNS = {
+    "electronics": ("ssd", "monitor", "hard drive", "headphones", "charger"),
+    "women's clothing": ("jacket", "t-shirt", "raincoat", "dress", "blouse"),
+    "men's clothing": ("backpack", "jacket", "t-shirt", "shirt", "hoodie"),
+    "jewelery": ("bracelet", "ring", "earrings", "necklace", "pendant"),
+    "home": ("lamp", "pillow", "kettle", "rug", "clock"),
+    "books": ("novel", "cookbook", "atlas", "notebook", "guide"),
+    "sports": ("ball", "racket", "yoga mat", "bottle", "gloves"),
+    "toys": ("puzzle", "robot", "kite", "board game", "blocks"),
+    "beauty": ("serum", "lipstick", "brush set", "perfume", "cream"),
+    "garden": ("shovel", "planter", "hose", "seed kit", "gloves"),
+}
+
+_KINDS = {"products": 1, "carts": 2, "users": 3}
+_EPOCH = date(2019, 1, 1)
+_DATE_SPAN_DAYS = 730
+_MAX_CART_SIZE = 20
+
+
+def zipf_rank(rng, n):
+    """Draw a rank in ``1..n`` with probability roughly proportional to 1/rank
+
+    Inverse-CDF sampling of a log-uniform law, O(1) for any ``n``.
+    """
+    return min(n, int((n + 1) ** rng.random()))
+
+
+class LazyRecords(Sequence):
+    """Read-only sequence of ``count`` records built on access by ``factory(id)``"""
+
+    def __init__(self, count, factory):
+        self.count = count
+        self.factory = factory
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self.factory(i + 1) for i in range(*index.indices(self.count))]
+        if index < 0:
+            index += self.count
+        if not 0 <= index < self.count:
+            raise IndexError(index)
+        return self.factory(index + 1)
+
+    def __iter__(self):
+        for record_id in range(1, self.count + 1):
+            yield self.factory(record_id)
+
+    def by_id(self, record_id):
+        """Return the record with ``record_id`` (IDs start at 1)"""
+        return self[record_id - 1]
+
+
+class CatalogGenerator:
+    """Deterministic products, users and carts conforming to the API schemas"""
+
+    def __init__(
+        self,
+        seed=0,
+        products=1000,
+        users=100,
+        carts=500,
+        categories=CATEGORIES,
+        category_skew=1.1,
+        mean_cart_size=2.5,
+    ):
+        self.seed = seed
+        self.categories = categories
+        weights = [1 / rank**category_skew for rank in range(1, len(categories) + 1)]
+        total = sum(weights)
+        self._category_cdf = []
+        running = 0.0
+        for weight in weights:
+            running += weight / total
+            self._category_cdf.append(running)
+        self._cart_size_p = 1 / mean_cart_size
+        self.products = LazyRecords(products, self.product)
+        self.users = LazyRecords(users, self.user)
+        self.carts = LazyRecords(carts, self.cart)
+
+    def _rng(self, kind, record_id):
+        return random.Random((self.seed << 56) | (_KINDS[kind] << 48) | record_id)
+
+    def _category(self, rng):
+        index = bisect.bisect_left(self._category_cdf, rng.random())
+        return self.categories[min(index, len(self.categories) - 1)]
+
+    def product(self, product_id):
+        rng = self._rng("products", product_id)
+        category = self._category(rng)
+        noun = rng.choice(NOUNS.get(category, ("item",)))
+        title = f"{rng.choice(ADJECTIVES).title()} {noun.title()} {product_id}"
+        return {
+            "id": product_id,
+            "title": title,
+            "price": round(math.exp(rng.gauss(3.3, 1.0)), 2),
+            "description": f"{title}, {category}",
+            "category": category,
+            "image": f"https://example.com/img/{product_id}.jpg",
+            "rating": {
+                "rate": round(rng.triangular(1, 5, 4), 1),
+                "count": int(rng.paretovariate(1.2) * 20),
+            },
+        }
+
+    def user(self, user_id):
+        rng = self._rng("users", user_id)
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        return {
+            "id": user_id,
+            "email": f"{first}.{last}{user_id}@example.com",
+            "username": f"{first[0]}{last}{user_id}",
+            "password": f"pw{rng.getrandbits(32):08x}",
+            "name": {"firstname": first, "lastname": last},
+            "address": {
+                "city": rng.choice(CITIES),
+                "street": f"{rng.choice(LAST_NAMES).title()} Street",
+                "number": rng.randint(1, 9999),
+                "zipcode": f"{rng.randint(10000, 99999)}-{rng.randint(1000, 9999)}",
+            },
+            "phone": f"1-{rng.randint(100, 999)}-{rng.randint(100, 999)}-"
+            f"{rng.randint(1000, 9999)}",
+        }
+
+    def cart(self, cart_id):
+        rng = self._rng("carts", cart_id)
+        # Geometric cart size: most carts hold one or two products
+        size = 1 + int(math.log(1 - rng.random()) / math.log(1 - self._cart_size_p))
+        size = min(size, _MAX_CART_SIZE)
+        product_ids = {zipf_rank(rng, len(self.products)) for _ in range(size)}
+        day = _EPOCH + timedelta(days=rng.randrange(_DATE_SPAN_DAYS))
+        return {
+            "id": cart_id,
+            "userId": zipf_rank(rng, len(self.users)),
+            "date": day.isoformat(),
+            "products": [
+                {"productId": product_id, "quantity": 1 + int(rng.expovariate(0.7))}
+                for product_id in sorted(product_ids)
+            ],
+        }
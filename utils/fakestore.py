@@ -0,0 +1,467 @@
+"""In-memory FakeStore API stand-in with indexed CRUD.
+
+Rows live in primary-key hash maps and every query the API exposes is
+served from an index: products by category, carts by ``userId`` and carts by
+``date`` (kept sorted for range queries). Point reads and writes are O(1),
+date ranges are O(log n + k). ``overlay()`` forks the whole store
+copy-on-write so a test can mutate it without rebuilding the seed data, and
+``namespace(name)`` serves the calling thread from a named fork that lives
+until ``drop_namespace(name)``, so clients sharing one store over HTTP can
+write without seeing each other's changes.
+With ``compact=True`` rows are stored as ``utils.records`` slotted records
+instead of dicts, for catalogs of millions of rows.
+"""
+
+import bisect
+import heapq
+import threading
+from contextlib import contextmanager
+from itertools import islice
+
+from utils.records import RECORD_TYPES
+from utils.router import json_response
+
+_MISSING = object()
+
+
+def _bad_paging():
+    return json_response(
+        {"error": "limit must be a non-negative integer and sort asc or desc"}, 400
+    )
+
+
+class CopyOnWriteDict:
+    """Mapping layered over a read-only parent; writes stay in this layer"""
+
+    def __init__(self, parent=None):
+        self._parent = parent
+        self._changes = {}
+        self._deleted = set()
+        self._len = len(parent) if parent is not None else 0
+
+    def get(self, key, default=None):
+        if key in self._changes:
+            return self._changes[key]
+        if self._parent is None or key in self._deleted:
+            return default
+        return self._parent.get(key, default)
+
+    def __contains__(self, key):
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __getitem__(self, key):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value):
+        if key not in self:
+            self._len += 1
+        self._changes[key] = value
+        self._deleted.discard(key)
+
+    def __delitem__(self, key):
+        if key not in self:
+            raise KeyError(key)
+        self._changes.pop(key, None)
+        if self._parent is not None and key in self._parent:
+            self._deleted.add(key)
+        self._len -= 1
+
+    def __len__(self):
+        return self._len
+
+    def __iter__(self):
+        parent = self._parent
+        if parent is not None:
+            for key in parent:
+                if key not in self._deleted:
+                    yield key
+        for key in self._changes:
+            if parent is None or key not in parent:
+                yield key
+
+    def values(self):
+        for key in self:
+            yield self[key]
+
+    def fork(self):
+        return CopyOnWriteDict(self)
+
+
+class SetIndex:
+    """Secondary index mapping a field value to the set of row IDs"""
+
+    def __init__(self, parent=None):
+        self._parent = parent
+        self._added = {}
+        self._removed = {}
+
+    def add(self, key, row_id):
+        self._removed.get(key, set()).discard(row_id)
+        self._added.setdefault(key, set()).add(row_id)
+
+    def discard(self, key, row_id):
+        self._added.get(key, set()).discard(row_id)
+        if self._parent is not None:
+            self._removed.setdefault(key, set()).add(row_id)
+
+    def get(self, key):
+        """Return the set of row IDs stored under ``key``"""
+        ids = set(self._parent.get(key)) if self._parent is not None else set()
+        ids -= self._removed.get(key, set())
+        ids |= self._added.get(key, set())
+        return ids
+
+    def keys(self):
+        """Return the keys that currently have at least one row"""
+        keys = dict.fromkeys(self._parent.keys()) if self._parent is not None else {}
+        keys.update(dict.fromkeys(self._added))
+        return [key for key in keys if self.get(key)]
+
+    def fork(self):
+        return SetIndex(self)
+
+
+class SortedIndex:
+    """Secondary index kept sorted by field value for range queries"""
+
+    def __init__(self, parent=None):
+        self._parent = parent
+        self._entries = []
+        self._removed = set()
+
+    def add(self, key, row_id):
+        entry = (key, row_id)
+        if entry in self._removed:
+            # Still in the parent: un-hiding it is enough, a copy here would
+            # make range() return it twice
+            self._removed.discard(entry)
+            return
+        bisect.insort(self._entries, entry)
+
+    def discard(self, key, row_id):
+        entry = (key, row_id)
+        pos = bisect.bisect_left(self._entries, entry)
+        if pos < len(self._entries) and self._entries[pos] == entry:
+            del self._entries[pos]
+        elif self._parent is not None:
+            self._removed.add(entry)
+
+    def range(self, low=None, high=None):
+        """Yield ``(key, row_id)`` pairs with ``low <= key <= high`` in key order"""
+        start = 0 if low is None else bisect.bisect_left(self._entries, (low,))
+        stop = len(self._entries)
+        if high is not None:
+            stop = bisect.bisect_left(self._entries, (high, float("inf")))
+        own = islice(self._entries, start, stop)
+        if self._parent is None:
+            yield from own
+            return
+        inherited = (
+            entry
+            for entry in self._parent.range(low, high)
+            if entry not in self._removed
+        )
+        yield from heapq.merge(inherited, own)
+
+    def fork(self):
+        return SortedIndex(self)
+
+
+class _Table:
+    """Rows keyed by ID plus the secondary indexes declared for them"""
+
+    def __init__(self, indexes, rows=None, next_id=1):
+        self.indexes = indexes
+        self.rows = rows if rows is not None else CopyOnWriteDict()
+        self.next_id = next_id
+
+    def fork(self):
+        indexes = {field: index.fork() for field, index in self.indexes.items()}
+        return _Table(indexes, rows=self.rows.fork(), next_id=self.next_id)
+
+    def _index(self, row):
+        for field, index in self.indexes.items():
+            if row.get(field) is not None:
+                index.add(row[field], row["id"])
+
+    def _unindex(self, row):
+        for field, index in self.indexes.items():
+            if row.get(field) is not None:
+                index.discard(row[field], row["id"])
+
+    def put(self, row):
+        old = self.rows.get(row["id"])
+        if old is not None:
+            self._unindex(old)
+        self.rows[row["id"]] = row
+        self._index(row)
+        self.next_id = max(self.next_id, row["id"] + 1)
+        return row
+
+    def pop(self, row_id):
+        row = self.rows.get(row_id)
+        if row is not None:
+            self._unindex(row)
+            del self.rows[row_id]
+        return row
+
+
+def _table_schema():
+    return {
+        "products": {"category": SetIndex()},
+        "carts": {"userId": SetIndex(), "date": SortedIndex()},
+        "users": {},
+    }
+
+
+class FakeStore:
+    """Stateful in-process stand-in for the FakeStore API"""
+
+    RESOURCES = ("products", "carts", "users")
+
+    def __init__(self, products=(), carts=(), users=(), compact=False):
+        self._lock = threading.RLock()
+        self._shared = {
+            name: _Table(indexes) for name, indexes in _table_schema().items()
+        }
+        self._namespaces = {}
+        self._scope = threading.local()
+        # Rows are plain dicts, or slotted records to hold large catalogs
+        self._row_types = RECORD_TYPES if compact else dict.fromkeys(RECORD_TYPES)
+        for name, rows in (("products", products), ("carts", carts), ("users", users)):
+            table = self._tables[name]
+            for row in rows:
+                table.put(self._row(name, row))
+
+    @contextmanager
+    def overlay(self):
+        """Fork every table copy-on-write for the duration of the block"""
+        with self._lock:
+            saved = self._shared
+            self._shared = {name: table.fork() for name, table in saved.items()}
+        try:
+            yield self
+        finally:
+            with self._lock:
+                self._shared = saved
+
+    @contextmanager
+    def namespace(self, name, parent=None):
+        """Serve this thread from ``name``'s private fork for the block
+
+        A new namespace forks the shared tables, or namespace ``parent``.
+        """
+        with self._lock:
+            tables = self._namespaces.get(name)
+            if tables is None:
+                source = self._shared if parent is None else self._namespaces[parent]
+                tables = self._namespaces[name] = {
+                    resource: table.fork() for resource, table in source.items()
+                }
+        previous = getattr(self._scope, "tables", None)
+        self._scope.tables = tables
+        try:
+            yield self
+        finally:
+            self._scope.tables = previous
+
+    def drop_namespace(self, name):
+        """Forget ``name``'s writes; its next request starts from the seed"""
+        with self._lock:
+            return self._namespaces.pop(name, None) is not None
+
+    @property
+    def _tables(self):
+        scoped = getattr(self._scope, "tables", None)
+        return self._shared if scoped is None else scoped
+
+    def _row(self, resource, data):
+        record_type = self._row_types[resource]
+        return dict(data) if record_type is None else record_type.from_json(data)
+
+    def count(self, resource):
+        return len(self._tables[resource].rows)
+
+    def get(self, resource, row_id):
+        """Return the row with ``row_id``, or None"""
+        return self._tables[resource].rows.get(row_id)
+
+    def list(self, resource, limit=None, sort="asc"):
+        """Return rows in ID order, optionally reversed and truncated"""
+        with self._lock:
+            rows = self._tables[resource].rows
+            return self._ordered(iter(rows), rows, limit, sort)
+
+    def create(self, resource, data):
+        """Insert a row under the next free ID and return it"""
+        with self._lock:
+            table = self._tables[resource]
+            return table.put(self._row(resource, {**data, "id": table.next_id}))
+
+    def replace(self, resource, row_id, data):
+        """Replace a row wholesale, returning None when it does not exist"""
+        with self._lock:
+            table = self._tables[resource]
+            if row_id not in table.rows:
+                return None
+            return table.put(self._row(resource, {**data, "id": row_id}))
+
+    def update(self, resource, row_id, data):
+        """Merge fields into a row, returning None when it does not exist"""
+        with self._lock:
+            table = self._tables[resource]
+            row = table.rows.get(row_id)
+            if row is None:
+                return None
+            return table.put(self._row(resource, {**row, **data, "id": row_id}))
+
+    def delete(self, resource, row_id):
+        """Remove a row and return it, or None when it does not exist"""
+        with self._lock:
+            return self._tables[resource].pop(row_id)
+
+    def categories(self):
+        with self._lock:
+            return self._tables["products"].indexes["category"].keys()
+
+    def products_in_category(self, category, limit=None, sort="asc"):
+        with self._lock:
+            table = self._tables["products"]
+            ids = sorted(table.indexes["category"].get(category))
+            return self._ordered(ids, table.rows, limit, sort)
+
+    def carts_for_user(self, user_id, limit=None, sort="asc"):
+        with self._lock:
+            table = self._tables["carts"]
+            ids = sorted(table.indexes["userId"].get(user_id))
+            return self._ordered(ids, table.rows, limit, sort)
+
+    def carts_between(self, start=None, end=None, limit=None, sort="asc"):
+        """Return carts dated within ``[start, end]``, ordered by date"""
+        with self._lock:
+            table = self._tables["carts"]
+            ids = (row_id for _, row_id in table.indexes["date"].range(start, end))
+            return self._ordered(ids, table.rows, limit, sort)
+
+    @staticmethod
+    def _ordered(ids, rows, limit, sort):
+        if sort == "desc":
+            ids = reversed(list(ids))
+        if limit is not None:
+            ids = islice(ids, limit)
+        return [rows[row_id] for row_id in ids]
+
+    def mount(self, router):
+        """Register the FakeStore API routes on a ``MockRouter``"""
+        router.add("GET", "/products", handler=self._list_route("products"))
+        router.add("GET", "/products/categories", handler=self._get_categories)
+        router.add("GET", "/products/category/{category}", handler=self._get_category)
+        router.add("GET", "/carts", handler=self._get_carts)
+        router.add("GET", "/carts/user/{user_id:int}", handler=self._get_user_carts)
+        router.add("GET", "/users", handler=self._list_route("users"))
+
+        # Fake Store API answers 200 with an empty object for unknown products
+        missing = {"products": json_response({}), "carts": None, "users": None}
+        for resource in self.RESOURCES:
+            item = f"/{resource}/{{id:int}}"
+            router.add(
+                "GET", item, handler=self._get_route(resource, missing[resource])
+            )
+            router.add("POST", f"/{resource}", handler=self._create_route(resource))
+            router.add("PUT", item, handler=self._write_route(self.replace, resource))
+            router.add("PATCH", item, handler=self._write_route(self.update, resource))
+            router.add("DELETE", item, handler=self._delete_route(resource))
+        return router
+
+    def _list_route(self, resource):
+        def handler(request):
+            paging = _paging(request)
+            if paging is None:
+                return _bad_paging()
+            limit, sort = paging
+            return json_response(self.list(resource, limit=limit, sort=sort))
+
+        return handler
+
+    def _get_route(self, resource, missing):
+        def handler(request):
+            row = self.get(resource, request.params["id"])
+            if row is None:
+                return missing or (404, {}, "")
+            return json_response(row)
+
+        return handler
+
+    def _create_route(self, resource):
+        def handler(request):
+            return json_response(self.create(resource, request.json() or {}), 201)
+
+        return handler
+
+    def _write_route(self, write, resource):
+        def handler(request):
+            row = write(resource, request.params["id"], request.json() or {})
+            if row is None:
+                return 404, {}, ""
+            return json_response(row)
+
+        return handler
+
+    def _delete_route(self, resource):
+        def handler(request):
+            row = self.delete(resource, request.params["id"])
+            if row is None:
+                return 404, {}, ""
+            return json_response(row)
+
+        return handler
+
+    def _get_categories(self, request):
+        return json_response(self.categories())
+
+    def _get_category(self, request):
+        paging = _paging(request)
+        if paging is None:
+            return _bad_paging()
+        limit, sort = paging
+        category = request.params["category"]
+        return json_response(
+            self.products_in_category(category, limit=limit, sort=sort)
+        )
+
+    def _get_carts(self, request):
+        paging = _paging(request)
+        if paging is None:
+            return _bad_paging()
+        limit, sort = paging
+        start = request.query.get("startdate")
+        end = request.query.get("enddate")
+        if start is None and end is None:
+            return json_response(self.list("carts", limit=limit, sort=sort))
+        return json_response(self.carts_between(start, end, limit=limit, sort=sort))
+
+    def _get_user_carts(self, request):
+        paging = _paging(request)
+        if paging is None:
+            return _bad_paging()
+        limit, sort = paging
+        user_id = request.params["user_id"]
+        return json_response(self.carts_for_user(user_id, limit=limit, sort=sort))
+
+
+def _paging(request):
+    """``(limit, sort)`` from the query string, or None when either is invalid"""
+    limit = request.query.get("limit")
+    sort = request.query.get("sort", "asc")
+    if limit:
+        if not limit.isdigit():
+            return None
+        limit = int(limit)
+    else:
+        limit = None
+    if sort not in ("asc", "desc"):
+        return None
+    return limit, sort
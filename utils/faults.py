@@ -0,0 +1,199 @@
+"""Fault and latency injection for the mocked API.
+
+The mock normally answers at once and always succeeds. A ``FaultProfile``
+makes it behave like a real service under stress: every request waits for a
+delay drawn from a latency distribution, and may fail with an error status,
+be throttled with ``429`` and ``Retry-After``, have its connection reset, or
+stream its body slowly. Error rates can be set per endpoint template
+(``"GET /products/{id}"``).
+
+``MockRouter.inject_faults(profile)`` applies a profile to every request the
+router dispatches: through ``responses``, the async client's
+``router_transport`` and the ``StandInServer``. Profiles are picked per test
+with ``@pytest.mark.faults(...)`` or for the whole run with ``--faults`` (see
+``utils.plugins.faults``).
+"""
+
+import asyncio
+import io
+import json
+import math
+import random
+import threading
+import time
+
+import requests
+
+
+class FixedLatency:
+    """Always ``ms`` milliseconds"""
+
+    def __init__(self, ms):
+        self.ms = ms
+
+    def sample(self, rng):
+        return self.ms / 1000
+
+
+class LogNormalLatency:
+    """Log-normal delay with the given median, heavy-tailed for large sigma"""
+
+    def __init__(self, median_ms, sigma=1.0, max_ms=None):
+        self.median_ms = median_ms
+        self.sigma = sigma
+        self.max_ms = max_ms
+
+    def sample(self, rng):
+        ms = rng.lognormvariate(math.log(self.median_ms), self.sigma)
+        if self.max_ms is not None:
+            ms = min(ms, self.max_ms)
+        return ms / 1000
+
+
+class HistogramLatency:
+    """Delays resampled from a recorded ``LatencyHistogram`` (microseconds)"""
+
+    def __init__(self, histogram):
+        if not histogram.count:
+            raise ValueError("cannot sample an empty histogram")
+        self.histogram = histogram
+
+    def sample(self, rng):
+        return self.histogram.percentile(rng.uniform(0, 100)) / 1_000_000
+
+
+class SlowBody(io.RawIOBase):
+    """Readable body that delivers ``data`` at ``bytes_per_second``"""
+
+    def __init__(self, data, bytes_per_second, chunk_size=1024, sleep=time.sleep):
+        self._data = memoryview(data)
+        self._position = 0
+        self.bytes_per_second = bytes_per_second
+        self.chunk_size = chunk_size
+        self._sleep = sleep
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        size = min(len(buffer), self.chunk_size, len(self._data) - self._position)
+        if size <= 0:
+            return 0
+        self._sleep(size / self.bytes_per_second)
+        buffer[:size] = self._data[self._position : self._position + size]
+        self._position += size
+        return size
+
+
+class InjectedReset(ConnectionResetError):
+    """Connection reset simulated by a fault profile"""
+
+
+class FaultProfile:
+    """Latency and failure behaviour of the mocked API"""
+
+    def __init__(
+        self,
+        latency=None,
+        error_rate=0.0,
+        error_rates=None,
+        error_status=500,
+        reset_rate=0.0,
+        throttle_rate=0.0,
+        retry_after=1,
+        slow_body_bps=None,
+        seed=None,
+    ):
+        self.latency = latency
+        self.error_rate = error_rate
+        # Endpoint template ("GET /carts/{id}") -> error rate
+        self.error_rates = dict(error_rates or {})
+        self.error_status = error_status
+        self.reset_rate = reset_rate
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.slow_body_bps = slow_body_bps
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.injected = {"delayed": 0, "errors": 0, "resets": 0, "throttled": 0}
+
+    def _roll(self, rate):
+        with self._lock:
+            return rate > 0 and self._rng.random() < rate
+
+    def _count(self, name):
+        with self._lock:
+            self.injected[name] += 1
+
+    def delay(self):
+        """Seconds the next response is held back"""
+        if self.latency is None:
+            return 0.0
+        with self._lock:
+            return self.latency.sample(self._rng)
+
+    def _next_delay(self):
+        delay = self.delay()
+        if delay > 0:
+            self._count("delayed")
+        return delay
+
+    def apply(self, endpoint, serve, sleep=time.sleep):
+        """Serve a request through ``serve()`` with this profile's faults
+
+        Returns ``(status, headers, body)`` or raises ``InjectedReset``.
+        """
+        delay = self._next_delay()
+        if delay > 0:
+            sleep(delay)
+        return self._respond(endpoint, serve)
+
+    async def apply_async(self, endpoint, serve):
+        """``apply`` without blocking the event loop during the delay"""
+        delay = self._next_delay()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return self._respond(endpoint, serve)
+
+    def _respond(self, endpoint, serve):
+        if self._roll(self.reset_rate):
+            self._count("resets")
+            raise InjectedReset(f"connection reset injected for {endpoint}")
+        if self._roll(self.throttle_rate):
+            self._count("throttled")
+            headers = {"Retry-After": str(self.retry_after)}
+            return 429, headers, json.dumps({"error": "rate limited"})
+        if self._roll(self.error_rates.get(endpoint, self.error_rate)):
+            self._count("errors")
+            body = json.dumps({"error": "injected failure"})
+            return self.error_status, {"Content-Type": "application/json"}, body
+        status, headers, body = serve()
+        if self.slow_body_bps:
+            raw = body.encode() if isinstance(body, str) else body
+            body = io.BufferedReader(SlowBody(raw, self.slow_body_bps))
+        return status, headers, body
+
+
+def reset_error(exc, request=None):
+    """Wrap an ``InjectedReset`` as the error ``requests`` raises for it"""
+    return requests.ConnectionError(exc, request=request)
+
+
+# Named profiles for ``--faults`` and ``@pytest.mark.faults("name")``
+PROFILES = {
+    "tail-latency": lambda: FaultProfile(
+        latency=LogNormalLatency(median_ms=2, sigma=1.5, max_ms=500), seed=0
+    ),
+    "flaky": lambda: FaultProfile(error_rate=0.05, reset_rate=0.02, seed=0),
+    "throttled": lambda: FaultProfile(throttle_rate=0.2, retry_after=0, seed=0),
+    "slow-body": lambda: FaultProfile(slow_body_bps=256 * 1024, seed=0),
+}
+
+
+def get_profile(name):
+    """Build a fresh named profile"""
+    try:
+        return PROFILES[name]()
+    except KeyError:
+        known = ", ".join(sorted(PROFILES))
+        raise ValueError(f"unknown fault profile {name!r} (known: {known})") from None
@@ -0,0 +1,86 @@
+"""Request hedging and deadlines for the shared client.
+
+A request stuck in a slow tail holds the test up for as long as the slowest
+server takes. ``HedgePolicy`` sends a duplicate of an idempotent request when
+the first has not answered within ``after`` seconds and keeps whichever
+answers first, trading a few extra requests for a bounded p99. A deadline
+gives up on a request after a fixed wall-clock time even if the transport
+itself never times out, which is also the case for the mocked API.
+"""
+
+import time
+from concurrent.futures import FIRST_COMPLETED, wait
+
+import requests
+
+
+class HedgePolicy:
+    """When to send duplicates of a slow request"""
+
+    def __init__(self, after=0.05, max_hedges=1, methods=("GET",)):
+        self.after = after
+        self.max_hedges = max_hedges
+        self.methods = frozenset(method.upper() for method in methods)
+        self.sent = 0
+        self.won = 0
+
+    def applies_to(self, method):
+        return method.upper() in self.methods
+
+
+class DeadlineExceeded(requests.Timeout):
+    """No attempt answered within the request deadline"""
+
+
+def _discard(future):
+    """Close the response of an attempt that lost the race"""
+    if not future.cancelled() and future.exception() is None:
+        response = future.result()[0]
+        if response is not None:
+            response.close()
+
+
+def race(executor, attempt, hedge=None, deadline=None):
+    """Run ``attempt()`` under a deadline, hedging it per ``hedge``
+
+    ``attempt`` returns ``(response, error)``. Returns the first attempt that
+    produced a response, or the last error when every attempt failed.
+    """
+    started = time.perf_counter()
+    give_up = None if deadline is None else started + deadline
+    futures = [executor.submit(attempt)]
+    pending = set(futures)
+    outcome = None
+    while pending:
+        wake = give_up
+        if hedge is not None and len(futures) <= hedge.max_hedges:
+            next_hedge = started + hedge.after * len(futures)
+            wake = next_hedge if wake is None else min(wake, next_hedge)
+        timeout = None if wake is None else max(wake - time.perf_counter(), 0.0)
+        done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+        for future in done:
+            response, error = future.result()
+            if response is not None:
+                if future is not futures[0] and hedge is not None:
+                    hedge.won += 1
+                outcome = (response, None)
+                break
+            outcome = (None, error)
+        if outcome is not None and outcome[0] is not None:
+            break
+        now = time.perf_counter()
+        if give_up is not None and now >= give_up:
+            outcome = (None, DeadlineExceeded(f"no response within {deadline}s"))
+            break
+        if (
+            hedge is not None
+            and len(futures) <= hedge.max_hedges
+            and now >= started + hedge.after * len(futures)
+        ):
+            future = executor.submit(attempt)
+            futures.append(future)
+            pending.add(future)
+            hedge.sent += 1
+    for future in pending:
+        future.add_done_callback(_discard)
+    return outcome
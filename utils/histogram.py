@@ -0,0 +1,113 @@
+"""HDR-style latency histogram with bounded memory.
+
+Values are integers (microseconds by convention) stored in log-linear
+buckets: every power-of-two range is split into ``2 ** (precision_bits - 1)``
+linear sub-buckets, so the relative error of any reported value is below
+``2 ** -(precision_bits - 1)`` and memory grows with the logarithm of the
+largest value, not with the number of samples.
+"""
+
+
+class LatencyHistogram:
+    """Log-linear bucketed histogram of non-negative integer values"""
+
+    def __init__(self, precision_bits=8):
+        self.precision_bits = precision_bits
+        self._sub_buckets = 1 << precision_bits
+        self._half = self._sub_buckets >> 1
+        self._counts = []
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+
+    def _index(self, value):
+        if value < self._sub_buckets:
+            return value
+        shift = value.bit_length() - self.precision_bits
+        return shift * self._half + (value >> shift)
+
+    def _highest_equivalent(self, index):
+        if index < self._sub_buckets:
+            return index
+        shift = index // self._half - 1
+        sub_index = index - shift * self._half
+        return ((sub_index + 1) << shift) - 1
+
+    def record(self, value, count=1):
+        value = max(0, int(value))
+        index = self._index(value)
+        if index >= len(self._counts):
+            self._counts.extend([0] * (index + 1 - len(self._counts)))
+        self._counts[index] += count
+        self.count += count
+        self.total += value * count
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def merge(self, other):
+        """Add every sample of ``other`` into this histogram"""
+        if other.precision_bits != self.precision_bits:
+            raise ValueError("cannot merge histograms with different precision")
+        if len(other._counts) > len(self._counts):
+            self._counts.extend([0] * (len(other._counts) - len(self._counts)))
+        for index, count in enumerate(other._counts):
+            self._counts[index] += count
+        self.count += other.count
+        self.total += other.total
+        for bound, pick in (("min", min), ("max", max)):
+            theirs = getattr(other, bound)
+            if theirs is not None:
+                ours = getattr(self, bound)
+                setattr(self, bound, theirs if ours is None else pick(ours, theirs))
+        return self
+
+    def as_dict(self):
+        """Plain-data form, e.g. to send across processes"""
+        return {
+            "precision_bits": self.precision_bits,
+            "counts": list(self._counts),
+            "count": self.count,
+            "total": self.total,
+            "min": self.min,
+            "max": self.max,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        histogram = cls(data["precision_bits"])
+        histogram._counts = list(data["counts"])
+        histogram.count = data["count"]
+        histogram.total = data["total"]
+        histogram.min = data["min"]
+        histogram.max = data["max"]
+        return histogram
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, percent):
+        """Return the value at ``percent`` (0-100), within bucket precision"""
+        if not self.count:
+            return 0
+        if percent >= 100:
+            return self.max
+        target = max(1, round(self.count * percent / 100))
+        seen = 0
+        for index, count in enumerate(self._counts):
+            seen += count
+            if seen >= target:
+                return min(self._highest_equivalent(index), self.max)
+        return self.max
+
+    def summary(self, scale=1000.0):
+        """Return count, mean and p50/p95/p99/max divided by ``scale``"""
+        return {
+            "count": self.count,
+            "mean": round(self.mean / scale, 3),
+            "p50": round(self.percentile(50) / scale, 3),
+            "p95": round(self.percentile(95) / scale, 3),
+            "p99": round(self.percentile(99) / scale, 3),
+            "max": round((self.max or 0) / scale, 3),
+        }
@@ -0,0 +1,293 @@
+"""Opt-in HTTP cache for the shared client.
+
+Against a live deployment the same resources are read by many tests.
+``CachingAdapter`` keeps GET responses in a ``ResponseCache`` and serves them
+while they are fresh according to ``Cache-Control: max-age`` (or
+``Expires``). Stale entries with an ``ETag`` or ``Last-Modified`` are
+revalidated with ``If-None-Match`` / ``If-Modified-Since``, and a ``304`` is
+answered from the cache. ``no-store`` responses are never kept, ``no-cache``
+ones are always revalidated, and the same request directives bypass the
+cache.
+
+The cache is an LRU bounded by the total body size. A write (POST, PUT,
+PATCH, DELETE) invalidates every entry under the written collection, so
+``PUT /carts/5`` drops ``/carts``, ``/carts/5`` and ``/carts/user/1``.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from email.utils import parsedate_to_datetime
+
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+from utils.timing import InstrumentedAdapter, RequestTiming, TimedResponse
+
+DEFAULT_MAX_BYTES = 32 * 2**20
+
+_WRITE_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+
+
+class CacheStats:
+    """Counters of cache activity"""
+
+    __slots__ = (
+        "hits",
+        "revalidated",
+        "misses",
+        "stores",
+        "evictions",
+        "invalidations",
+        "bytes_served",
+    )
+
+    def __init__(self, **counts):
+        for name in self.__slots__:
+            setattr(self, name, counts.get(name, 0))
+
+    def copy(self):
+        return CacheStats(**self.as_dict())
+
+    def since(self, earlier):
+        """Counters accumulated after the ``earlier`` copy was taken"""
+        return CacheStats(
+            **{
+                name: getattr(self, name) - getattr(earlier, name)
+                for name in self.__slots__
+            }
+        )
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class CacheEntry:
+    """A stored response and its freshness"""
+
+    __slots__ = ("status", "headers", "content", "fresh_until", "vary")
+
+    def __init__(self, status, headers, content, fresh_until, vary):
+        self.status = status
+        self.headers = headers
+        self.content = content
+        self.fresh_until = fresh_until
+        # Request header values the response varies on
+        self.vary = vary
+
+    @property
+    def size(self):
+        return len(self.content)
+
+    def validators(self):
+        """Conditional request headers that revalidate this entry"""
+        headers = {}
+        if "ETag" in self.headers:
+            headers["If-None-Match"] = self.headers["ETag"]
+        if "Last-Modified" in self.headers:
+            headers["If-Modified-Since"] = self.headers["Last-Modified"]
+        return headers
+
+
+def cache_control(headers):
+    """Parse a ``Cache-Control`` header into ``{directive: value or None}``"""
+    directives = {}
+    for part in headers.get("Cache-Control", "").split(","):
+        name, _, value = part.strip().partition("=")
+        if name:
+            directives[name.lower()] = value.strip('"') or None
+    return directives
+
+
+def freshness_lifetime(headers):
+    """Seconds a response stays fresh, or None when it must not be stored"""
+    directives = cache_control(headers)
+    if "no-store" in directives:
+        return None
+    if "no-cache" in directives:
+        return 0.0
+    age = _seconds(headers.get("Age")) or 0.0
+    if "max-age" in directives:
+        max_age = _seconds(directives["max-age"])
+        return None if max_age is None else max(max_age - age, 0.0)
+    if "Expires" in headers:
+        try:
+            expires = parsedate_to_datetime(headers["Expires"])
+            date = parsedate_to_datetime(headers["Date"]) if "Date" in headers else None
+        except (TypeError, ValueError):
+            return 0.0
+        if expires.tzinfo is None or (date is not None and date.tzinfo is None):
+            return 0.0
+        now = date.timestamp() if date is not None else time.time()
+        return max(expires.timestamp() - now - age, 0.0)
+    return 0.0
+
+
+def _seconds(value):
+    try:
+        return float(int(value))
+    except (TypeError, ValueError):
+        return None
+
+
+def collection_url(url):
+    """The collection a write to ``url`` affects: ``/carts/5`` -> ``/carts``"""
+    path = url.split("?", 1)[0].split("#", 1)[0].rstrip("/")
+    head, _, last = path.rpartition("/")
+    return head if last.isdigit() else path
+
+
+class ResponseCache:
+    """Size-bounded LRU of GET responses keyed by URL"""
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, clock=time.monotonic):
+        self.max_bytes = max_bytes
+        self.clock = clock
+        self.stats = CacheStats()
+        self.size = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, url, request_headers):
+        """Return the entry for ``url`` matching ``request_headers``, or None"""
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is None:
+                return None
+            if any(request_headers.get(k) != v for k, v in entry.vary.items()):
+                return None
+            self._entries.move_to_end(url)
+            return entry
+
+    def count(self, name, amount=1):
+        with self._lock:
+            setattr(self.stats, name, getattr(self.stats, name) + amount)
+
+    def is_fresh(self, entry):
+        return self.clock() < entry.fresh_until
+
+    def store(self, url, request_headers, response):
+        """Keep ``response`` if it is cacheable; return the entry or None"""
+        if response.status_code != 200:
+            return None
+        lifetime = freshness_lifetime(response.headers)
+        if lifetime is None or response.headers.get("Vary", "").strip() == "*":
+            return None
+        headers = CaseInsensitiveDict(response.headers)
+        # ``content`` is already decoded
+        headers.pop("Content-Encoding", None)
+        headers.pop("Content-Length", None)
+        entry = CacheEntry(
+            response.status_code,
+            headers,
+            response.content,
+            self.clock() + lifetime,
+            {
+                name.strip(): request_headers.get(name.strip())
+                for name in response.headers.get("Vary", "").split(",")
+                if name.strip()
+            },
+        )
+        if lifetime == 0 and not entry.validators():
+            return None
+        if entry.size > self.max_bytes:
+            return None
+        with self._lock:
+            old = self._entries.pop(url, None)
+            if old is not None:
+                self.size -= old.size
+            self._entries[url] = entry
+            self.size += entry.size
+            self.stats.stores += 1
+            while self.size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.size -= evicted.size
+                self.stats.evictions += 1
+        return entry
+
+    def refresh(self, entry, response):
+        """Update an entry from a ``304 Not Modified`` response"""
+        for name, value in response.headers.items():
+            if name.lower() not in ("content-length", "content-encoding"):
+                entry.headers[name] = value
+        lifetime = freshness_lifetime(entry.headers)
+        entry.fresh_until = self.clock() + (lifetime or 0.0)
+
+    def invalidate(self, url):
+        """Drop every entry under the collection ``url`` writes to"""
+        prefix = collection_url(url)
+        with self._lock:
+            stale = [
+                key
+                for key in self._entries
+                if key == prefix or key.startswith((prefix + "/", prefix + "?"))
+            ]
+            for key in stale:
+                self.size -= self._entries.pop(key).size
+            self.stats.invalidations += len(stale)
+        return len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+
+class CachingAdapter(InstrumentedAdapter):
+    """``InstrumentedAdapter`` answering GETs from a ``ResponseCache``"""
+
+    def __init__(self, cache, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.cache = cache
+
+    def send(self, request, stream=False, **kwargs):
+        method = request.method.upper()
+        if method in _WRITE_METHODS:
+            self.cache.invalidate(request.url)
+            return super().send(request, stream=stream, **kwargs)
+        directives = cache_control(request.headers)
+        if method != "GET" or "no-store" in directives:
+            return super().send(request, stream=stream, **kwargs)
+
+        entry = self.cache.get(request.url, request.headers)
+        if entry is not None and "no-cache" not in directives:
+            if self.cache.is_fresh(entry):
+                self.cache.count("hits")
+                self.cache.count("bytes_served", entry.size)
+                timing = RequestTiming(request.method, request.url)
+                timing.status = entry.status
+                timing.bytes = 0 if stream else entry.size
+                return self._cached_response(request, entry, timing)
+        if entry is not None:
+            for name, value in entry.validators().items():
+                request.headers.setdefault(name, value)
+
+        response = super().send(request, stream=stream, **kwargs)
+        if entry is not None and response.status_code == 304:
+            response.close()
+            self.cache.refresh(entry, response)
+            self.cache.count("revalidated")
+            self.cache.count("bytes_served", entry.size)
+            return self._cached_response(request, entry, response.timing)
+        self.cache.count("misses")
+        if not stream:
+            self.cache.store(request.url, request.headers, response)
+        return response
+
+    def _cached_response(self, request, entry, timing):
+        response = TimedResponse()
+        response.status_code = entry.status
+        response.reason = "OK"
+        response.headers = CaseInsensitiveDict(entry.headers)
+        response.encoding = get_encoding_from_headers(response.headers)
+        response._content = entry.content
+        response._content_consumed = True
+        response.url = request.url
+        response.request = request
+        response.connection = self
+        response.timing = timing
+        response.from_cache = True
+        return response
@@ -0,0 +1,263 @@
+"""Dependencies of tests and content hashes to tell which ones a change affects.
+
+A test depends on named pieces of the project, each identified by a key and
+hashed by content:
+
+* ``src:<module>:<qualname>``: the source of a function or class. The test
+  function, every fixture it uses and everything they reach by name are
+  found statically by ``DependencyScanner.reach``: project functions and
+  classes named in their code (recursively, including the methods of a
+  class) and upper-case constants such as ``PRODUCT_SCHEMA``;
+* ``const:<module>:<NAME>``: the JSON-able value of such a constant;
+* ``route:<METHOD> <template>``: a mock route's handler and the backend
+  methods it reaches, for routes the test was served at run time;
+* ``file:<path>``: a whole file, for inputs every test shares.
+
+A test needs to run again when it is new, failed last time, or one of its
+keys hashes differently now (or no longer resolves). ``ImpactCache`` keeps
+each test's keys and hashes from the last run that executed it.
+"""
+
+import hashlib
+import importlib
+import inspect
+import json
+import os
+import types
+from collections import namedtuple
+
+ImpactEntry = namedtuple("ImpactEntry", ["deps", "fixtures", "endpoints", "outcome"])
+
+
+def digest(text):
+    return hashlib.sha1(text.encode()).hexdigest()[:16]
+
+
+def _is_constant(name):
+    stripped = name.lstrip("_")
+    return bool(stripped) and stripped.isupper()
+
+
+def _canonical(value):
+    """JSON text of plain data, or None for anything else"""
+    try:
+        return json.dumps(value, sort_keys=True, default=_sorted_set)
+    except (TypeError, ValueError):
+        return None
+
+
+def _sorted_set(value):
+    if isinstance(value, (set, frozenset)):
+        return sorted(value, key=repr)
+    raise TypeError(type(value).__name__)
+
+
+def _unwrap(obj):
+    """The function behind a ``@pytest.fixture`` definition"""
+    wrapped = getattr(obj, "_get_wrapped_function", None)
+    if wrapped is not None:
+        return wrapped()
+    return obj
+
+
+def _code_names(code):
+    """Global and attribute names used by ``code`` and the code nested in it"""
+    names = set(code.co_names)
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):
+            names |= _code_names(const)
+    return names
+
+
+def _members(cls):
+    """Functions defined on a class: methods, properties, static methods"""
+    for value in vars(cls).values():
+        if isinstance(value, property):
+            value = value.fget
+        elif isinstance(value, (staticmethod, classmethod)):
+            value = value.__func__
+        value = _unwrap(value)
+        if inspect.isfunction(value):
+            yield value
+
+
+class DependencyScanner:
+    """Find and hash what project code reaches by name"""
+
+    def __init__(self, root, skip_modules=(), skip_constants=()):
+        self.root = os.path.abspath(root) + os.sep
+        # Modules and constants tracked at run time instead (mock routes)
+        self.skip_modules = frozenset(skip_modules)
+        self.skip_constants = frozenset(skip_constants)
+        self._reached = {}
+        self._hashes = {}
+        self.routes = {}
+
+    def in_project(self, obj):
+        try:
+            filename = inspect.getsourcefile(obj)
+        except TypeError:
+            return False
+        return (
+            filename is not None
+            and os.path.abspath(filename).startswith(self.root)
+            and "site-packages" not in filename
+        )
+
+    def key(self, obj):
+        """The ``src:`` key of a module-level function or class, else None"""
+        qualname = getattr(obj, "__qualname__", "")
+        if not qualname or "<locals>" in qualname:
+            return None
+        return f"src:{obj.__module__}:{qualname}"
+
+    def reach(self, func, owner=None, skip=True):
+        """Keys of everything ``func`` reaches by name, ``func`` included
+
+        ``owner`` is a class whose attributes the names also refer to (the
+        ``self`` of a method or closure). ``skip=False`` also follows the
+        modules and constants tracked at run time.
+        """
+        func = _unwrap(func)
+        if inspect.ismethod(func):
+            func, owner = func.__func__, type(func.__self__)
+        cache_key = (func, owner, skip)
+        if cache_key in self._reached:
+            return self._reached[cache_key]
+        keys = set()
+        # Cycles (recursion, methods naming each other) see a partial result
+        self._reached[cache_key] = keys
+        own = self.key(func)
+        if own is not None:
+            keys.add(own)
+        code = getattr(func, "__code__", None)
+        if code is None:
+            return frozenset(keys)
+        namespace = func.__globals__
+        module = namespace.get("__name__")
+        for name in sorted(_code_names(code)):
+            if name in namespace:
+                value = namespace[name]
+            elif owner is not None and hasattr(owner, name):
+                value = inspect.getattr_static(owner, name)
+                if isinstance(value, property):
+                    value = value.fget
+                elif isinstance(value, (staticmethod, classmethod)):
+                    value = value.__func__
+            else:
+                continue
+            keys |= self._reach_value(module, name, value, owner, skip)
+        self._reached[cache_key] = frozenset(keys)
+        return self._reached[cache_key]
+
+    def _reach_value(self, module, name, value, owner, skip):
+        value = _unwrap(value)
+        if inspect.isfunction(value) or inspect.isclass(value):
+            if not self.in_project(value):
+                return set()
+            if skip and value.__module__ in self.skip_modules:
+                return set()
+            if inspect.isfunction(value):
+                return set(self.reach(value, owner, skip))
+            keys = {self.key(value)} - {None}
+            for member in _members(value):
+                keys |= self.reach(member, value, skip)
+            return keys
+        if _is_constant(name) and not isinstance(value, types.ModuleType):
+            if skip and name in self.skip_constants:
+                return set()
+            if _canonical(value) is not None:
+                return {f"const:{module}:{name}"}
+        return set()
+
+    def add_routes(self, router):
+        """Hash the routes of ``router`` with everything their handlers reach"""
+        for route in router.routes():
+            name = f"{route.method} {route.display}"
+            handler = route.handler
+            if handler is None:
+                self.routes[name] = digest(repr(route.respond(None)))
+                continue
+            owner = getattr(handler, "__self__", None)
+            for cell in getattr(handler, "__closure__", None) or ():
+                try:
+                    contents = cell.cell_contents
+                except ValueError:
+                    continue
+                if owner is None and self.in_project(type(contents)):
+                    owner = contents
+            function = getattr(handler, "__func__", handler)
+            owner_type = type(owner) if owner is not None else None
+            reached = self.reach(function, owner_type, skip=False)
+            parts = [inspect.getsource(function)]
+            parts += [f"{key}={self.hash(key)}" for key in sorted(reached)]
+            self.routes[name] = digest("\n".join(parts))
+
+    def hash(self, key):
+        """Current content hash of ``key``, or None when it does not resolve"""
+        if key not in self._hashes:
+            self._hashes[key] = self._compute(key)
+        return self._hashes[key]
+
+    def _compute(self, key):
+        kind, _, name = key.partition(":")
+        if kind == "route":
+            return self.routes.get(name)
+        if kind == "file":
+            try:
+                with open(os.path.join(self.root, name), "rb") as f:
+                    return hashlib.sha1(f.read()).hexdigest()[:16]
+            except OSError:
+                return None
+        module_name, _, qualname = name.partition(":")
+        try:
+            value = importlib.import_module(module_name)
+            for part in qualname.split("."):
+                value = inspect.getattr_static(value, part)
+        except (ImportError, ValueError, AttributeError):
+            return None
+        if kind == "const":
+            text = _canonical(value)
+            return None if text is None else digest(text)
+        if isinstance(value, property):
+            value = value.fget
+        elif isinstance(value, (staticmethod, classmethod)):
+            value = value.__func__
+        try:
+            return digest(inspect.getsource(_unwrap(value)))
+        except (OSError, TypeError):
+            return None
+
+    def changed(self, deps):
+        """Keys of ``deps`` (``{key: hash}``) whose content changed"""
+        return [key for key, value in deps.items() if self.hash(key) != value]
+
+
+class ImpactCache:
+    """Per-test dependencies and their hashes persisted as JSON"""
+
+    VERSION = 1
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+
+    @classmethod
+    def load(cls, path):
+        cache = cls(path)
+        if os.path.exists(path):
+            with open(path) as f:
+                data = json.load(f)
+            if data.get("version") == cls.VERSION:
+                cache.entries = {
+                    nodeid: ImpactEntry(**entry)
+                    for nodeid, entry in data.get("tests", {}).items()
+                }
+        return cache
+
+    def save(self):
+        tests = {nodeid: entry._asdict() for nodeid, entry in self.entries.items()}
+        with open(self.path, "w") as f:
+            json.dump(
+                {"version": self.VERSION, "tests": tests}, f, indent=1, sort_keys=True
+            )
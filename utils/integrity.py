@@ -0,0 +1,139 @@
+"""Referential integrity of carts against products and users.
+
+Checking each cart line with ``/products/{id}`` costs one request per line.
+``fetch_integrity`` instead lists ``/products``, ``/users`` and ``/carts``
+once, and ``check_integrity`` loads them into ``utils.columnar`` columns and
+joins every cart's ``userId`` and ``products[].productId`` against the known
+IDs as array operations, the same checks ``check_carts`` runs.
+
+The resulting ``IntegrityReport`` lists duplicate IDs, orphaned references
+and each cart's total computed from the referenced product prices.
+"""
+
+from collections import namedtuple
+
+import numpy as np
+
+from utils.columnar import (
+    MISSING_INT,
+    CartColumns,
+    ProductColumns,
+    duplicated,
+    id_column,
+    not_in,
+)
+
+Orphan = namedtuple("Orphan", ["cart_index", "cart_id", "field", "ref_id"])
+
+
+class IntegrityReport:
+    """Duplicates, orphans and cart totals found by ``check_integrity``"""
+
+    def __init__(self):
+        # Resource name -> IDs seen more than once, in first-repeat order
+        self.duplicates = {}
+        self.orphans = []
+        # Per cart, in response order: sum of price * quantity, None when a
+        # line is orphaned. Kept by position so repeated cart IDs stay apart.
+        self.cart_totals = []
+
+    @property
+    def ok(self):
+        return not self.orphans and not any(self.duplicates.values())
+
+    def problems(self):
+        """Describe every duplicate and orphan as one line each"""
+        lines = [
+            f"duplicate {resource} id {row_id}"
+            for resource, row_ids in self.duplicates.items()
+            for row_id in row_ids
+        ]
+        lines.extend(
+            f"cart [{o.cart_index}] id {o.cart_id}: {o.field} {o.ref_id!r} not found"
+            for o in self.orphans
+        )
+        return lines
+
+
+def _repeated(ids):
+    return [int(ids[i]) for i in duplicated(ids, ignore=MISSING_INT)]
+
+
+def _first_rows(ids, wanted):
+    """Row of each ``wanted`` ID in ``ids`` (the first when repeated), or -1"""
+    order = np.argsort(ids, kind="stable")
+    ordered = ids[order]
+    slots = np.searchsorted(ordered, wanted)
+    hit = (slots < len(ordered)) & (wanted != MISSING_INT)
+    hit[hit] = ordered[slots[hit]] == wanted[hit]
+    rows = np.full(len(wanted), -1, dtype=np.int64)
+    rows[hit] = order[slots[hit]]
+    return rows
+
+
+def check_integrity(products, users, carts):
+    """Join carts against the product and user IDs with array operations"""
+    carts = carts if isinstance(carts, list) else list(carts)
+    product_columns = ProductColumns.from_items(products)
+    user_ids = id_column(users)
+    columns = CartColumns.from_items(carts)
+    report = IntegrityReport()
+    report.duplicates = {
+        "products": _repeated(product_columns.ids),
+        "users": _repeated(user_ids),
+        "carts": _repeated(columns.ids),
+    }
+
+    rows = _first_rows(product_columns.ids, columns.product_ids)
+    found = rows >= 0
+    prices = np.zeros(len(rows))
+    prices[found] = np.nan_to_num(product_columns.prices[rows[found]])
+    quantities = np.where(columns.quantities == MISSING_INT, 0, columns.quantities)
+    totals = np.bincount(
+        columns.line_carts, weights=prices * quantities, minlength=len(carts)
+    )
+
+    # (cart index, line or -1 for the cart's userId, orphan) in report order
+    orphans = []
+    for index in not_in(columns.user_ids, user_ids[user_ids != MISSING_INT]):
+        cart = carts[index]
+        orphan = Orphan(int(index), cart.get("id"), "userId", cart.get("userId"))
+        orphans.append((index, -1, orphan))
+    for line in np.flatnonzero(~found):
+        index = columns.line_carts[line]
+        cart = carts[index]
+        item = cart["products"][line - columns.offsets[index]]
+        ref_id = item.get("productId") if isinstance(item, dict) else None
+        orphan = Orphan(int(index), cart.get("id"), "productId", ref_id)
+        orphans.append((index, line, orphan))
+    orphans.sort(key=lambda entry: entry[:2])
+    report.orphans = [orphan for _, _, orphan in orphans]
+    report.cart_totals = [round(total, 2) for total in totals.tolist()]
+    for index in np.unique(columns.line_carts[~found]).tolist():
+        report.cart_totals[index] = None
+    return report
+
+
+def fetch_integrity(client):
+    """List products, users and carts once each and check them"""
+    responses = [
+        client.list_products(),
+        client.list_users(),
+        client.list_carts(),
+    ]
+    for response in responses:
+        response.raise_for_status()
+    products, users, carts = (response.json() for response in responses)
+    return check_integrity(products, users, carts)
+
+
+def assert_integrity(report, max_reported=10):
+    """Fail with a readable summary when the report has any problem"""
+    problems = report.problems()
+    if problems:
+        shown = "\n".join(problems[:max_reported])
+        more = len(problems) - max_reported
+        suffix = f"\n... and {more} more" if more > 0 else ""
+        raise AssertionError(
+            f"{len(problems)} referential integrity problem(s):\n{shown}{suffix}"
+        )
@@ -0,0 +1,140 @@
+"""Incremental decoding of JSON array responses.
+
+``iter_json_array`` yields the items of a top-level JSON array as soon as
+each one has arrived, decoding them from a small rolling text buffer with
+``json.JSONDecoder.raw_decode``. Only the current item and the unread tail
+of the last chunk are held in memory, so peak memory does not grow with the
+size of the response and a bad item is seen before the rest is downloaded.
+"""
+
+import codecs
+import json
+import re
+import time
+
+_DECODER = json.JSONDecoder()
+_WHITESPACE = " \t\n\r"
+_END = object()
+_NUMBER_TAIL = re.compile(r"[-+.eE0-9]*\Z")
+_ESCAPE_TAIL = re.compile(r"u[0-9a-fA-F]{0,4}\Z")
+_LITERALS = ("true", "false", "null", "NaN", "Infinity", "-Infinity")
+
+
+def _skip_whitespace(buffer, pos):
+    while pos < len(buffer) and buffer[pos] in _WHITESPACE:
+        pos += 1
+    return pos
+
+
+def _truncated(error):
+    """Whether ``raw_decode`` failed only because the buffered text ended
+
+    The decoder reports some of these failures before the end of the text:
+    at the start of an unterminated string, of a cut ``\\uXXXX`` escape or
+    of a cut literal such as ``tr``.
+    """
+    text, pos = error.doc, error.pos
+    if pos >= len(text) or error.msg.startswith("Unterminated string"):
+        return True
+    if error.msg.startswith("Invalid \\uXXXX escape"):
+        return _ESCAPE_TAIL.match(text, pos) is not None
+    tail = text[pos:]
+    return any(literal.startswith(tail) for literal in _LITERALS)
+
+
+def iter_json_array(chunks, encoding="utf-8"):
+    """Yield the items of the JSON array spread over the byte ``chunks``"""
+    decode = codecs.getincrementaldecoder(encoding)().decode
+    chunks = iter(chunks)
+    buffer, pos, exhausted = "", 0, False
+    state = "open"  # then "item", "separator" and finally "closed"
+
+    def fill():
+        nonlocal buffer, pos, exhausted
+        chunk = next(chunks, None)
+        if chunk is None:
+            exhausted = True
+            buffer = buffer[pos:] + decode(b"", final=True)
+        else:
+            buffer = buffer[pos:] + decode(chunk)
+        pos = 0
+
+    while True:
+        pos = _skip_whitespace(buffer, pos)
+        if pos == len(buffer):
+            if exhausted:
+                if state == "closed":
+                    return
+                raise json.JSONDecodeError("Unterminated array", buffer, pos)
+            fill()
+            continue
+        char = buffer[pos]
+        if state == "closed":
+            raise json.JSONDecodeError("Extra data", buffer, pos)
+        if state == "open":
+            if char != "[":
+                raise json.JSONDecodeError("Expecting '['", buffer, pos)
+            pos += 1
+            state = "first"
+            continue
+        if state in ("first", "separator") and char == "]":
+            pos += 1
+            state = "closed"
+            continue
+        if state == "separator":
+            if char != ",":
+                raise json.JSONDecodeError("Expecting ',' delimiter", buffer, pos)
+            pos += 1
+            state = "item"
+            continue
+        try:
+            item, end = _DECODER.raw_decode(buffer, pos)
+        except json.JSONDecodeError as e:
+            # Malformed text before the end of the buffer is an error however
+            # the response continues; refill only when the item was cut off
+            if exhausted or not _truncated(e):
+                raise
+            fill()
+            continue
+        # "-25" or "-25." may be the start of a number that continues in the
+        # next chunk; only decode it once something else follows
+        if not exhausted and _NUMBER_TAIL.match(buffer, end):
+            fill()
+            continue
+        pos = end
+        state = "separator"
+        yield item
+
+
+def iter_json_items(response, chunk_size=64 * 1024):
+    """Stream the items of a JSON array response fetched with ``stream=True``
+
+    Body size and decode time are added to the response's ``timing`` record.
+    """
+    timing = getattr(response, "timing", None)
+    reading = [0.0]  # time spent waiting for the network, not decoding
+
+    def chunks():
+        source = response.iter_content(chunk_size)
+        while True:
+            started = time.perf_counter()
+            chunk = next(source, None)
+            reading[0] += time.perf_counter() - started
+            if chunk is None:
+                return
+            if timing is not None:
+                timing.bytes += len(chunk)
+            yield chunk
+
+    items = iter_json_array(chunks(), response.encoding or "utf-8")
+    try:
+        while True:
+            started, reading[0] = time.perf_counter(), 0.0
+            item = next(items, _END)
+            if timing is not None:
+                timing.decode += time.perf_counter() - started - reading[0]
+            if item is _END:
+                return
+            yield item
+    finally:
+        response.close()
@@ -0,0 +1,209 @@
+"""Load runner that replays test scenarios from a pool of worker threads.
+
+A run is described by a ``LoadSpec`` such as ``users=200,duration=60s,rate=500/s``:
+``users`` worker threads pick weighted scenarios at random until ``duration``
+elapses, with iterations started no faster than ``rate`` across the pool.
+Per-scenario and per-endpoint latencies go into ``LatencyHistogram``s, so
+memory stays bounded however long the run lasts.
+"""
+
+import random
+import re
+import threading
+import time
+from collections import namedtuple
+
+from utils.histogram import LatencyHistogram
+
+LoadSpec = namedtuple("LoadSpec", ["users", "duration", "rate"])
+Scenario = namedtuple("Scenario", ["name", "fn", "weight"])
+
+_DURATION = re.compile(r"^(\d+(?:\.\d+)?)(ms|s|m|h)?$")
+_DURATION_UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600, None: 1}
+_RATE = re.compile(r"^(\d+(?:\.\d+)?)(?:/(s|m))?$")
+
+
+def parse_duration(text):
+    """Parse ``250ms``, ``60s``, ``5m`` or a bare number of seconds"""
+    found = _DURATION.match(text.strip())
+    if found is None:
+        raise ValueError(f"invalid duration: {text!r}")
+    return float(found.group(1)) * _DURATION_UNITS[found.group(2)]
+
+
+def parse_load_spec(text):
+    """Parse ``users=N,duration=T,rate=R/s`` into a ``LoadSpec``"""
+    values = {"users": 10, "duration": 10.0, "rate": None}
+    for part in filter(None, (p.strip() for p in text.split(","))):
+        key, sep, value = part.partition("=")
+        if not sep or key not in values:
+            raise ValueError(f"invalid load option: {part!r}")
+        if key == "users":
+            values["users"] = int(value)
+        elif key == "duration":
+            values["duration"] = parse_duration(value)
+        else:
+            found = _RATE.match(value.strip())
+            if found is None:
+                raise ValueError(f"invalid rate: {value!r}")
+            per = 60.0 if found.group(2) == "m" else 1.0
+            values["rate"] = float(found.group(1)) / per
+    if values["users"] < 1 or values["duration"] <= 0:
+        raise ValueError("users and duration must be positive")
+    return LoadSpec(**values)
+
+
+class _Series:
+    """Latency histogram plus error count for one endpoint or scenario"""
+
+    __slots__ = ("histogram", "errors")
+
+    def __init__(self):
+        self.histogram = LatencyHistogram()
+        self.errors = 0
+
+
+class LoadStats:
+    """Thread-safe collector of per-endpoint and per-scenario latencies"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.endpoints = {}
+        self.scenarios = {}
+        self.started = None
+        self.finished = None
+
+    def _record(self, table, key, elapsed, failed):
+        with self._lock:
+            series = table.get(key)
+            if series is None:
+                series = table[key] = _Series()
+            series.histogram.record(elapsed * 1_000_000)
+            if failed:
+                series.errors += 1
+
+    def record_request(self, endpoint, elapsed, failed):
+        self._record(self.endpoints, endpoint, elapsed, failed)
+
+    def record_scenario(self, name, elapsed, failed):
+        self._record(self.scenarios, name, elapsed, failed)
+
+    def request_listener(self, endpoint_for):
+        """Build a client listener recording events under ``endpoint_for(method, url)``"""
+
+        def listener(event):
+            failed = event.error is not None or event.response.status_code >= 400
+            endpoint = endpoint_for(event.method, event.url)
+            self.record_request(endpoint, event.elapsed, failed)
+
+        return listener
+
+    @property
+    def elapsed(self):
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.perf_counter()) - self.started
+
+    def rows(self, table):
+        """Summaries (latencies in milliseconds) for every key of ``table``"""
+        elapsed = self.elapsed or 1.0
+        rows = []
+        for key, series in sorted(table.items()):
+            summary = series.histogram.summary()
+            count = summary["count"]
+            rows.append(
+                {
+                    "name": key,
+                    **summary,
+                    "rps": round(count / elapsed, 2),
+                    "errors": series.errors,
+                    "error_rate": round(series.errors / count, 4) if count else 0.0,
+                }
+            )
+        return rows
+
+    def report(self):
+        return {
+            "elapsed": round(self.elapsed, 3),
+            "endpoints": self.rows(self.endpoints),
+            "scenarios": self.rows(self.scenarios),
+        }
+
+
+def format_rows(title, rows):
+    """Render summary rows as a fixed-width text table"""
+    width = min(max([len(title)] + [len(row["name"]) for row in rows]), 80)
+    header = (
+        f"{title:<{width}} {'reqs':>7} {'rps':>8} {'err%':>6} "
+        f"{'p50':>8} {'p95':>8} {'p99':>8} {'max':>8}"
+    )
+    lines = [header, "-" * len(header)]
+    for row in rows:
+        lines.append(
+            f"{row['name'][-width:]:<{width}} {row['count']:>7} {row['rps']:>8.1f} "
+            f"{row['error_rate'] * 100:>6.2f} {row['p50']:>8.2f} {row['p95']:>8.2f} "
+            f"{row['p99']:>8.2f} {row['max']:>8.2f}"
+        )
+    return "\n".join(lines)
+
+
+class _Pacer:
+    """Hands out iteration start times no closer than ``1 / rate`` apart"""
+
+    def __init__(self, rate, deadline):
+        self._interval = 1.0 / rate if rate else 0.0
+        self._deadline = deadline
+        self._next = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def wait(self):
+        """Block until the next slot; return False once the run is over"""
+        if not self._interval:
+            return time.perf_counter() < self._deadline
+        with self._lock:
+            slot = max(self._next, time.perf_counter())
+            self._next = slot + self._interval
+        if slot >= self._deadline:
+            return False
+        delay = slot - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        return True
+
+
+def run_load(scenarios, spec, stats=None, seed=0):
+    """Run weighted ``scenarios`` according to ``spec`` and return ``LoadStats``"""
+    if not scenarios:
+        raise ValueError("no scenarios to run")
+    stats = stats or LoadStats()
+    cum_weights = []
+    total = 0.0
+    for scenario in scenarios:
+        total += scenario.weight
+        cum_weights.append(total)
+
+    stats.started = time.perf_counter()
+    pacer = _Pacer(spec.rate, stats.started + spec.duration)
+
+    def worker(index):
+        rng = random.Random(seed + index)
+        while pacer.wait():
+            scenario = rng.choices(scenarios, cum_weights=cum_weights)[0]
+            started = time.perf_counter()
+            failed = False
+            try:
+                scenario.fn()
+            except Exception:
+                failed = True
+            stats.record_scenario(scenario.name, time.perf_counter() - started, failed)
+
+    threads = [
+        threading.Thread(target=worker, args=(i,), name=f"load-user-{i}", daemon=True)
+        for i in range(spec.users)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    stats.finished = time.perf_counter()
+    return stats
@@ -0,0 +1,95 @@
+"""Per-test memory accounting on top of ``tracemalloc``.
+
+Traces are cleared when a test starts, so everything ``tracemalloc`` holds
+afterwards was allocated by that test: its fixtures, its body and its
+teardown. That keeps snapshots small (grouping a whole session's traces by
+line takes seconds) and makes the numbers easy to read:
+
+* peak: the highest traced memory while the test body ran, above its start;
+* net: what the test allocated and still holds after teardown, i.e. its
+  contribution to the session's growth;
+* allocation sites: the lines holding the most memory when the body returns.
+  Tracing with more than one frame per allocation charges library
+  allocations to the project line that called in, at a large cost in speed.
+
+A test's peak is compared with the median of its stored peaks by
+``check_peak``, which ignores growth below an absolute floor.
+"""
+
+import os
+import tracemalloc
+from collections import namedtuple
+from statistics import median
+
+AllocationSite = namedtuple("AllocationSite", ["location", "size", "count"])
+
+MemoryUsage = namedtuple("MemoryUsage", ["nodeid", "peak", "net", "sites", "endpoints"])
+
+PeakRegression = namedtuple(
+    "PeakRegression", ["nodeid", "baseline_kb", "peak_kb", "ratio"]
+)
+
+_IGNORED = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+
+def traced():
+    """Bytes allocated and still traced"""
+    return tracemalloc.get_traced_memory()[0]
+
+
+def kb(size):
+    return round(size / 1024, 1)
+
+
+def _location(frame, root):
+    filename = frame.filename
+    if filename.startswith(root):
+        filename = os.path.relpath(filename, root)
+    return f"{filename}:{frame.lineno}"
+
+
+def _site(traceback, root):
+    """The innermost frame in the project's own code, else the innermost"""
+    for frame in reversed(traceback):
+        if frame.filename.startswith(root) and "site-packages" not in frame.filename:
+            return frame
+    return traceback[-1]
+
+
+def allocation_sites(snapshot, rootpath, limit=5):
+    """The ``limit`` project lines holding the most memory in ``snapshot``
+
+    Project lines are those under ``rootpath``, shown relative to it.
+    Allocations made inside libraries are charged to the project line that
+    called into them when the snapshot kept enough frames to reach it.
+    """
+    root = os.path.join(str(rootpath), "")
+    sites = {}
+    for trace in snapshot.filter_traces(_IGNORED).traces:
+        frame = _site(trace.traceback, root)
+        size, count = sites.get(frame, (0, 0))
+        sites[frame] = (size + trace.size, count + 1)
+    ranked = sorted(sites.items(), key=lambda item: item[1][0], reverse=True)
+    return [
+        AllocationSite(_location(frame, root), size, count)
+        for frame, (size, count) in ranked[:limit]
+    ]
+
+
+def check_peak(nodeid, peak, samples, threshold=0.25, floor_kb=256):
+    """Return a ``PeakRegression`` when ``peak`` (bytes) grew past the stored
+    peaks (KB) by more than ``threshold`` and ``floor_kb``, else None"""
+    if not samples:
+        return None
+    baseline_kb, peak_kb = median(samples), kb(peak)
+    if peak_kb - baseline_kb <= floor_kb:
+        return None
+    if peak_kb <= baseline_kb * (1 + threshold):
+        return None
+    ratio = peak_kb / baseline_kb if baseline_kb else float("inf")
+    return PeakRegression(nodeid, round(baseline_kb, 1), peak_kb, round(ratio, 2))
@@ -0,0 +1,79 @@
+"""Helpers for parallel runs with ``pytest -n N`` (pytest-xdist).
+
+``plan_shards`` splits a collection into per-worker shards of similar
+expected duration, spreading the parametrized cases of each test (which all
+hit the same endpoint) over the workers. The worker helpers let plugins tell
+a worker from the controller and hand a worker's session totals over to the
+controller through xdist's ``workeroutput``.
+"""
+
+import statistics
+
+
+def is_worker(config):
+    """True inside a pytest-xdist worker process"""
+    return hasattr(config, "workerinput")
+
+
+def worker_id(config):
+    """``gw0``, ``gw1``... in a worker, ``main`` otherwise"""
+    return config.workerinput["workerid"] if is_worker(config) else "main"
+
+
+def worker_count(config):
+    """Number of processes sharing the run (1 without ``-n``)"""
+    return config.workerinput["workercount"] if is_worker(config) else 1
+
+
+def distributed(config):
+    """True on the controller or a worker of a ``pytest -n`` run"""
+    return is_worker(config) or getattr(config.option, "dist", "no") != "no"
+
+
+def send_to_controller(config, key, payload):
+    """Ship a worker's session totals to the controller (no-op elsewhere)"""
+    if is_worker(config):
+        config.workeroutput[key] = payload
+
+
+def received_from_worker(node, key):
+    """The payload a finished worker sent under ``key``, or None"""
+    return getattr(node, "workeroutput", {}).get(key)
+
+
+def case_group(nodeid):
+    """Node ID without its parametrization: the cases of one test"""
+    return nodeid.split("[", 1)[0]
+
+
+def expected_durations(nodeids, baseline):
+    """Median recorded duration per test, the median of those when unknown"""
+    known = {}
+    for nodeid in nodeids:
+        samples = baseline.get("tests", nodeid)
+        if samples:
+            known[nodeid] = statistics.median(samples)
+    default = statistics.median(known.values()) if known else 1.0
+    return [known.get(nodeid, default) for nodeid in nodeids]
+
+
+def plan_shards(nodeids, durations, workers):
+    """Split test indices into ``workers`` shards of similar total duration"""
+    loads = [0.0] * workers
+    shards = [[] for _ in range(workers)]
+    cases = [{} for _ in range(workers)]
+    for index in sorted(range(len(nodeids)), key=lambda i: (-durations[i], i)):
+        duration = durations[index]
+        group = case_group(nodeids[index])
+        # Any worker that can take the test without running past the busiest
+        # one will do (else the lightest); prefer the fewest cases of the test
+        makespan = max(loads)
+        fits = [w for w in range(workers) if loads[w] + duration <= makespan]
+        if not fits:
+            fits = [w for w in range(workers) if loads[w] == min(loads)]
+        worker = min(fits, key=lambda w: (cases[w].get(group, 0), loads[w], w))
+        loads[worker] += duration
+        shards[worker].append(index)
+        cases[worker][group] = cases[worker].get(group, 0) + 1
+    # Collection order keeps module and class fixtures warm within a shard
+    return [sorted(shard) for shard in shards]
@@ -0,0 +1,122 @@
+"""Latency baselines and statistical regression checks.
+
+Samples (milliseconds) are stored per test and per endpoint in a local JSON
+baseline file, keeping the most recent ``window`` samples of each key. A run
+is compared against it with a one-sided Mann-Whitney U test, which makes no
+normality assumption about latency distributions. A key is only flagged
+when the shift is significant, the median grew by more than the relative
+threshold, and the absolute growth is above the noise floor, so that
+sub-millisecond jitter against the mock never fails a build.
+"""
+
+import json
+import math
+import os
+from collections import namedtuple
+from statistics import median
+
+Regression = namedtuple(
+    "Regression",
+    ["key", "baseline_ms", "current_ms", "ratio", "p_value", "samples"],
+)
+
+
+def mann_whitney_u(current, baseline):
+    """One-sided p-value that ``current`` tends to be larger than ``baseline``
+
+    Uses the normal approximation with tie and continuity corrections.
+    """
+    n1, n2 = len(current), len(baseline)
+    if not n1 or not n2:
+        return 1.0
+    pooled = sorted(
+        [(value, 0) for value in current] + [(value, 1) for value in baseline]
+    )
+    ranks = [0.0] * len(pooled)
+    tie_term = 0.0
+    i = 0
+    while i < len(pooled):
+        j = i
+        while j + 1 < len(pooled) and pooled[j + 1][0] == pooled[i][0]:
+            j += 1
+        rank = (i + j) / 2 + 1
+        for k in range(i, j + 1):
+            ranks[k] = rank
+        ties = j - i + 1
+        tie_term += ties**3 - ties
+        i = j + 1
+    rank_sum = sum(rank for rank, (_, group) in zip(ranks, pooled) if group == 0)
+    u = rank_sum - n1 * (n1 + 1) / 2
+    n = n1 + n2
+    mean = n1 * n2 / 2
+    variance = n1 * n2 / 12 * ((n + 1) - tie_term / (n * (n - 1)))
+    if variance <= 0:
+        return 1.0
+    z = (u - mean - 0.5) / math.sqrt(variance)
+    return 0.5 * math.erfc(z / math.sqrt(2))
+
+
+def detect_regression(
+    key,
+    current,
+    baseline,
+    threshold=0.25,
+    alpha=0.05,
+    noise_floor_ms=2.0,
+    min_samples=5,
+):
+    """Return a ``Regression`` when ``current`` is significantly slower, else None"""
+    if len(baseline) < min_samples or not current:
+        return None
+    base_median, current_median = median(baseline), median(current)
+    if current_median - base_median <= noise_floor_ms:
+        return None
+    if current_median <= base_median * (1 + threshold):
+        return None
+    p_value = mann_whitney_u(current, baseline)
+    if p_value >= alpha:
+        return None
+    ratio = current_median / base_median if base_median else math.inf
+    return Regression(
+        key,
+        round(base_median, 3),
+        round(current_median, 3),
+        round(ratio, 2),
+        round(p_value, 5),
+        len(current),
+    )
+
+
+class Baseline:
+    """Rolling per-key latency samples persisted as JSON"""
+
+    VERSION = 1
+
+    def __init__(self, path, window=50):
+        self.path = path
+        self.window = window
+        self.samples = {"tests": {}, "endpoints": {}}
+
+    @classmethod
+    def load(cls, path, window=50):
+        baseline = cls(path, window)
+        if os.path.exists(path):
+            with open(path) as f:
+                data = json.load(f)
+            if data.get("version") == cls.VERSION:
+                for kind in baseline.samples:
+                    baseline.samples[kind] = data.get(kind, {})
+        return baseline
+
+    def get(self, kind, key):
+        return self.samples[kind].get(key, [])
+
+    def extend(self, kind, key, values):
+        merged = self.samples[kind].get(key, []) + [round(v, 3) for v in values]
+        self.samples[kind][key] = merged[-self.window :]
+
+    def save(self):
+        with open(self.path, "w") as f:
+            json.dump(
+                {"version": self.VERSION, **self.samples}, f, indent=1, sort_keys=True
+            )
@@ -0,0 +1,262 @@
+"""``pytest -m benchmark``: micro-benchmarks of the harness's own hot paths.
+
+Tests marked ``benchmark`` (the ``tests/benchmarks/`` suite) are deselected
+unless the ``-m`` expression selects the marker, so they never slow down the
+default run. They time harness operations with the ``benchmark`` fixture (see
+``utils.bench``); every measurement is listed in the terminal summary and
+``--bench-json`` writes them with their raw samples. ``--bench-compare``
+checks them against ``--bench-baseline`` with the same Mann-Whitney test as
+latency baselines (``utils.perfstats``) and fails the session on a
+significant slowdown; ``--bench-save`` appends the run to the baseline.
+"""
+
+import json
+import os
+import platform
+import sys
+from statistics import median
+
+import pytest
+from _pytest.mark.expression import Expression
+
+from utils.bench import measure, summarize
+from utils.parallel import distributed
+from utils.perfstats import Baseline, detect_regression
+from utils.plugins.timing import render_table
+
+MARKER = "benchmark"
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("bench", "harness micro-benchmarks (-m benchmark)")
+    group.addoption(
+        "--bench-baseline",
+        metavar="PATH",
+        default=".bench-baseline.json",
+        help="file with the stored samples per benchmark",
+    )
+    group.addoption(
+        "--bench-compare",
+        action="store_true",
+        help="fail the run when a benchmark is slower than its baseline",
+    )
+    group.addoption(
+        "--bench-save",
+        action="store_true",
+        help="append this run's samples to the benchmark baseline",
+    )
+    group.addoption(
+        "--bench-json",
+        metavar="PATH",
+        default=None,
+        help="write the measurements as JSON",
+    )
+    group.addoption(
+        "--bench-threshold",
+        type=float,
+        default=0.25,
+        help="relative median slowdown that counts as a regression (default 0.25)",
+    )
+    group.addoption(
+        "--bench-alpha",
+        type=float,
+        default=0.05,
+        help="significance level of the Mann-Whitney test (default 0.05)",
+    )
+    group.addoption(
+        "--bench-repeat",
+        type=int,
+        default=5,
+        help="timed rounds per benchmark (default 5)",
+    )
+    group.addoption(
+        "--bench-min-time",
+        type=float,
+        metavar="SECONDS",
+        default=0.05,
+        help="minimum duration of one round (default 0.05)",
+    )
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        "markers",
+        f"{MARKER}: harness micro-benchmark, only run with -m {MARKER}",
+    )
+    if selected(config) and distributed(config):
+        raise pytest.UsageError("benchmarks need a quiet machine; drop -n")
+    plugin = BenchPlugin(config)
+    config.pluginmanager.register(plugin, "fakestore-bench")
+    if config.pluginmanager.hasplugin("html"):
+        config.pluginmanager.register(
+            HtmlBenchSummary(plugin), "fakestore-bench-html"
+        )
+
+
+def selected(config):
+    """True when the ``-m`` expression selects tests marked ``benchmark``"""
+    markexpr = config.getoption("markexpr")
+    if not markexpr:
+        return False
+    try:
+        expression = Expression.compile(markexpr)
+    except SyntaxError:
+        # pytest reports the invalid expression itself
+        return False
+    return expression.evaluate(lambda name, **kwargs: name == MARKER)
+
+
+class BenchPlugin:
+    """Collect benchmark measurements and compare them with the baseline"""
+
+    def __init__(self, config):
+        self.config = config
+        self.measurements = []
+        self.regressions = []
+        # Summaries against the baseline as it was before this run
+        self.results = []
+
+    def pytest_collection_modifyitems(self, config, items):
+        if selected(config):
+            return
+        deselected = [item for item in items if item.get_closest_marker(MARKER)]
+        if deselected:
+            items[:] = [item for item in items if not item.get_closest_marker(MARKER)]
+            config.hook.pytest_deselected(items=deselected)
+
+    @pytest.fixture
+    def benchmark(self, request):
+        """Time a callable: ``benchmark(func, name=None, info=None)`` returns
+        a ``Measurement`` named after the test (and ``name``), with the
+        test's parameters and any ``info`` such as memory figures"""
+        callspec = getattr(request.node, "callspec", None)
+        params = dict(callspec.params) if callspec is not None else {}
+
+        def run(func, name=None, info=None):
+            key = request.node.nodeid
+            if name is not None:
+                key = f"{key}::{name}"
+            measurement = measure(
+                func,
+                key,
+                {**params, **(info or {})},
+                repeat=self.config.getoption("--bench-repeat"),
+                min_time=self.config.getoption("--bench-min-time"),
+            )
+            self.measurements.append(measurement)
+            return measurement
+
+        return run
+
+    @pytest.hookimpl(tryfirst=True)
+    def pytest_sessionfinish(self, session):
+        if not self.measurements:
+            return
+        options = self.config.option
+        baseline = Baseline.load(options.bench_baseline)
+        self.results = self.summarize(baseline)
+        if options.bench_compare:
+            for measurement in self.measurements:
+                regression = detect_regression(
+                    measurement.name,
+                    measurement.samples_us,
+                    baseline.get("tests", measurement.name),
+                    threshold=options.bench_threshold,
+                    alpha=options.bench_alpha,
+                    # Samples are microseconds per call; the threshold decides
+                    noise_floor_ms=0,
+                    min_samples=options.bench_repeat,
+                )
+                if regression is not None:
+                    self.regressions.append(regression)
+            if self.regressions:
+                session.exitstatus = pytest.ExitCode.TESTS_FAILED
+        if options.bench_json:
+            self.write_json(options.bench_json)
+        # Do not fold a regressed run into the baseline it regressed against
+        if options.bench_save and not self.regressions:
+            for measurement in self.measurements:
+                baseline.extend("tests", measurement.name, measurement.samples_us)
+            baseline.save()
+
+    def summarize(self, baseline):
+        """One row per measurement, with the baseline median when stored"""
+        rows = []
+        for measurement in self.measurements:
+            row = {"name": measurement.name, **summarize(measurement)}
+            stored = baseline.get("tests", measurement.name)
+            if stored:
+                base = median(stored)
+                row["baseline_median_us"] = round(base, 3)
+                row["ratio"] = round(row["median_us"] / base, 2) if base else None
+            rows.append(row)
+        return rows
+
+    def write_json(self, path):
+        results = []
+        for measurement, row in zip(self.measurements, self.results):
+            results.append(
+                {
+                    **row,
+                    "params": measurement.params,
+                    "loops": measurement.loops,
+                    "samples_us": measurement.samples_us,
+                }
+            )
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(
+                {
+                    "machine": {
+                        "python": sys.version.split()[0],
+                        "implementation": platform.python_implementation(),
+                        "platform": platform.platform(),
+                        "cpus": os.cpu_count(),
+                    },
+                    "regressions": [r._asdict() for r in self.regressions],
+                    "benchmarks": results,
+                },
+                f,
+                indent=2,
+            )
+
+    def pytest_terminal_summary(self, terminalreporter):
+        if not self.results:
+            return
+        write = terminalreporter.write_line
+        terminalreporter.write_sep("=", f"benchmarks: {len(self.results)}")
+        for row in self.results:
+            ratio = f" x{row['ratio']}" if row.get("ratio") else ""
+            write(
+                f"{row['median_us']:>14.3f}us  ±{row['iqr_us']:<10.3f} "
+                f"{row['name']}{ratio}"
+            )
+        for r in self.regressions:
+            write(
+                f"{r.key}: median {r.baseline_ms}us -> {r.current_ms}us "
+                f"(x{r.ratio}, p={r.p_value})",
+                red=True,
+            )
+
+
+class HtmlBenchSummary:
+    """pytest-html hook rendering the benchmark table"""
+
+    COLUMNS = (
+        ("name", "Benchmark"),
+        ("median_us", "Median us"),
+        ("min_us", "Min us"),
+        ("iqr_us", "IQR us"),
+        ("ops_per_s", "Calls/s"),
+    )
+
+    def __init__(self, plugin):
+        self.plugin = plugin
+
+    def pytest_html_results_summary(self, prefix, summary, postfix):
+        if self.plugin.results:
+            postfix.append(
+                render_table("Benchmarks", self.COLUMNS, self.plugin.results)
+            )
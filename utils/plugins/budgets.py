@@ -0,0 +1,211 @@
+"""Latency budgets per test and baseline regression detection.
+
+``@pytest.mark.latency_budget(p95_ms=..., max_ms=...)`` fails a test whose
+HTTP requests exceed the budget. With ``--perf-compare`` the run's per-test
+durations and per-endpoint request latencies are compared against the local
+baseline file (see ``utils.perfstats``) and significant slowdowns fail the
+session; ``--perf-save`` appends the run's samples to that baseline. Under
+``pytest -n`` workers send their endpoint samples to the controller, which
+alone compares and saves.
+"""
+
+import math
+import random
+
+import pytest
+
+from utils.parallel import is_worker, received_from_worker, send_to_controller
+from utils.perfstats import Baseline, detect_regression
+from utils.plugins.timing import PLUGIN_NAME as TIMING_PLUGIN
+from utils.plugins.timing import render_table
+
+# Per-endpoint samples kept from one run; larger runs are reservoir-sampled
+MAX_RUN_SAMPLES = 2000
+WORKER_OUTPUT = "fakestore_perf_samples"
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("perf", "latency budgets and baselines")
+    group.addoption(
+        "--perf-baseline",
+        metavar="PATH",
+        default=".perf-baseline.json",
+        help="baseline file with per-test and per-endpoint timings",
+    )
+    group.addoption(
+        "--perf-compare",
+        action="store_true",
+        help="fail the run when timings regress against the baseline",
+    )
+    group.addoption(
+        "--perf-save",
+        action="store_true",
+        help="append this run's timings to the baseline",
+    )
+    group.addoption(
+        "--perf-threshold",
+        type=float,
+        default=0.25,
+        help="relative median slowdown that counts as a regression (default 0.25)",
+    )
+    group.addoption(
+        "--perf-alpha",
+        type=float,
+        default=0.05,
+        help="significance level of the Mann-Whitney test (default 0.05)",
+    )
+    group.addoption(
+        "--perf-noise-floor-ms",
+        type=float,
+        default=2.0,
+        help="ignore median slowdowns smaller than this (default 2ms)",
+    )
+    group.addoption(
+        "--perf-window",
+        type=int,
+        default=50,
+        help="samples kept per key in the baseline (default 50)",
+    )
+
+
+def pytest_configure(config):
+    plugin = PerfPlugin(config)
+    config.pluginmanager.register(plugin, "fakestore-perf")
+    if config.pluginmanager.hasplugin("html"):
+        config.pluginmanager.register(
+            HtmlRegressionSummary(plugin), "fakestore-perf-html"
+        )
+
+
+def percentile(values, percent):
+    """Nearest-rank percentile of ``values``"""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(len(ordered) * percent / 100) - 1)]
+
+
+class PerfPlugin:
+    """Enforce latency budgets and compare the run against the baseline"""
+
+    def __init__(self, config):
+        self.config = config
+        self.test_samples = {}
+        self.endpoint_samples = {}
+        self._endpoint_seen = {}
+        self._rng = random.Random(0)
+        self.regressions = []
+
+    def _add_endpoint_sample(self, endpoint, value):
+        samples = self.endpoint_samples.setdefault(endpoint, [])
+        seen = self._endpoint_seen[endpoint] = self._endpoint_seen.get(endpoint, 0) + 1
+        if len(samples) < MAX_RUN_SAMPLES:
+            samples.append(value)
+        else:
+            slot = self._rng.randrange(seen)
+            if slot < MAX_RUN_SAMPLES:
+                samples[slot] = value
+
+    @pytest.hookimpl(hookwrapper=True)
+    def pytest_runtest_call(self, item):
+        outcome = yield
+        timing = self.config.pluginmanager.get_plugin(TIMING_PLUGIN)
+        records = (timing.current if timing is not None else None) or []
+        totals = [record.total * 1000 for record in records]
+        for record, total in zip(records, totals):
+            self._add_endpoint_sample(record.endpoint, total)
+
+        marker = item.get_closest_marker("latency_budget")
+        if marker is None or outcome.excinfo is not None or not totals:
+            return
+        exceeded = []
+        for name, percent in (("p95_ms", 95), ("max_ms", 100)):
+            budget = marker.kwargs.get(name)
+            if budget is None:
+                continue
+            observed = percentile(totals, percent)
+            if observed > budget:
+                exceeded.append(f"{name}={observed:.1f} > {budget}")
+        if exceeded:
+            outcome.force_exception(
+                pytest.fail.Exception(
+                    f"latency budget exceeded: {', '.join(exceeded)}", pytrace=False
+                )
+            )
+
+    def pytest_runtest_logreport(self, report):
+        if report.when == "call" and report.passed:
+            self.test_samples[report.nodeid] = [report.duration * 1000]
+
+    @pytest.hookimpl(optionalhook=True)
+    def pytest_testnodedown(self, node, error):
+        samples = received_from_worker(node, WORKER_OUTPUT) or {}
+        for endpoint, values in samples.items():
+            for value in values:
+                self._add_endpoint_sample(endpoint, value)
+
+    @pytest.hookimpl(tryfirst=True)
+    def pytest_sessionfinish(self, session):
+        options = self.config.option
+        if not (options.perf_compare or options.perf_save):
+            return
+        if is_worker(self.config):
+            send_to_controller(self.config, WORKER_OUTPUT, self.endpoint_samples)
+            return
+        baseline = Baseline.load(options.perf_baseline, window=options.perf_window)
+        runs = (("tests", self.test_samples), ("endpoints", self.endpoint_samples))
+        if options.perf_compare:
+            for kind, samples in runs:
+                for key, current in sorted(samples.items()):
+                    regression = detect_regression(
+                        f"{kind[:-1]} {key}",
+                        current,
+                        baseline.get(kind, key),
+                        threshold=options.perf_threshold,
+                        alpha=options.perf_alpha,
+                        noise_floor_ms=options.perf_noise_floor_ms,
+                    )
+                    if regression is not None:
+                        self.regressions.append(regression)
+            if self.regressions:
+                session.exitstatus = pytest.ExitCode.TESTS_FAILED
+        # Do not fold a regressed run into the baseline it regressed against
+        if options.perf_save and not self.regressions:
+            for kind, samples in runs:
+                for key, current in samples.items():
+                    baseline.extend(kind, key, current)
+            baseline.save()
+
+    def pytest_terminal_summary(self, terminalreporter):
+        if not self.config.option.perf_compare:
+            return
+        if not self.regressions:
+            terminalreporter.write_sep("=", "latency baseline: no regressions")
+            return
+        terminalreporter.write_sep(
+            "=", f"latency baseline: {len(self.regressions)} regression(s)", red=True
+        )
+        for r in self.regressions:
+            terminalreporter.write_line(
+                f"{r.key}: median {r.baseline_ms}ms -> {r.current_ms}ms "
+                f"(x{r.ratio}, p={r.p_value}, n={r.samples})"
+            )
+
+
+class HtmlRegressionSummary:
+    """pytest-html hook listing baseline regressions"""
+
+    COLUMNS = (
+        ("key", "Test / endpoint"),
+        ("baseline_ms", "Baseline median ms"),
+        ("current_ms", "Current median ms"),
+        ("ratio", "Ratio"),
+        ("p_value", "p-value"),
+        ("samples", "Samples"),
+    )
+
+    def __init__(self, plugin):
+        self.plugin = plugin
+
+    def pytest_html_results_summary(self, prefix, summary, postfix):
+        if self.plugin.regressions:
+            rows = [r._asdict() for r in self.plugin.regressions]
+            postfix.append(render_table("Latency regressions", self.COLUMNS, rows))
@@ -0,0 +1,142 @@
+"""``--http-cache``: conditional-GET response cache for the shared client.
+
+With the option set the shared ``api_client`` caches GET responses in a
+size-bounded ``utils.httpcache.ResponseCache``. Each test's cache activity is
+attached to it in Allure, and the session totals (hits, 304 revalidations,
+misses, evictions, invalidations) are reported in the terminal summary and
+the pytest-html summary; under ``pytest -n`` each worker has its own cache and
+the controller reports their sum.
+"""
+
+import json
+
+import allure
+import pytest
+
+from utils.httpcache import ResponseCache
+from utils.parallel import received_from_worker, send_to_controller
+from utils.plugins.timing import render_table
+
+WORKER_OUTPUT = "fakestore_http_cache"
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("http-cache", "HTTP response cache")
+    group.addoption(
+        "--http-cache",
+        action="store_true",
+        help="cache and revalidate GET responses of the shared client",
+    )
+    group.addoption(
+        "--http-cache-size",
+        type=int,
+        default=32,
+        metavar="MB",
+        help="maximum size of the cached response bodies (default 32MB)",
+    )
+
+
+def pytest_configure(config):
+    plugin = HttpCachePlugin(config)
+    config.pluginmanager.register(plugin, "fakestore-http-cache")
+    if config.pluginmanager.hasplugin("html"):
+        config.pluginmanager.register(
+            HtmlCacheSummary(plugin), "fakestore-http-cache-html"
+        )
+
+
+class HttpCachePlugin:
+    """Create the session cache and report its activity"""
+
+    def __init__(self, config):
+        self.config = config
+        self.cache = None
+        self.worker_totals = []
+
+    @pytest.fixture(scope="session")
+    def http_cache(self):
+        """Response cache for the shared client, or None when disabled"""
+        if self.config.getoption("--http-cache"):
+            size = self.config.getoption("--http-cache-size")
+            self.cache = ResponseCache(max_bytes=size * 2**20)
+        return self.cache
+
+    @pytest.fixture(autouse=True)
+    def http_cache_activity(self, http_cache):
+        """Attach the current test's cache hits and misses to its report"""
+        if http_cache is None:
+            yield None
+            return
+        before = http_cache.stats.copy()
+        yield http_cache
+        activity = http_cache.stats.since(before).as_dict()
+        if any(activity.values()):
+            allure.attach(
+                json.dumps(activity, indent=2),
+                name="HTTP cache",
+                attachment_type=allure.attachment_type.JSON,
+            )
+
+    def _totals(self):
+        totals = self.cache.stats.as_dict()
+        totals["entries"] = len(self.cache)
+        totals["bytes_cached"] = self.cache.size
+        return totals
+
+    def pytest_sessionfinish(self, session):
+        if self.cache is not None:
+            send_to_controller(self.config, WORKER_OUTPUT, self._totals())
+
+    @pytest.hookimpl(optionalhook=True)
+    def pytest_testnodedown(self, node, error):
+        totals = received_from_worker(node, WORKER_OUTPUT)
+        if totals is not None:
+            self.worker_totals.append(totals)
+
+    def summary(self):
+        """Session totals with the hit ratio, or None when disabled"""
+        parts = list(self.worker_totals)
+        if self.cache is not None:
+            parts.append(self._totals())
+        if not parts:
+            return None
+        stats = {name: sum(part[name] for part in parts) for name in parts[0]}
+        served = stats["hits"] + stats["revalidated"]
+        lookups = served + stats["misses"]
+        stats["hit_ratio"] = round(served / lookups, 3) if lookups else 0.0
+        return stats
+
+    def pytest_terminal_summary(self, terminalreporter):
+        stats = self.summary()
+        if stats is None:
+            return
+        terminalreporter.write_sep(
+            "=",
+            f"http cache: {stats['hit_ratio']:.0%} of GETs served from cache",
+        )
+        terminalreporter.write_line(
+            "  ".join(f"{name}={value}" for name, value in stats.items())
+        )
+
+
+class HtmlCacheSummary:
+    """pytest-html hook rendering the session cache totals"""
+
+    COLUMNS = (
+        ("hits", "Hits"),
+        ("revalidated", "304 revalidated"),
+        ("misses", "Misses"),
+        ("hit_ratio", "Hit ratio"),
+        ("stores", "Stored"),
+        ("evictions", "Evicted"),
+        ("invalidations", "Invalidated"),
+        ("bytes_served", "Bytes served"),
+    )
+
+    def __init__(self, plugin):
+        self.plugin = plugin
+
+    def pytest_html_results_summary(self, prefix, summary, postfix):
+        stats = self.plugin.summary()
+        if stats is not None:
+            postfix.append(render_table("HTTP cache", self.COLUMNS, [stats]))
@@ -0,0 +1,268 @@
+"""``--cpuprofile``: per-test and session CPU profiles with flame graphs.
+
+With the option set, a ``utils.cpuprofile.StackSampler`` samples every
+thread while each test's setup, body and teardown run. ``--cpuprofile-dir``
+receives:
+
+* ``tests/<test>.folded``: collapsed stacks of one test;
+* ``session.folded``: collapsed stacks of the whole session;
+* ``session.speedscope.json``: the session and every test as speedscope
+  profiles (open it at https://www.speedscope.app).
+
+Collapsed stacks render with ``flamegraph.pl``, inferno or speedscope; frame
+names carry their subsystem (``[mock]``, ``[http client]``,
+``[validation]``, ``[json]``, ``[test code]``). The CPU time per subsystem
+and the hottest functions are listed in the terminal and HTML summaries,
+and each test gets a "CPU profile" Allure attachment.
+"""
+
+import json
+import os
+import re
+
+import allure
+import pytest
+
+from utils.cpuprofile import (
+    Frame,
+    StackSampler,
+    collapse,
+    label,
+    self_times,
+    speedscope,
+    subsystem,
+    subsystem_times,
+)
+from utils.parallel import is_worker, received_from_worker, send_to_controller
+from utils.plugins.timing import render_table
+
+WORKER_OUTPUT = "fakestore_cpuprofile"
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("cpuprofile", "CPU profiling")
+    group.addoption(
+        "--cpuprofile",
+        action="store_true",
+        help="sample each test's CPU time and write flame graph profiles",
+    )
+    group.addoption(
+        "--cpuprofile-dir",
+        metavar="DIR",
+        default="cpuprofile",
+        help="directory receiving the profiles (default cpuprofile)",
+    )
+    group.addoption(
+        "--cpuprofile-interval",
+        type=float,
+        metavar="MS",
+        default=5.0,
+        help="milliseconds between samples (default 5)",
+    )
+    group.addoption(
+        "--cpuprofile-top",
+        type=int,
+        default=10,
+        help="hot spots listed in the summaries (default 10)",
+    )
+
+
+def pytest_configure(config):
+    if not config.getoption("--cpuprofile"):
+        return
+    plugin = CpuProfilePlugin(config)
+    config.pluginmanager.register(plugin, "fakestore-cpuprofile")
+    if config.pluginmanager.hasplugin("html"):
+        config.pluginmanager.register(
+            HtmlCpuSummary(plugin), "fakestore-cpuprofile-html"
+        )
+
+
+def _file_name(nodeid):
+    return re.sub(r"[^\w.\[\]-]+", "_", nodeid).strip("_") + ".folded"
+
+
+def _ms(microseconds):
+    return round(microseconds / 1000, 1)
+
+
+class CpuProfilePlugin:
+    """Sample stacks per test and aggregate them over the session"""
+
+    def __init__(self, config):
+        self.config = config
+        self.directory = config.getoption("--cpuprofile-dir")
+        self.top = config.getoption("--cpuprofile-top")
+        self.sampler = StackSampler(
+            config.rootpath, config.getoption("--cpuprofile-interval") / 1000
+        )
+        # nodeid -> {stack: microseconds}
+        self.tests = {}
+
+    def pytest_sessionstart(self, session):
+        os.makedirs(os.path.join(self.directory, "tests"), exist_ok=True)
+        self.sampler.start()
+
+    def pytest_unconfigure(self, config):
+        self.sampler.stop()
+
+    @pytest.hookimpl(hookwrapper=True, tryfirst=True)
+    def pytest_runtest_setup(self, item):
+        self.sampler.begin()
+        yield
+
+    @pytest.hookimpl(hookwrapper=True, trylast=True)
+    def pytest_runtest_teardown(self, item, nextitem):
+        yield
+        stacks = self.sampler.end()
+        self.tests[item.nodeid] = stacks
+        path = os.path.join(self.directory, "tests", _file_name(item.nodeid))
+        with open(path, "w") as output:
+            output.writelines(f"{line}\n" for line in collapse(stacks))
+        allure.attach(
+            json.dumps(
+                {
+                    "cpu_ms": _ms(sum(stacks.values())),
+                    "subsystems_ms": {
+                        name: _ms(weight)
+                        for name, weight in subsystem_times(stacks).most_common()
+                    },
+                    "hot_spots_ms": {
+                        label(frame): _ms(weight)
+                        for frame, weight in self_times(stacks).most_common(5)
+                    },
+                },
+                indent=2,
+            ),
+            name="CPU profile",
+            attachment_type=allure.attachment_type.JSON,
+        )
+
+    def session_stacks(self):
+        stacks = {}
+        for test in self.tests.values():
+            for stack, weight in test.items():
+                stacks[stack] = stacks.get(stack, 0) + weight
+        return stacks
+
+    def pytest_sessionfinish(self, session):
+        if is_worker(self.config):
+            send_to_controller(
+                self.config,
+                WORKER_OUTPUT,
+                {
+                    nodeid: [
+                        [list(map(list, stack)), weight]
+                        for stack, weight in test.items()
+                    ]
+                    for nodeid, test in self.tests.items()
+                },
+            )
+            return
+        stacks = self.session_stacks()
+        with open(os.path.join(self.directory, "session.folded"), "w") as output:
+            output.writelines(f"{line}\n" for line in collapse(stacks))
+        profiles = [("session", stacks), *self.tests.items()]
+        with open(
+            os.path.join(self.directory, "session.speedscope.json"), "w"
+        ) as output:
+            json.dump(speedscope(profiles), output)
+
+    @pytest.hookimpl(optionalhook=True)
+    def pytest_testnodedown(self, node, error):
+        output = received_from_worker(node, WORKER_OUTPUT)
+        if output is None:
+            return
+        for nodeid, samples in output.items():
+            self.tests[nodeid] = {
+                tuple(Frame(*frame) for frame in stack): weight
+                for stack, weight in samples
+            }
+
+    def subsystem_rows(self):
+        times = subsystem_times(self.session_stacks())
+        total = sum(times.values()) or 1
+        return [
+            {
+                "subsystem": name,
+                "cpu_ms": _ms(weight),
+                "share": f"{weight / total:.1%}",
+            }
+            for name, weight in times.most_common()
+        ]
+
+    def hot_spot_rows(self):
+        """The functions using the most CPU themselves"""
+        times = self_times(self.session_stacks())
+        total = sum(times.values()) or 1
+        return [
+            {
+                "function": frame.name,
+                "location": f"{frame.file}:{frame.line}",
+                "subsystem": subsystem(frame.file),
+                "self_ms": _ms(weight),
+                "share": f"{weight / total:.1%}",
+            }
+            for frame, weight in times.most_common(self.top)
+        ]
+
+    def test_rows(self):
+        """The tests using the most CPU"""
+        totals = sorted(
+            ((sum(stacks.values()), nodeid) for nodeid, stacks in self.tests.items()),
+            reverse=True,
+        )
+        return [
+            {"test": nodeid, "cpu_ms": _ms(weight)}
+            for weight, nodeid in totals[: self.top]
+        ]
+
+    def pytest_terminal_summary(self, terminalreporter):
+        write = terminalreporter.write_line
+        total = sum(self.session_stacks().values())
+        terminalreporter.write_sep(
+            "=", f"cpu profile: {_ms(total)}ms sampled in {len(self.tests)} tests"
+        )
+        for row in self.subsystem_rows():
+            write(f"{row['cpu_ms']:>10}ms {row['share']:>6}  {row['subsystem']}")
+        for row in self.hot_spot_rows():
+            write(
+                f"{row['self_ms']:>10}ms {row['share']:>6}  {row['function']} "
+                f"({row['location']}) [{row['subsystem']}]"
+            )
+        write(f"flame graphs: {os.path.join(self.directory, 'session.folded')}")
+
+
+class HtmlCpuSummary:
+    """pytest-html hooks rendering the CPU profile tables"""
+
+    SUBSYSTEM_COLUMNS = (
+        ("subsystem", "Subsystem"),
+        ("cpu_ms", "CPU ms"),
+        ("share", "Share"),
+    )
+    HOT_SPOT_COLUMNS = (
+        ("function", "Function"),
+        ("location", "Location"),
+        ("subsystem", "Subsystem"),
+        ("self_ms", "Self CPU ms"),
+        ("share", "Share"),
+    )
+    TEST_COLUMNS = (
+        ("test", "Test"),
+        ("cpu_ms", "CPU ms"),
+    )
+
+    def __init__(self, plugin):
+        self.plugin = plugin
+
+    def pytest_html_results_summary(self, prefix, summary, postfix):
+        plugin = self.plugin
+        tables = (
+            ("CPU time by subsystem", self.SUBSYSTEM_COLUMNS, plugin.subsystem_rows()),
+            ("CPU hot spots", self.HOT_SPOT_COLUMNS, plugin.hot_spot_rows()),
+            ("CPU time per test", self.TEST_COLUMNS, plugin.test_rows()),
+        )
+        for title, columns, rows in tables:
+            if rows:
+                postfix.append(render_table(title, columns, rows))
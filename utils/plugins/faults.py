@@ -0,0 +1,66 @@
+"""Fault profiles for the mocked API, selected by marker or ``--faults``.
+
+``@pytest.mark.faults("tail-latency")`` runs a test against a named profile
+from ``utils.faults.PROFILES``; ``@pytest.mark.faults(error_rate=0.1, ...)``
+builds a ``FaultProfile`` from keyword arguments. ``--faults=NAME`` applies
+a named profile to every test without its own marker. Profiles only affect
+the in-process mock; on live runs they are ignored.
+"""
+
+import pytest
+
+from utils.faults import PROFILES, FaultProfile, get_profile
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("faults", "fault and latency injection")
+    group.addoption(
+        "--faults",
+        metavar="PROFILE",
+        default=None,
+        help=f"inject faults into the mock: {', '.join(sorted(PROFILES))}",
+    )
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        "markers",
+        "faults(profile=None, **options): serve the test's mocked requests "
+        "through a fault profile",
+    )
+    name = config.getoption("--faults")
+    if name is not None and name not in PROFILES:
+        raise pytest.UsageError(f"--faults: unknown profile {name!r}")
+    config.pluginmanager.register(FaultsPlugin(name), "fakestore-faults")
+
+
+def profile_from_marker(marker):
+    """Build the ``FaultProfile`` a ``faults`` marker asks for"""
+    if marker.args:
+        if marker.kwargs:
+            raise pytest.UsageError("faults marker: pass a profile name or options")
+        return get_profile(marker.args[0])
+    return FaultProfile(**marker.kwargs)
+
+
+class FaultsPlugin:
+    """Apply the selected fault profile around each mocked test"""
+
+    def __init__(self, default):
+        self.default = default
+
+    @pytest.fixture(autouse=True)
+    def fault_profile(self, request, mocked, mock_router):
+        """The ``FaultProfile`` injected into the current test, or None"""
+        marker = request.node.get_closest_marker("faults")
+        if marker is not None:
+            profile = profile_from_marker(marker)
+        elif self.default is not None:
+            profile = get_profile(self.default)
+        else:
+            profile = None
+        if profile is None or not mocked:
+            yield None
+            return
+        with mock_router.inject_faults(profile):
+            yield profile
@@ -0,0 +1,255 @@
+"""``--impact``: run only the tests a change can affect.
+
+Every test that runs under ``--impact`` has its dependencies recorded in
+``--impact-cache`` with content hashes (see ``utils.impact``): its own
+source, the fixtures it uses, the project code and constants (such as
+schemas) they reach, and, at run time, the mock routes it was served and
+the data behind each of them: the ``MOCK_<RESOURCE>`` dataset and the
+endpoint spec that pads it. Reached through fixtures, the ``FakeStore``
+backend is tracked through those routes only, so editing ``MOCK_CARTS``,
+``carts.json`` or a cart handler selects the tests that read carts rather
+than every test using the mock. Tests that name ``FakeStore`` (or a
+dataset) themselves depend on its source statically, like any other code.
+
+The next ``--impact`` run deselects the tests whose recorded hashes all
+still match, unless they failed or were skipped last time or carry a marker
+listed in ``--impact-always`` (default ``smoke``). New tests always run. A
+change to a file in ``--impact-global`` reruns everything.
+"""
+
+import os
+
+import pytest
+
+from utils.fakestore import FakeStore
+from utils.impact import DependencyScanner, ImpactCache, ImpactEntry
+from utils.parallel import is_worker, received_from_worker, send_to_controller
+from utils.router import MockRouter
+
+WORKER_OUTPUT = "fakestore_impact"
+# Reached from fixtures, tracked through the mock routes a test is served
+RUNTIME_MODULES = ("utils.fakestore",)
+DATASETS = {resource: f"MOCK_{resource.upper()}" for resource in FakeStore.RESOURCES}
+REASONS_SHOWN = 10
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("impact", "test impact analysis")
+    group.addoption(
+        "--impact",
+        action="store_true",
+        help="run only tests whose recorded dependencies changed, and record them",
+    )
+    group.addoption(
+        "--impact-cache",
+        metavar="PATH",
+        default=".impact-cache.json",
+        help="file with each test's dependencies and their hashes",
+    )
+    group.addoption(
+        "--impact-always",
+        metavar="MARKERS",
+        default="smoke",
+        help="comma-separated markers of tests that always run (default smoke)",
+    )
+    group.addoption(
+        "--impact-global",
+        metavar="FILES",
+        default="pytest.ini,requirements.txt",
+        help="comma-separated files every test depends on",
+    )
+
+
+def _split(option):
+    return [part.strip() for part in option.split(",") if part.strip()]
+
+
+def pytest_configure(config):
+    if not config.getoption("--impact"):
+        return
+    if config.getoption("--shared-backend", default=False):
+        raise pytest.UsageError(
+            "--impact records the routes served in-process; drop --shared-backend"
+        )
+    config.pluginmanager.register(ImpactPlugin(config), "fakestore-impact")
+
+
+class ImpactPlugin:
+    """Select affected tests and record what every executed test touched"""
+
+    def __init__(self, config):
+        self.config = config
+        self.cache = ImpactCache.load(config.getoption("--impact-cache"))
+        self.always = set(_split(config.getoption("--impact-always")))
+        self.global_keys = {
+            f"file:{path}" for path in _split(config.getoption("--impact-global"))
+        }
+        self.scanner = DependencyScanner(
+            config.rootpath, RUNTIME_MODULES, DATASETS.values()
+        )
+        self.scanner.add_routes(FakeStore().mount(MockRouter("http://impact.invalid")))
+        # The endpoint specs pad the MOCK_* datasets (``utils.plugins.specs``)
+        self.spec_dir = config.getoption("--spec-dir", default=None)
+        # nodeid -> (static keys, fixture names, module holding MOCK_* datasets)
+        self.analyzed = {}
+        self.reasons = {}
+        self.collected = 0
+        self.recorded = {}
+        self._routes = None
+        self._failed = set()
+        self._skipped = set()
+
+    def analyze(self, item):
+        """Static dependencies of a collected test"""
+        function = getattr(item, "function", None)
+        keys = set(self.global_keys)
+        if function is not None:
+            # What the test names itself is static even in the runtime modules
+            keys |= self.scanner.reach(function, skip=False)
+        datasets = None
+        fixtureinfo = getattr(item, "_fixtureinfo", None)
+        definitions = fixtureinfo.name2fixturedefs if fixtureinfo else {}
+        for name, defs in definitions.items():
+            func = defs[-1].func
+            if self.scanner.in_project(getattr(func, "__func__", func)):
+                keys |= self.scanner.reach(func)
+            if name == "fake_store":
+                datasets = func.__module__
+        # Hash now: module-level caches such as ``_CHECKS`` fill up as tests run
+        for key in keys.union(*self.dataset_keys(datasets).values()):
+            self.scanner.hash(key)
+        self.analyzed[item.nodeid] = (keys, sorted(definitions), datasets)
+        return keys
+
+    def dataset_keys(self, module):
+        """Keys of the data behind each resource's routes, by resource"""
+        if module is None:
+            return {}
+        keys = {
+            resource: {f"const:{module}:{name}"} for resource, name in DATASETS.items()
+        }
+        if self.spec_dir is not None:
+            for resource in keys:
+                path = os.path.join(self.spec_dir, f"{resource}.json")
+                keys[resource].add(f"file:{path}")
+        return keys
+
+    def reason(self, item):
+        """Why ``item`` has to run, or None when nothing it depends on changed"""
+        keys = self.analyze(item)
+        entry = self.cache.entries.get(item.nodeid)
+        if getattr(item, "function", None) is None or entry is None:
+            return "new"
+        if entry.outcome != "passed":
+            return f"{entry.outcome} last time"
+        changed = self.scanner.changed(entry.deps)
+        if changed:
+            return f"{changed[0]} changed"
+        added = sorted(keys - entry.deps.keys())
+        if added:
+            return f"now uses {added[0]}"
+        if any(item.get_closest_marker(marker) for marker in self.always):
+            return "always"
+        return None
+
+    def pytest_collection_modifyitems(self, config, items):
+        selected, deselected = [], []
+        for item in items:
+            reason = self.reason(item)
+            if reason is None:
+                deselected.append(item)
+            else:
+                self.reasons[item.nodeid] = reason
+                selected.append(item)
+        self.collected = len(items)
+        if deselected:
+            items[:] = selected
+            config.hook.pytest_deselected(items=deselected)
+
+    @pytest.fixture(autouse=True)
+    def impact_routes(self, mock_router):
+        """Routes the mock serves during the current test"""
+        routes = set()
+        self._routes = routes
+        mock_router.observers.append(routes.add)
+        yield routes
+        mock_router.observers.remove(routes.add)
+
+    def pytest_runtest_logreport(self, report):
+        if report.nodeid not in self.analyzed:
+            # The controller of a pytest -n run; workers record
+            return
+        if report.failed:
+            self._failed.add(report.nodeid)
+        elif report.skipped:
+            self._skipped.add(report.nodeid)
+        if report.when == "teardown":
+            self.record(report.nodeid)
+
+    def record(self, nodeid):
+        keys, fixtures, datasets = self.analyzed[nodeid]
+        routes, self._routes = self._routes or (), None
+        endpoints = sorted({f"{route.method} {route.display}" for route in routes})
+        keys = set(keys) | {f"route:{endpoint}" for endpoint in endpoints}
+        dataset_keys = self.dataset_keys(datasets)
+        for route in routes:
+            keys |= dataset_keys.get(route.segments[0], set())
+        if nodeid in self._failed:
+            outcome = "failed"
+        elif nodeid in self._skipped:
+            # Its dependencies were never exercised; run it again next time
+            outcome = "skipped"
+        else:
+            outcome = "passed"
+        self.recorded[nodeid] = ImpactEntry(
+            {key: self.scanner.hash(key) for key in sorted(keys)},
+            fixtures,
+            endpoints,
+            outcome,
+        )
+
+    def pytest_sessionfinish(self, session):
+        if is_worker(self.config):
+            send_to_controller(
+                self.config,
+                WORKER_OUTPUT,
+                {
+                    "collected": self.collected,
+                    "reasons": self.reasons,
+                    "recorded": {
+                        nodeid: list(entry) for nodeid, entry in self.recorded.items()
+                    },
+                },
+            )
+            return
+        self.cache.entries.update(self.recorded)
+        self.cache.save()
+
+    @pytest.hookimpl(optionalhook=True)
+    def pytest_testnodedown(self, node, error):
+        output = received_from_worker(node, WORKER_OUTPUT)
+        if output is None:
+            return
+        # Every worker collects (and selects) the same tests
+        self.collected = output["collected"]
+        self.reasons.update(output["reasons"])
+        for nodeid, entry in output["recorded"].items():
+            self.recorded[nodeid] = ImpactEntry(*entry)
+
+    def pytest_terminal_summary(self, terminalreporter):
+        write = terminalreporter.write_line
+        always = sum(1 for reason in self.reasons.values() if reason == "always")
+        terminalreporter.write_sep(
+            "=",
+            f"impact: {len(self.reasons)} of {self.collected} tests selected "
+            f"({len(self.reasons) - always} affected, {always} always run)",
+        )
+        shown = [
+            (nodeid, reason)
+            for nodeid, reason in sorted(self.reasons.items())
+            if reason != "always"
+        ]
+        for nodeid, reason in shown[:REASONS_SHOWN]:
+            write(f"{nodeid}: {reason}")
+        if len(shown) > REASONS_SHOWN:
+            write(f"... and {len(shown) - REASONS_SHOWN} more")
@@ -0,0 +1,177 @@
+"""``--load`` mode: replay the selected tests as weighted load scenarios.
+
+Every selected test first runs once as usual. Tests that pass become
+scenarios; just before the final teardown (while session fixtures and the
+mock are still up) they are replayed from a worker pool according to the
+load spec, and the per-endpoint and per-scenario results are reported.
+
+Each iteration runs in its own ``FakeStore`` namespace, forked from the store
+as seeded, and router overlay, so neither the earlier tests' writes nor the
+other iterations' creates and deletes reach it. It also gets fresh values
+of the function-scoped fixtures it takes. Tests taking a function-scoped
+fixture with a teardown (or ``request``) cannot be rebuilt per iteration
+and are not replayed.
+"""
+
+import inspect
+import itertools
+import json
+import threading
+
+import pytest
+
+from utils.loadtest import LoadStats, Scenario, format_rows, parse_load_spec, run_load
+from utils.parallel import distributed
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("load", "load testing")
+    group.addoption(
+        "--load",
+        metavar="SPEC",
+        default=None,
+        help="replay selected tests as load, e.g. users=200,duration=60s,rate=500/s",
+    )
+    group.addoption(
+        "--load-report",
+        metavar="PATH",
+        default=None,
+        help="write the load results as JSON to PATH",
+    )
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        "markers",
+        "load_weight(weight): relative weight of a test when replayed by --load",
+    )
+    spec = config.getoption("--load")
+    if spec:
+        if distributed(config):
+            raise pytest.UsageError("--load runs its own worker pool; drop -n")
+        try:
+            parsed = parse_load_spec(spec)
+        except ValueError as exc:
+            raise pytest.UsageError(f"--load: {exc}")
+        config.pluginmanager.register(LoadPlugin(config, parsed), "fakestore-load")
+
+
+class LoadPlugin:
+    """Collect passing tests as scenarios and replay them before teardown"""
+
+    BASE_NAMESPACE = "load-base"
+
+    def __init__(self, config, spec):
+        self.config = config
+        self.spec = spec
+        self.scenarios = []
+        self.unreplayable = []
+        self.stats = None
+        self._client = None
+        self._router = None
+        self._store = None
+        self._calls = None
+        self._async_listeners = None
+        self._iterations = itertools.count()
+
+    @pytest.fixture(scope="session", autouse=True)
+    def _load_target(
+        self, api_client, mock_router, fake_store, responses_mock, async_listeners
+    ):
+        """Expose the shared clients, route table and store to the load runner"""
+        self._client = api_client
+        self._router = mock_router
+        self._store = fake_store
+        self._calls = responses_mock.calls if responses_mock is not None else None
+        self._async_listeners = async_listeners
+        # Fork the tables before any test's overlay writes to them
+        with fake_store.namespace(self.BASE_NAMESPACE):
+            pass
+
+    @pytest.hookimpl(hookwrapper=True)
+    def pytest_runtest_call(self, item):
+        outcome = yield
+        if outcome.excinfo is not None or not hasattr(item, "obj"):
+            return
+        definitions = item._fixtureinfo.name2fixturedefs
+        params = item.callspec.params if hasattr(item, "callspec") else {}
+        kwargs, fresh = {}, {}
+        for name in inspect.signature(item.obj).parameters:
+            if name == "request":
+                self.unreplayable.append(item.nodeid)
+                return
+            kwargs[name] = item.funcargs[name]
+            fixturedef = definitions.get(name, [None])[-1]
+            if name in params or fixturedef is None or fixturedef.scope != "function":
+                continue
+            if inspect.isgeneratorfunction(fixturedef.func):
+                self.unreplayable.append(item.nodeid)
+                return
+            # Funcargs are cleared at teardown, keep what the fixture needs
+            arguments = {arg: item.funcargs[arg] for arg in fixturedef.argnames}
+            fresh[name] = (fixturedef.func, arguments)
+        marker = item.get_closest_marker("load_weight")
+        weight = float(marker.args[0]) if marker else 1.0
+        self.scenarios.append(
+            Scenario(item.nodeid, self._iteration(item.obj, kwargs, fresh), weight)
+        )
+
+    def _iteration(self, fn, kwargs, fresh):
+        """One isolated run of ``fn`` with fresh function-scoped fixtures"""
+
+        def run():
+            namespace = f"load-{threading.get_ident()}-{next(self._iterations)}"
+            if self._calls is not None:
+                # Nothing asserts on them during a load run; keep memory flat
+                self._calls.reset()
+            try:
+                scope = self._store.namespace(namespace, parent=self.BASE_NAMESPACE)
+                with scope, self._router.overlay():
+                    values = {
+                        name: func(**arguments)
+                        for name, (func, arguments) in fresh.items()
+                    }
+                    fn(**{**kwargs, **values})
+            finally:
+                self._store.drop_namespace(namespace)
+
+        return run
+
+    @pytest.hookimpl(hookwrapper=True)
+    def pytest_runtest_teardown(self, item, nextitem):
+        if nextitem is None and self.scenarios and self._client is not None:
+            self.stats = LoadStats()
+            listener = self.stats.request_listener(self._router.endpoint_for)
+            self._client.add_listener(listener)
+            self._async_listeners.append(listener)
+            try:
+                run_load(self.scenarios, self.spec, stats=self.stats)
+            finally:
+                self._client.remove_listener(listener)
+                self._async_listeners.remove(listener)
+                self._store.drop_namespace(self.BASE_NAMESPACE)
+        yield
+
+    def pytest_terminal_summary(self, terminalreporter):
+        if self.stats is None:
+            terminalreporter.write_sep("=", "load test: no passing scenarios")
+            return
+        report = self.stats.report()
+        spec = self.spec
+        rate = f"{spec.rate:g}/s" if spec.rate else "unbounded"
+        terminalreporter.write_sep(
+            "=",
+            f"load test: {spec.users} users, {report['elapsed']:.1f}s, rate {rate}",
+        )
+        terminalreporter.write_line(format_rows("endpoint (ms)", report["endpoints"]))
+        terminalreporter.write_line("")
+        terminalreporter.write_line(format_rows("scenario (ms)", report["scenarios"]))
+        if self.unreplayable:
+            terminalreporter.write_line(
+                f"not replayed ({len(self.unreplayable)} tests take `request` or "
+                "a fixture with a teardown): " + ", ".join(self.unreplayable[:5])
+            )
+        path = self.config.getoption("--load-report")
+        if path:
+            with open(path, "w") as f:
+                json.dump({"spec": spec._asdict(), **report}, f, indent=2)
@@ -0,0 +1,364 @@
+"""``--memprofile``: per-test memory profiling and leak detection.
+
+With the option set, ``tracemalloc`` records for every test its peak and
+net memory and the lines holding the most memory when its body returns (see
+``utils.memprofile``), and for every fixture what its setup and teardown
+allocate and never free: a function-scoped fixture such as
+``mock_api_responses`` that leaves something behind shows up as session
+growth. Each test gets a "Memory" Allure attachment; the largest tests,
+endpoints and fixtures are listed in the terminal and HTML summaries.
+
+``--memprofile-save`` appends every test's peak to ``--memprofile-baseline``.
+A test whose peak exceeds the median of its stored peaks by more than
+``--memprofile-threshold`` (and ``--memprofile-floor-kb``) fails.
+``--memprofile-frames`` trades tracing speed for allocation sites in project
+code rather than in the libraries it calls.
+"""
+
+import json
+import tracemalloc
+
+import allure
+import pytest
+
+from utils.memprofile import (
+    AllocationSite,
+    MemoryUsage,
+    PeakRegression,
+    allocation_sites,
+    check_peak,
+    kb,
+    traced,
+)
+from utils.parallel import is_worker, received_from_worker, send_to_controller
+from utils.perfstats import Baseline
+from utils.plugins.timing import PLUGIN_NAME as TIMING_PLUGIN
+from utils.plugins.timing import render_table
+
+WORKER_OUTPUT = "fakestore_memprofile"
+SUMMARY_ROWS = 10
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("memprofile", "memory profiling")
+    group.addoption(
+        "--memprofile",
+        action="store_true",
+        help="record peak and net memory per test and fixture with tracemalloc",
+    )
+    group.addoption(
+        "--memprofile-baseline",
+        metavar="PATH",
+        default=".mem-baseline.json",
+        help="file with the stored peak memory per test",
+    )
+    group.addoption(
+        "--memprofile-save",
+        action="store_true",
+        help="append this run's peaks to the memory baseline",
+    )
+    group.addoption(
+        "--memprofile-threshold",
+        type=float,
+        default=0.25,
+        help="relative peak growth over the baseline that fails a test "
+        "(default 0.25)",
+    )
+    group.addoption(
+        "--memprofile-floor-kb",
+        type=float,
+        default=256,
+        help="ignore peak growth smaller than this (default 256KB)",
+    )
+    group.addoption(
+        "--memprofile-top",
+        type=int,
+        default=5,
+        help="allocation sites reported per test (default 5)",
+    )
+    group.addoption(
+        "--memprofile-frames",
+        type=int,
+        default=1,
+        help="frames traced per allocation; more attribute library "
+        "allocations to project code but slow tracing down (default 1)",
+    )
+
+
+def pytest_configure(config):
+    if not config.getoption("--memprofile"):
+        return
+    plugin = MemProfilePlugin(config)
+    config.pluginmanager.register(plugin, "fakestore-memprofile")
+    if config.pluginmanager.hasplugin("html"):
+        config.pluginmanager.register(
+            HtmlMemorySummary(plugin), "fakestore-memprofile-html"
+        )
+
+
+class MemProfilePlugin:
+    """Trace allocations per test and per fixture"""
+
+    def __init__(self, config):
+        self.config = config
+        self.top = config.getoption("--memprofile-top")
+        self.frames = config.getoption("--memprofile-frames")
+        self.baseline = Baseline.load(config.getoption("--memprofile-baseline"))
+        self.tests = []
+        self.fixtures = {}
+        self.regressions = []
+        self._live_fixtures = {}
+        self._call = None
+
+    def pytest_sessionstart(self, session):
+        tracemalloc.start(self.frames)
+
+    def pytest_unconfigure(self, config):
+        tracemalloc.stop()
+
+    @pytest.hookimpl(hookwrapper=True, tryfirst=True)
+    def pytest_runtest_setup(self, item):
+        if not tracemalloc.is_tracing():
+            # A test stopped tracing for its own measurements
+            tracemalloc.start(self.frames)
+        tracemalloc.clear_traces()
+        self._call = None
+        yield
+
+    @pytest.hookimpl(hookwrapper=True)
+    def pytest_runtest_call(self, item):
+        tracemalloc.reset_peak()
+        start = traced()
+        outcome = yield
+        if not tracemalloc.is_tracing():
+            return
+        peak = tracemalloc.get_traced_memory()[1] - start
+        sites = allocation_sites(
+            tracemalloc.take_snapshot(), self.config.rootpath, self.top
+        )
+        timing = self.config.pluginmanager.get_plugin(TIMING_PLUGIN)
+        records = (timing.current if timing is not None else None) or []
+        endpoints = sorted({record.endpoint for record in records})
+        self._call = (peak, sites, endpoints)
+        if outcome.excinfo is not None:
+            return
+        regression = check_peak(
+            item.nodeid,
+            peak,
+            self.baseline.get("tests", item.nodeid),
+            threshold=self.config.getoption("--memprofile-threshold"),
+            floor_kb=self.config.getoption("--memprofile-floor-kb"),
+        )
+        if regression is not None:
+            self.regressions.append(regression)
+            outcome.force_exception(
+                pytest.fail.Exception(
+                    f"peak memory {regression.peak_kb}KB exceeds the baseline "
+                    f"{regression.baseline_kb}KB (x{regression.ratio})",
+                    pytrace=False,
+                )
+            )
+
+    @pytest.hookimpl(hookwrapper=True, trylast=True)
+    def pytest_runtest_teardown(self, item, nextitem):
+        yield
+        if self._call is None or not tracemalloc.is_tracing():
+            return
+        peak, sites, endpoints = self._call
+        usage = MemoryUsage(item.nodeid, peak, traced(), sites, endpoints)
+        self.tests.append(usage)
+        allure.attach(
+            json.dumps(
+                {
+                    "peak_kb": kb(usage.peak),
+                    "net_kb": kb(usage.net),
+                    "endpoints": usage.endpoints,
+                    "sites": [
+                        {"location": s.location, "kb": kb(s.size), "blocks": s.count}
+                        for s in usage.sites
+                    ],
+                },
+                indent=2,
+            ),
+            name="Memory",
+            attachment_type=allure.attachment_type.JSON,
+        )
+
+    # Innermost wrapper, so reporting plugins' own bookkeeping is not counted
+    @pytest.hookimpl(hookwrapper=True, trylast=True)
+    def pytest_fixture_setup(self, fixturedef, request):
+        start = traced()
+        yield
+        # [name, bytes kept by setup, traced memory when teardown starts]
+        state = [fixturedef.argname, traced() - start, None]
+        self._live_fixtures[id(fixturedef)] = state
+
+        def teardown_starts():
+            state[2] = traced()
+
+        # Finalizers run last-in first-out: this one runs before the
+        # fixture's own teardown registered during setup
+        fixturedef.addfinalizer(teardown_starts)
+
+    def pytest_fixture_post_finalizer(self, fixturedef, request):
+        state = self._live_fixtures.pop(id(fixturedef), None)
+        if state is None or state[2] is None:
+            return
+        name, kept, teardown_start = state
+        self._add_fixture(name, 1, kept + traced() - teardown_start)
+
+    def _add_fixture(self, name, instances, kept):
+        count, total = self.fixtures.get(name, (0, 0))
+        self.fixtures[name] = (count + instances, total + kept)
+
+    def pytest_sessionfinish(self, session):
+        if is_worker(self.config):
+            send_to_controller(
+                self.config,
+                WORKER_OUTPUT,
+                {
+                    "tests": [
+                        [*usage[:3], [tuple(s) for s in usage.sites], usage.endpoints]
+                        for usage in self.tests
+                    ],
+                    "fixtures": self.fixtures,
+                    "regressions": [tuple(r) for r in self.regressions],
+                },
+            )
+            return
+        if self.config.getoption("--memprofile-save") and not self.regressions:
+            for usage in self.tests:
+                self.baseline.extend("tests", usage.nodeid, [kb(usage.peak)])
+            self.baseline.save()
+
+    @pytest.hookimpl(optionalhook=True)
+    def pytest_testnodedown(self, node, error):
+        output = received_from_worker(node, WORKER_OUTPUT)
+        if output is None:
+            return
+        for nodeid, peak, net, sites, endpoints in output["tests"]:
+            sites = [AllocationSite(*site) for site in sites]
+            self.tests.append(MemoryUsage(nodeid, peak, net, sites, endpoints))
+        for name, (count, kept) in output["fixtures"].items():
+            self._add_fixture(name, count, kept)
+        self.regressions.extend(PeakRegression(*r) for r in output["regressions"])
+
+    def top_tests(self):
+        """The tests with the highest peaks"""
+        ranked = sorted(self.tests, key=lambda usage: usage.peak, reverse=True)
+        return [
+            {
+                "test": usage.nodeid,
+                "peak_kb": kb(usage.peak),
+                "net_kb": kb(usage.net),
+                "top_site": usage.sites[0].location if usage.sites else "",
+            }
+            for usage in ranked[:SUMMARY_ROWS]
+        ]
+
+    def top_endpoints(self):
+        """Endpoints by the largest peak of a test calling them"""
+        endpoints = {}
+        for usage in self.tests:
+            for endpoint in usage.endpoints:
+                tests, peak, total = endpoints.get(endpoint, (0, 0, 0))
+                endpoints[endpoint] = (
+                    tests + 1,
+                    max(peak, usage.peak),
+                    total + usage.peak,
+                )
+        rows = [
+            {
+                "endpoint": endpoint,
+                "tests": tests,
+                "max_peak_kb": kb(peak),
+                "mean_peak_kb": kb(total / tests),
+            }
+            for endpoint, (tests, peak, total) in endpoints.items()
+        ]
+        rows.sort(key=lambda row: row["max_peak_kb"], reverse=True)
+        return rows[:SUMMARY_ROWS]
+
+    def top_fixtures(self):
+        """Fixtures by the memory their setups and teardowns never freed"""
+        rows = [
+            {"fixture": name, "instances": count, "kept_kb": kb(kept)}
+            for name, (count, kept) in self.fixtures.items()
+            if kept > 0
+        ]
+        rows.sort(key=lambda row: row["kept_kb"], reverse=True)
+        return rows[:SUMMARY_ROWS]
+
+    def growth(self):
+        """Bytes all tests together allocated and kept"""
+        return sum(usage.net for usage in self.tests)
+
+    def pytest_terminal_summary(self, terminalreporter):
+        write = terminalreporter.write_line
+        terminalreporter.write_sep(
+            "=",
+            f"memory profile: {len(self.tests)} tests kept "
+            f"{kb(self.growth())}KB",
+        )
+        for row in self.top_tests():
+            write(
+                f"{row['peak_kb']:>10}KB peak {row['net_kb']:>10}KB net  "
+                f"{row['test']}  {row['top_site']}"
+            )
+        for row in self.top_fixtures():
+            write(
+                f"{row['kept_kb']:>10}KB kept by fixture {row['fixture']} "
+                f"({row['instances']} instances)"
+            )
+        for r in self.regressions:
+            write(
+                f"{r.nodeid}: peak {r.baseline_kb}KB -> {r.peak_kb}KB (x{r.ratio})",
+                red=True,
+            )
+
+
+class HtmlMemorySummary:
+    """pytest-html hooks rendering the memory tables"""
+
+    TEST_COLUMNS = (
+        ("test", "Test"),
+        ("peak_kb", "Peak KB"),
+        ("net_kb", "Net KB"),
+        ("top_site", "Top allocation site"),
+    )
+    ENDPOINT_COLUMNS = (
+        ("endpoint", "Endpoint"),
+        ("tests", "Tests"),
+        ("max_peak_kb", "Max peak KB"),
+        ("mean_peak_kb", "Mean peak KB"),
+    )
+    FIXTURE_COLUMNS = (
+        ("fixture", "Fixture"),
+        ("instances", "Instances"),
+        ("kept_kb", "Kept KB"),
+    )
+    REGRESSION_COLUMNS = (
+        ("nodeid", "Test"),
+        ("baseline_kb", "Baseline peak KB"),
+        ("peak_kb", "Peak KB"),
+        ("ratio", "Ratio"),
+    )
+
+    def __init__(self, plugin):
+        self.plugin = plugin
+
+    def pytest_html_results_summary(self, prefix, summary, postfix):
+        plugin = self.plugin
+        tables = (
+            ("Peak memory per test", self.TEST_COLUMNS, plugin.top_tests()),
+            ("Peak memory per endpoint", self.ENDPOINT_COLUMNS, plugin.top_endpoints()),
+            ("Memory kept by fixtures", self.FIXTURE_COLUMNS, plugin.top_fixtures()),
+            (
+                "Peak memory regressions",
+                self.REGRESSION_COLUMNS,
+                [r._asdict() for r in plugin.regressions],
+            ),
+        )
+        for title, columns, rows in tables:
+            if rows:
+                postfix.append(render_table(title, columns, rows))
@@ -0,0 +1,73 @@
+"""Parallel runs with ``pytest -n N`` (pytest-xdist).
+
+Instead of handing out tests in collection-order chunks, the controller
+plans every worker's shard up front with ``utils.parallel.plan_shards``.
+Each test's expected duration is the median of its ``--perf-baseline``
+samples (recorded with ``--perf-save``; tests without samples count as the
+median test), and tests are placed longest first on the least loaded worker.
+Parametrized cases of one test hit the same endpoint, so among workers that
+are about equally loaded a case goes to the one holding the fewest cases of
+that test: a test's ``product_id`` cases are spread over all workers rather
+than queued on one. ``--shard=load`` falls back to xdist's own scheduling.
+
+Plugins that aggregate over the whole session hand their worker totals to
+the controller with ``send_to_controller`` and merge them from
+``pytest_testnodedown``, so the terminal, HTML and baseline output of a
+parallel run covers every worker.
+"""
+
+import pytest
+
+from utils.parallel import expected_durations, plan_shards
+from utils.perfstats import Baseline
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("parallel", "parallel runs (pytest -n)")
+    group.addoption(
+        "--shard",
+        choices=("duration", "load"),
+        default="duration",
+        help="how -n splits tests: balanced by recorded durations (default), "
+        "or xdist's dynamic load scheduling",
+    )
+
+
+def _shard_scheduling():
+    from xdist.scheduler import LoadScheduling
+
+    class ShardScheduling(LoadScheduling):
+        """Send every worker its planned shard at once"""
+
+        def schedule(self):
+            assert self.collection_is_completed
+            if self.collection is not None:
+                # A replacement worker joined; crashed shards are re-queued
+                super().schedule()
+                return
+            if not self._check_nodes_have_same_collection():
+                self.log("**Different tests collected, aborting run**")
+                return
+            self.collection = next(iter(self.node2collection.values()))
+            if self.maxschedchunk is None:
+                self.maxschedchunk = len(self.collection)
+            baseline = Baseline.load(self.config.getoption("--perf-baseline"))
+            durations = expected_durations(self.collection, baseline)
+            nodes = self.nodes
+            for node, shard in zip(
+                nodes, plan_shards(self.collection, durations, len(nodes))
+            ):
+                if shard:
+                    self.node2pending[node].extend(shard)
+                    node.send_runtest_some(shard)
+            for node in nodes:
+                node.shutdown()
+
+    return ShardScheduling
+
+
+@pytest.hookimpl(optionalhook=True)
+def pytest_xdist_make_scheduler(config, log):
+    if config.getoption("dist") == "load" and config.getoption("--shard") == "duration":
+        return _shard_scheduling()(config, log)
+    return None
@@ -0,0 +1,90 @@
+"""``--rate-limit`` / ``--adaptive-concurrency`` for the shared client.
+
+``--rate-limit`` may be repeated; each value is a ``utils.ratelimit`` rule
+such as ``10/s`` (every host), ``fakestoreapi.com=5/s:burst=10`` or
+``fakestoreapi.com/carts=2/s``. ``--adaptive-concurrency=MAX`` caps the
+shared client's requests in flight with an AIMD limit of at most ``MAX``.
+The time spent waiting and the final limit are shown in the terminal summary.
+Under ``pytest -n`` every worker gets an equal share of each rate, so the
+workers together stay within the limit.
+"""
+
+import pytest
+
+from utils.parallel import (
+    received_from_worker,
+    send_to_controller,
+    worker_count,
+)
+from utils.ratelimit import AdaptiveConcurrency, RateLimiter, parse_rule
+
+WORKER_OUTPUT = "fakestore_rate_limit"
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("rate-limit", "client-side rate limiting")
+    group.addoption(
+        "--rate-limit",
+        metavar="RULE",
+        action="append",
+        default=[],
+        help="pace requests, e.g. 10/s or fakestoreapi.com/carts=2/s:burst=4",
+    )
+    group.addoption(
+        "--adaptive-concurrency",
+        metavar="MAX",
+        type=int,
+        default=None,
+        help="adapt the requests in flight (AIMD) up to MAX",
+    )
+
+
+def pytest_configure(config):
+    try:
+        rules = [parse_rule(spec) for spec in config.getoption("--rate-limit")]
+    except ValueError as exc:
+        raise pytest.UsageError(f"--rate-limit: {exc}")
+    share = worker_count(config)
+    rules = [rule._replace(rate=rule.rate / share) for rule in rules]
+    maximum = config.getoption("--adaptive-concurrency")
+    limiter = None
+    if rules or maximum:
+        concurrency = None
+        if maximum:
+            concurrency = AdaptiveConcurrency(initial=min(4, maximum), maximum=maximum)
+        limiter = RateLimiter(rules, concurrency=concurrency)
+    config.pluginmanager.register(RateLimitPlugin(limiter), "fakestore-rate-limit")
+
+
+class RateLimitPlugin:
+    """Expose the session's limiter and report how much it throttled"""
+
+    def __init__(self, limiter):
+        self.limiter = limiter
+        self.worker_stats = []
+
+    @pytest.fixture(scope="session")
+    def rate_limiter(self):
+        """``RateLimiter`` for the shared client, or None when disabled"""
+        return self.limiter
+
+    def pytest_sessionfinish(self, session):
+        if self.limiter is not None:
+            send_to_controller(session.config, WORKER_OUTPUT, self.limiter.stats())
+
+    @pytest.hookimpl(optionalhook=True)
+    def pytest_testnodedown(self, node, error):
+        stats = received_from_worker(node, WORKER_OUTPUT)
+        if stats is not None:
+            self.worker_stats.append(stats)
+
+    def pytest_terminal_summary(self, terminalreporter):
+        if self.limiter is None:
+            return
+        parts = self.worker_stats or [self.limiter.stats()]
+        # Summed over workers: total wait, throttles and concurrency
+        stats = {name: round(sum(part[name] for part in parts), 3) for name in parts[0]}
+        terminalreporter.write_sep("=", "rate limiter")
+        terminalreporter.write_line(
+            "  ".join(f"{name}={value}" for name, value in stats.items())
+        )
@@ -0,0 +1,161 @@
+"""Per-marker HTML and Allure reports from a single test run.
+
+``--split-reports=smoke,regression`` writes, next to the ``--html`` report,
+one ``<marker>-report.html`` per marker holding only the tests carrying that
+marker, and copies the matching results of ``--alluredir=DIR`` into
+``DIR-<marker>``. CI therefore runs the suite once instead of once per marker.
+"""
+
+import copy
+import json
+import os
+import shutil
+from pathlib import Path
+
+import pytest
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("terminal reporting")
+    group.addoption(
+        "--split-reports",
+        metavar="MARKERS",
+        default="",
+        help="comma-separated markers that get their own HTML report and "
+        "Allure results directory, e.g. smoke,regression",
+    )
+
+
+def pytest_configure(config):
+    markers = [m.strip() for m in config.option.split_reports.split(",") if m.strip()]
+    if not markers or hasattr(config, "workerinput"):
+        return
+    html_path = getattr(config.option, "htmlpath", None)
+    if html_path and config.pluginmanager.hasplugin("html"):
+        for marker in markers:
+            config.pluginmanager.register(
+                marker_html_report(config, marker, html_path),
+                f"fakestore-report-{marker}-html",
+            )
+    alluredir = getattr(config.option, "allure_report_dir", None)
+    if alluredir:
+        config.pluginmanager.register(
+            AllureSplitter(alluredir, markers), "fakestore-report-allure"
+        )
+
+
+def split_path(path, marker):
+    """``reports/report.html`` -> ``reports/smoke-report.html``"""
+    path = Path(path)
+    return str(path.with_name(f"{marker}-{path.name}"))
+
+
+def has_marker(report, marker):
+    """True when the test behind ``report`` carries ``marker``"""
+    return bool(report.keywords.get(marker))
+
+
+def marker_html_report(config, marker, html_path):
+    """A pytest-html report limited to the tests marked with ``marker``"""
+    import pytest_html
+    from pytest_html.report import Report
+    from pytest_html.report_data import ReportData
+    from pytest_html.selfcontained_report import SelfContainedReport
+    from pytest_html.util import _process_css, _read_template
+
+    base = SelfContainedReport if config.option.self_contained_html else Report
+
+    class MarkerReport(base):
+        @pytest.hookimpl(trylast=True)
+        def pytest_collection_finish(self, session):
+            self._report.collected_items = sum(
+                1 for item in session.items if item.get_closest_marker(marker)
+            )
+
+        @pytest.hookimpl(trylast=True)
+        def pytest_runtest_logreport(self, report):
+            if has_marker(report, marker):
+                super().pytest_runtest_logreport(report)
+
+        def _process_extras(self, report, test_id):
+            # The main report rewrites extras in place; work on a copy
+            report = copy.copy(report)
+            report.extras = copy.deepcopy(getattr(report, "extras", []))
+            return super()._process_extras(report, test_id)
+
+    resources = Path(pytest_html.__file__).parent / "resources"
+    extra_css = [
+        Path(os.path.expandvars(css)).expanduser() for css in config.option.css
+    ]
+    return MarkerReport(
+        split_path(html_path, marker),
+        config,
+        ReportData(config),
+        _read_template([resources]),
+        _process_css(resources / "style.css", extra_css),
+    )
+
+
+def _attachment_sources(node):
+    """Attachment file names referenced by a result, container or step"""
+    for attachment in node.get("attachments", []):
+        yield attachment["source"]
+    for child in (
+        node.get("steps", []) + node.get("befores", []) + node.get("afters", [])
+    ):
+        yield from _attachment_sources(child)
+
+
+def split_allure_results(source, target, marker):
+    """Copy the Allure results tagged with ``marker`` from ``source`` to ``target``"""
+    source, target = Path(source), Path(target)
+    shutil.rmtree(target, ignore_errors=True)
+    target.mkdir(parents=True)
+    selected, files = set(), set()
+    containers = []
+    for path in source.iterdir():
+        if path.name.endswith("-container.json"):
+            containers.append(path)
+            continue
+        if not path.name.endswith("-result.json"):
+            continue
+        with open(path) as f:
+            result = json.load(f)
+        if {"name": "tag", "value": marker} in result.get("labels", []):
+            selected.add(result["uuid"])
+            files.add(path.name)
+            files.update(_attachment_sources(result))
+    for path in containers:
+        with open(path) as f:
+            container = json.load(f)
+        if selected.intersection(container.get("children", [])):
+            files.add(path.name)
+            files.update(_attachment_sources(container))
+    for name in ("environment.properties", "categories.json", "executor.json"):
+        if (source / name).exists():
+            files.add(name)
+    for name in files:
+        if (source / name).exists():
+            shutil.copy2(source / name, target / name)
+    return len(selected)
+
+
+class AllureSplitter:
+    """Split the run's Allure results into one directory per marker"""
+
+    def __init__(self, alluredir, markers):
+        self.alluredir = alluredir
+        self.markers = markers
+        self.counts = {}
+
+    @pytest.hookimpl(trylast=True)
+    def pytest_sessionfinish(self, session):
+        if not os.path.isdir(self.alluredir):
+            return
+        for marker in self.markers:
+            target = f"{self.alluredir.rstrip(os.sep)}-{marker}"
+            self.counts[target] = split_allure_results(self.alluredir, target, marker)
+
+    def pytest_terminal_summary(self, terminalreporter):
+        for target, count in self.counts.items():
+            terminalreporter.write_sep("-", f"{count} Allure result(s) in {target}")
@@ -0,0 +1,95 @@
+"""``@pytest.mark.spec``: tests parametrized from the endpoint specs.
+
+``@pytest.mark.spec("products", "get")`` parametrizes a test with the cases
+of an endpoint in ``--spec-dir`` (see ``utils.specs``). Each name in the
+endpoint's ``cases`` becomes an argument of the test, and the case's values
+its test ID (``[5]``, ``[electronics]``). The session's ``FakeStore`` is
+seeded from the same specs, so widening an ID range adds both the tests and
+the rows they read, with no route or dataset to write by hand.
+
+Every case is checked against the mock routes when it is expanded, and the
+expansion is cached in ``--spec-cache`` per spec hash: collecting tens of
+thousands of cases from unchanged specs only reads the cache. The cache is
+refreshed at startup, before the workers of a ``pytest -n`` run start.
+"""
+
+import os
+
+import pytest
+
+from utils.fakestore import FakeStore
+from utils.parallel import is_worker
+from utils.router import MockRouter
+from utils.specs import SpecCatalog, SpecError
+
+MARKER = "spec"
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("specs", "spec-driven test generation")
+    group.addoption(
+        "--spec-dir",
+        metavar="DIR",
+        default=os.path.join("tests", "specs"),
+        help="directory of the endpoint spec files (default tests/specs)",
+    )
+    group.addoption(
+        "--spec-cache",
+        metavar="PATH",
+        default=".spec-cache.json",
+        help="file caching the test cases expanded from the specs, relative to "
+        "the rootdir (default .spec-cache.json)",
+    )
+
+
+# Before conftest's pytest_configure, which seeds the stand-in from the specs
+@pytest.hookimpl(tryfirst=True)
+def pytest_configure(config):
+    config.addinivalue_line(
+        "markers",
+        f"{MARKER}(resource, endpoint): parametrize with an endpoint spec's cases",
+    )
+    directory = os.path.join(config.rootpath, config.getoption("--spec-dir"))
+    try:
+        catalog = SpecCatalog(
+            directory, router=FakeStore().mount(MockRouter("http://specs.invalid"))
+        )
+    except (OSError, SpecError) as e:
+        raise pytest.UsageError(f"cannot load the endpoint specs: {e}") from None
+    cache = os.path.join(config.rootpath, config.getoption("--spec-cache"))
+    catalog.load(cache)
+    if not is_worker(config):
+        try:
+            catalog.save(cache)
+        except SpecError as e:
+            raise pytest.UsageError(f"invalid endpoint spec: {e}") from None
+    config.pluginmanager.register(SpecPlugin(catalog), "fakestore-specs")
+
+
+class SpecPlugin:
+    """Parametrize ``spec``-marked tests and expose the catalog to tests"""
+
+    def __init__(self, catalog):
+        self.catalog = catalog
+
+    def pytest_generate_tests(self, metafunc):
+        marker = metafunc.definition.get_closest_marker(MARKER)
+        if marker is None:
+            return
+        try:
+            names = list(self.catalog.endpoint(*marker.args).cases)
+            cases = self.catalog.cases(*marker.args)
+        except SpecError as e:
+            pytest.fail(f"{metafunc.definition.nodeid}: {e}", pytrace=False)
+        if len(names) == 1:
+            argvalues = [case.values[names[0]] for case in cases]
+        else:
+            argvalues = [tuple(case.values[name] for name in names) for case in cases]
+        metafunc.parametrize(
+            ",".join(names), argvalues, ids=[case.id for case in cases]
+        )
+
+    @pytest.fixture(scope="session")
+    def specs(self):
+        """The endpoint specs and their cases (``utils.specs.SpecCatalog``)"""
+        return self.catalog
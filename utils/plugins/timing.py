@@ -0,0 +1,193 @@
+"""Per-request HTTP timings in the Allure and pytest-html reports.
+
+Every request made through the shared ``api_client`` during a test is
+recorded with its route template, status, size and DNS/connect/TLS/TTFB/
+total/JSON-decode times. The records are attached to the test as an Allure
+JSON attachment and summed up per endpoint in a pytest-html summary table.
+Under ``pytest -n`` each worker's endpoint totals are merged by the controller.
+"""
+
+import html
+import json
+
+import allure
+import pytest
+
+from utils.histogram import LatencyHistogram
+from utils.parallel import received_from_worker, send_to_controller
+from utils.timing import RequestTiming
+
+PLUGIN_NAME = "fakestore-timing"
+WORKER_OUTPUT = "fakestore_timings"
+
+
+def pytest_configure(config):
+    plugin = HttpTimingPlugin()
+    config.pluginmanager.register(plugin, PLUGIN_NAME)
+    if config.pluginmanager.hasplugin("html"):
+        config.pluginmanager.register(HtmlTimingSummary(plugin), f"{PLUGIN_NAME}-html")
+
+
+class EndpointTimings:
+    """Aggregated timings of every request to one endpoint"""
+
+    def __init__(self):
+        self.total = LatencyHistogram()
+        self.ttfb_sum = 0.0
+        self.decode_sum = 0.0
+        self.bytes = 0
+        self.errors = 0
+        self.new_connections = 0
+
+    def add(self, timing):
+        self.total.record(timing.total * 1_000_000)
+        self.ttfb_sum += timing.ttfb
+        self.decode_sum += timing.decode
+        self.bytes += timing.bytes
+        if timing.status is None or timing.status >= 500:
+            self.errors += 1
+        if timing.connect:
+            self.new_connections += 1
+
+    def as_dict(self):
+        return {
+            "total": self.total.as_dict(),
+            "ttfb_sum": self.ttfb_sum,
+            "decode_sum": self.decode_sum,
+            "bytes": self.bytes,
+            "errors": self.errors,
+            "new_connections": self.new_connections,
+        }
+
+    def merge(self, data):
+        """Add the ``as_dict()`` totals of another process"""
+        self.total.merge(LatencyHistogram.from_dict(data["total"]))
+        self.ttfb_sum += data["ttfb_sum"]
+        self.decode_sum += data["decode_sum"]
+        self.bytes += data["bytes"]
+        self.errors += data["errors"]
+        self.new_connections += data["new_connections"]
+
+    def row(self):
+        count = self.total.count
+        return {
+            "count": count,
+            "errors": self.errors,
+            "new_connections": self.new_connections,
+            "bytes": self.bytes,
+            "p50_ms": round(self.total.percentile(50) / 1000, 3),
+            "p95_ms": round(self.total.percentile(95) / 1000, 3),
+            "max_ms": round((self.total.max or 0) / 1000, 3),
+            "mean_ttfb_ms": round(self.ttfb_sum / count * 1000, 3),
+            "mean_decode_ms": round(self.decode_sum / count * 1000, 3),
+        }
+
+
+class HttpTimingPlugin:
+    """Record the shared client's requests per test and per endpoint"""
+
+    def __init__(self):
+        self.current = None
+        self.endpoints = {}
+
+    @pytest.fixture(autouse=True)
+    def http_timings(self, api_client, mock_router):
+        """Timings of the requests the current test makes"""
+        records = []
+
+        def listener(event):
+            if event.response is not None:
+                timing = event.response.timing
+            else:
+                timing = RequestTiming(event.method, event.url)
+                timing.total = event.elapsed
+            timing.endpoint = mock_router.endpoint_for(event.method, event.url)
+            records.append(timing)
+
+        self.current = records
+        api_client.add_listener(listener)
+        yield records
+        api_client.remove_listener(listener)
+        self.current = None
+
+    @pytest.hookimpl(hookwrapper=True)
+    def pytest_runtest_call(self, item):
+        yield
+        records = self.current
+        if not records:
+            return
+        for timing in records:
+            self._endpoint(timing.endpoint).add(timing)
+        allure.attach(
+            json.dumps([timing.as_dict() for timing in records], indent=2),
+            name="HTTP timings",
+            attachment_type=allure.attachment_type.JSON,
+        )
+
+    def _endpoint(self, name):
+        endpoint = self.endpoints.get(name)
+        if endpoint is None:
+            endpoint = self.endpoints[name] = EndpointTimings()
+        return endpoint
+
+    def pytest_sessionfinish(self, session):
+        send_to_controller(
+            session.config,
+            WORKER_OUTPUT,
+            {name: timings.as_dict() for name, timings in self.endpoints.items()},
+        )
+
+    @pytest.hookimpl(optionalhook=True)
+    def pytest_testnodedown(self, node, error):
+        for name, data in (received_from_worker(node, WORKER_OUTPUT) or {}).items():
+            self._endpoint(name).merge(data)
+
+    def rows(self):
+        """Per-endpoint summary rows, slowest p95 first"""
+        rows = [
+            {"endpoint": name, **timings.row()}
+            for name, timings in self.endpoints.items()
+        ]
+        return sorted(rows, key=lambda row: row["p95_ms"], reverse=True)
+
+
+class HtmlTimingSummary:
+    """pytest-html hooks rendering the per-endpoint timing table"""
+
+    COLUMNS = (
+        ("endpoint", "Endpoint"),
+        ("count", "Requests"),
+        ("errors", "Errors"),
+        ("new_connections", "New conns"),
+        ("bytes", "Bytes"),
+        ("p50_ms", "p50 ms"),
+        ("p95_ms", "p95 ms"),
+        ("max_ms", "max ms"),
+        ("mean_ttfb_ms", "mean TTFB ms"),
+        ("mean_decode_ms", "mean decode ms"),
+    )
+
+    def __init__(self, plugin):
+        self.plugin = plugin
+
+    def pytest_html_results_summary(self, prefix, summary, postfix):
+        rows = self.plugin.rows()
+        if not rows:
+            return
+        postfix.append(render_table("HTTP timings per endpoint", self.COLUMNS, rows))
+
+
+def render_table(title, columns, rows):
+    """Render dict rows as an HTML table for the pytest-html summary"""
+    head = "".join(f"<th>{html.escape(label)}</th>" for _, label in columns)
+    body = "".join(
+        "<tr>"
+        + "".join(f"<td>{html.escape(str(row[key]))}</td>" for key, _ in columns)
+        + "</tr>"
+        for row in rows
+    )
+    return (
+        f"<h2>{html.escape(title)}</h2>"
+        f'<table class="summary"><thead><tr>{head}</tr></thead>'
+        f"<tbody>{body}</tbody></table>"
+    )
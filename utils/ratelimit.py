@@ -0,0 +1,282 @@
+"""Client-side rate limiting and adaptive concurrency for live runs.
+
+Public deployments throttle clients that send too much. Rather than sleeping
+between runs, the shared client can pace itself:
+
+* ``TokenBucket`` allows ``rate`` requests per second with bursts of up to
+  ``burst``. ``LimitRule`` binds a bucket to a host, a path prefix or both;
+  a request takes a token from every rule it matches.
+* ``AdaptiveConcurrency`` caps the requests in flight and tunes the cap AIMD
+  style: it grows by about one per round trip while responses are healthy
+  and halves on a ``429``/``503`` or a latency spike (a response much slower
+  than the recent average). A ``Retry-After`` also pauses the host.
+
+``RateLimiter`` combines both and is used by ``FakeStoreClient`` around every
+request it sends over the network, so retries, hedges and ``--load`` workers
+are all paced while HTTP cache hits are not. ``AsyncFakeStoreClient`` takes
+the same limiter through ``slot_async``, which waits without blocking the
+event loop.
+"""
+
+import asyncio
+import re
+import threading
+import time
+from collections import namedtuple
+from contextlib import asynccontextmanager, contextmanager
+from urllib.parse import urlsplit
+
+from utils.retry import parse_retry_after
+
+THROTTLE_STATUSES = frozenset({429, 503})
+
+_SPEC = re.compile(
+    r"^(?:(?P<host>[^/=]+)?(?P<path>/[^=]*)?=)?"
+    r"(?P<rate>\d+(?:\.\d+)?)/s(?::burst=(?P<burst>\d+))?$"
+)
+
+
+class TokenBucket:
+    """``rate`` tokens per second, holding at most ``burst``"""
+
+    def __init__(self, rate, burst=None, clock=time.monotonic):
+        self.rate = float(rate)
+        self.burst = float(burst if burst is not None else max(1.0, rate))
+        self.clock = clock
+        self._tokens = self.burst
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        """Take a token and return how long to wait before using it"""
+        with self._lock:
+            now = self.clock()
+            self._tokens = min(
+                self.burst, self._tokens + (now - self._updated) * self.rate
+            )
+            self._updated = now
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+
+LimitRule = namedtuple("LimitRule", ["host", "path", "rate", "burst"])
+
+
+def parse_rule(spec):
+    """Parse ``[host][/path]=RATE/s[:burst=N]`` or ``RATE/s`` into a rule"""
+    match = _SPEC.match(spec.strip())
+    if match is None:
+        raise ValueError(f"invalid rate limit {spec!r}, expected e.g. host/path=5/s")
+    burst = match["burst"]
+    return LimitRule(
+        match["host"],
+        match["path"],
+        float(match["rate"]),
+        int(burst) if burst is not None else None,
+    )
+
+
+class AdaptiveConcurrency:
+    """AIMD limit on the number of requests in flight"""
+
+    def __init__(
+        self,
+        initial=4,
+        minimum=1,
+        maximum=64,
+        decrease=0.5,
+        spike_factor=3.0,
+        smoothing=0.1,
+        clock=time.monotonic,
+    ):
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.decrease = decrease
+        self.spike_factor = spike_factor
+        self.smoothing = smoothing
+        self.clock = clock
+        self.in_flight = 0
+        self.latency = None
+        self.decreases = 0
+        self._last_decrease = None
+        self._ready = threading.Condition()
+        # (loop, future) of coroutines waiting in ``acquire_async``
+        self._async_waiters = []
+
+    def acquire(self):
+        with self._ready:
+            while self.in_flight >= int(self.limit):
+                self._ready.wait()
+            self.in_flight += 1
+
+    async def acquire_async(self):
+        """``acquire`` that waits on the running event loop"""
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._ready:
+                if self.in_flight < int(self.limit):
+                    self.in_flight += 1
+                    return
+                waiter = loop.create_future()
+                self._async_waiters.append((loop, waiter))
+            await waiter
+
+    def release(self, elapsed, congested):
+        """Free a slot and adapt the limit to the outcome of the request"""
+        with self._ready:
+            spike = (
+                self.latency is not None and elapsed > self.spike_factor * self.latency
+            )
+            if congested or spike:
+                self._back_off()
+            else:
+                self.limit = min(self.maximum, self.limit + 1 / self.limit)
+            if not congested:
+                if self.latency is None:
+                    self.latency = elapsed
+                else:
+                    self.latency += self.smoothing * (elapsed - self.latency)
+        self.cancel()
+
+    def cancel(self):
+        """Free a slot whose request was never sent, leaving the limit alone"""
+        with self._ready:
+            self.in_flight -= 1
+            self._ready.notify_all()
+            waiters, self._async_waiters = self._async_waiters, []
+        for loop, waiter in waiters:
+            loop.call_soon_threadsafe(_wake, waiter)
+
+    def _back_off(self):
+        # One decrease per round trip: requests already in flight when the
+        # limit was cut report the same congestion again
+        now = self.clock()
+        window = self.latency or 0.0
+        if self._last_decrease is not None and now - self._last_decrease < window:
+            return
+        self._last_decrease = now
+        self.limit = max(self.minimum, self.limit * self.decrease)
+        self.decreases += 1
+
+
+def _wake(waiter):
+    if not waiter.done():
+        waiter.set_result(None)
+
+
+class RateLimiter:
+    """Token buckets per rule and host, plus optional adaptive concurrency"""
+
+    def __init__(self, rules=(), concurrency=None, clock=time.monotonic, sleep=None):
+        self.rules = [parse_rule(r) if isinstance(r, str) else r for r in rules]
+        self.concurrency = concurrency
+        self.clock = clock
+        self.sleep = sleep or time.sleep
+        self.waited = 0.0
+        self.throttled = 0
+        self._buckets = {}
+        self._paused_until = {}
+        self._lock = threading.Lock()
+
+    def _bucket(self, rule, host):
+        key = (rule, host)
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = TokenBucket(
+                    rule.rate, rule.burst, clock=self.clock
+                )
+            return bucket
+
+    def _matching(self, host, path):
+        for rule in self.rules:
+            if rule.host is not None and rule.host != host:
+                continue
+            if rule.path is not None and not path.startswith(rule.path):
+                continue
+            yield rule
+
+    def reserve(self, url):
+        """Take the tokens for a request to ``url``; return the seconds to wait"""
+        parts = urlsplit(url)
+        host, path = parts.hostname or "", parts.path or "/"
+        with self._lock:
+            delay = self._paused_until.get(host, 0.0) - self.clock()
+        for rule in self._matching(host, path):
+            delay = max(delay, self._bucket(rule, host).reserve())
+        if delay <= 0:
+            return 0.0
+        with self._lock:
+            self.waited += delay
+        return delay
+
+    def acquire(self, url):
+        """Block until a request to ``url`` may be sent"""
+        delay = self.reserve(url)
+        if delay > 0:
+            self.sleep(delay)
+
+    def observe(self, url, response):
+        """Pause the host when ``response`` asks the client to back off"""
+        if response is None or response.status_code not in THROTTLE_STATUSES:
+            return False
+        with self._lock:
+            self.throttled += 1
+        retry_after = parse_retry_after(response.headers.get("Retry-After"))
+        if retry_after:
+            host = urlsplit(url).hostname or ""
+            with self._lock:
+                until = self.clock() + retry_after
+                self._paused_until[host] = max(self._paused_until.get(host, 0), until)
+        return True
+
+    @contextmanager
+    def slot(self, url):
+        """Hold a concurrency slot and a token for one request
+
+        The block reports its response with ``record(response)``.
+        """
+        if self.concurrency is not None:
+            self.concurrency.acquire()
+        self.acquire(url)
+        outcome = []
+        started = self.clock()
+        try:
+            yield outcome.append
+        finally:
+            self._release(url, started, outcome)
+
+    @asynccontextmanager
+    async def slot_async(self, url):
+        """``slot`` for an event loop: waits are awaited, not slept"""
+        if self.concurrency is not None:
+            await self.concurrency.acquire_async()
+        try:
+            await asyncio.sleep(self.reserve(url))
+        except BaseException:
+            if self.concurrency is not None:
+                self.concurrency.cancel()
+            raise
+        outcome = []
+        started = self.clock()
+        try:
+            yield outcome.append
+        finally:
+            self._release(url, started, outcome)
+
+    def _release(self, url, started, outcome):
+        response = outcome[0] if outcome else None
+        # A request that failed without a response counts as congestion
+        congested = response is None or self.observe(url, response)
+        if self.concurrency is not None:
+            self.concurrency.release(self.clock() - started, congested)
+
+    def stats(self):
+        stats = {"waited_s": round(self.waited, 3), "throttled": self.throttled}
+        if self.concurrency is not None:
+            stats["concurrency_limit"] = round(self.concurrency.limit, 2)
+            stats["concurrency_decreases"] = self.concurrency.decreases
+        return stats
@@ -0,0 +1,187 @@
+"""Compact record types for products, carts and users.
+
+A parsed product is a dict of seven or eight entries plus a nested ``rating``
+dict; a cart holds a list of two-key dicts. Across millions of rows that
+per-dict overhead dominates memory. The records here keep every field in a
+``__slots__`` attribute, store a cart's products as two parallel
+``array('i')`` of product IDs and quantities, and still behave as read-only
+mappings with the API's JSON keys, so ``record["userId"]``, ``{**record}``
+and comparisons with plain dicts keep working.
+
+``from_json`` keeps references to the parsed strings and numbers instead of
+copying them. Keys a record type does not know, or values that do not fit
+its compact layout, are kept unchanged in ``extra``, so
+``Record.from_json(data).to_json() == data`` for any input.
+"""
+
+from array import array
+from collections.abc import Mapping
+
+_MISSING = object()
+
+
+class Record(Mapping):
+    """Read-only mapping view over slot-stored fields"""
+
+    __slots__ = ("extra",)
+
+    # JSON keys in output order; plain keys are stored in same-named slots
+    KEYS = ()
+    # Keys stored in a compact layout by ``_set_<key>`` / ``_get_<key>``
+    COMPOSITE = ()
+
+    @classmethod
+    def from_json(cls, data):
+        """Build a record from a decoded JSON object"""
+        record = cls.__new__(cls)
+        record.extra = None
+        for key, value in data.items():
+            if key in cls.COMPOSITE:
+                stored = getattr(record, f"_set_{key}")(value)
+            elif key in cls.KEYS:
+                setattr(record, key, value)
+                stored = True
+            else:
+                stored = False
+            if not stored:
+                if record.extra is None:
+                    record.extra = {}
+                record.extra[key] = value
+        return record
+
+    def to_json(self):
+        """Return the record as a plain JSON-ready dict"""
+        return {key: self[key] for key in self}
+
+    def __getitem__(self, key):
+        if self.extra is not None and key in self.extra:
+            return self.extra[key]
+        if key in self.COMPOSITE:
+            return getattr(self, f"_get_{key}")()
+        if key in self.KEYS:
+            value = getattr(self, key, _MISSING)
+            if value is not _MISSING:
+                return value
+        raise KeyError(key)
+
+    def __iter__(self):
+        extra = self.extra or {}
+        for key in self.KEYS:
+            if key in extra or key in self:
+                yield key
+        for key in extra:
+            if key not in self.KEYS:
+                yield key
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.to_json()!r})"
+
+
+def _is_int32(value):
+    return type(value) is int and -(2**31) <= value < 2**31
+
+
+class Product(Record):
+    __slots__ = (
+        "id",
+        "title",
+        "price",
+        "description",
+        "category",
+        "image",
+        "rating_rate",
+        "rating_count",
+    )
+    KEYS = ("id", "title", "price", "description", "category", "image", "rating")
+    COMPOSITE = ("rating",)
+
+    def _set_rating(self, value):
+        if not isinstance(value, dict) or value.keys() != {"rate", "count"}:
+            return False
+        self.rating_rate = value["rate"]
+        self.rating_count = value["count"]
+        return True
+
+    def _get_rating(self):
+        try:
+            return {"rate": self.rating_rate, "count": self.rating_count}
+        except AttributeError:
+            raise KeyError("rating") from None
+
+
+class Cart(Record):
+    __slots__ = ("id", "userId", "date", "product_ids", "quantities")
+    KEYS = ("id", "userId", "date", "products")
+    COMPOSITE = ("products",)
+
+    def _set_products(self, value):
+        if not isinstance(value, list):
+            return False
+        product_ids, quantities = array("i"), array("i")
+        for line in value:
+            if not (
+                isinstance(line, dict)
+                and line.keys() == {"productId", "quantity"}
+                and _is_int32(line["productId"])
+                and _is_int32(line["quantity"])
+            ):
+                return False
+            product_ids.append(line["productId"])
+            quantities.append(line["quantity"])
+        self.product_ids = product_ids
+        self.quantities = quantities
+        return True
+
+    def _get_products(self):
+        try:
+            pairs = zip(self.product_ids, self.quantities)
+        except AttributeError:
+            raise KeyError("products") from None
+        return [{"productId": p, "quantity": q} for p, q in pairs]
+
+
+class User(Record):
+    __slots__ = (
+        "id",
+        "email",
+        "username",
+        "password",
+        "firstname",
+        "lastname",
+        "address",
+        "phone",
+    )
+    KEYS = ("id", "email", "username", "password", "name", "address", "phone")
+    COMPOSITE = ("name",)
+
+    def _set_name(self, value):
+        if not isinstance(value, dict) or value.keys() != {"firstname", "lastname"}:
+            return False
+        self.firstname = value["firstname"]
+        self.lastname = value["lastname"]
+        return True
+
+    def _get_name(self):
+        try:
+            return {"firstname": self.firstname, "lastname": self.lastname}
+        except AttributeError:
+            raise KeyError("name") from None
+
+
+RECORD_TYPES = {"products": Product, "carts": Cart, "users": User}
+
+
+def iter_records(items, record_type):
+    """Convert decoded items, e.g. from ``iter_json_items``, to records"""
+    for item in items:
+        yield record_type.from_json(item)
+
+
+def to_json(value):
+    """``json.dumps`` ``default`` hook serializing records"""
+    if isinstance(value, Record):
+        return value.to_json()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
@@ -0,0 +1,127 @@
+"""Classified, budgeted retries for transient HTTP failures.
+
+Only failures that say nothing about the API's correctness are retried:
+connection errors, timeouts and 429/502/503/504 responses. Delays use
+exponential backoff with full jitter, or the server's ``Retry-After`` when it
+sends one. All clients of a test session draw from one ``RetryBudget`` so an
+outage cannot multiply the suite's run time; anything else, in particular a
+failing assertion, fails on the first attempt.
+"""
+
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+import requests
+
+RETRY_STATUSES = frozenset({429, 502, 503, 504})
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+# Responses meaning the request was rejected before being processed
+NOT_PROCESSED_STATUSES = frozenset({429, 503})
+TRANSIENT_ERRORS = (
+    requests.ConnectionError,
+    requests.Timeout,
+    requests.exceptions.ChunkedEncodingError,
+)
+
+
+class RetryBudget:
+    """Suite-wide cap: ``min_retries`` plus ``ratio`` retries per request made"""
+
+    def __init__(self, ratio=0.1, min_retries=10):
+        self.ratio = ratio
+        self.min_retries = min_retries
+        self.requests = 0
+        self.retries = 0
+        self.exhausted = 0
+        self._lock = threading.Lock()
+
+    def record_request(self):
+        with self._lock:
+            self.requests += 1
+
+    def try_acquire(self):
+        """Take one retry from the budget; return False when it is spent"""
+        with self._lock:
+            if self.retries < self.min_retries + self.ratio * self.requests:
+                self.retries += 1
+                return True
+            self.exhausted += 1
+            return False
+
+
+def parse_retry_after(value, now=None):
+    """Return the delay in seconds requested by a ``Retry-After`` header"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    now = time.time() if now is None else now
+    return max(0.0, when.timestamp() - now)
+
+
+class RetryPolicy:
+    """Decide whether and when to retry a request"""
+
+    def __init__(
+        self,
+        max_attempts=3,
+        backoff=0.2,
+        max_backoff=5.0,
+        max_retry_after=30.0,
+        budget=None,
+        rng=None,
+        sleep=time.sleep,
+    ):
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.max_retry_after = max_retry_after
+        self.budget = budget
+        self._rng = rng or random.Random()
+        self.sleep = sleep
+
+    def classify(self, method, response=None, error=None):
+        """Return True when the outcome is transient and the method may be resent"""
+        method = method.upper()
+        if error is not None:
+            if not isinstance(error, TRANSIENT_ERRORS):
+                return False
+            # A non-idempotent request may only be resent if it never left
+            return method in IDEMPOTENT_METHODS or isinstance(
+                error, requests.exceptions.ConnectTimeout
+            )
+        if response is None or response.status_code not in RETRY_STATUSES:
+            return False
+        return (
+            method in IDEMPOTENT_METHODS
+            or response.status_code in NOT_PROCESSED_STATUSES
+        )
+
+    def delay(self, attempt, response=None):
+        """Seconds to wait before retry number ``attempt`` (1-based)"""
+        if response is not None:
+            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+            if retry_after is not None:
+                return retry_after
+        ceiling = min(self.max_backoff, self.backoff * 2 ** (attempt - 1))
+        return self._rng.uniform(0, ceiling)
+
+    def should_retry(self, attempt, method, response=None, error=None):
+        """Return the delay before the next attempt, or None to stop retrying"""
+        if attempt >= self.max_attempts:
+            return None
+        if not self.classify(method, response, error):
+            return None
+        delay = self.delay(attempt, response)
+        if delay > self.max_retry_after:
+            return None
+        if self.budget is not None and not self.budget.try_acquire():
+            return None
+        return delay
@@ -0,0 +1,281 @@
+"""Precompiled request router backing the mocked FakeStore API.
+
+Routes are compiled once: exact ``method + path`` routes live in a hash map
+and patterned routes (``/products/{id:int}``) live in a separate table
+bucketed by method, segment count and leading literal segment, so a request
+is resolved without scanning every registered route. Per-test changes go
+into copy-on-write overlay layers that are dropped when the test ends.
+"""
+
+import json
+import re
+from contextlib import contextmanager
+from urllib.parse import parse_qsl, unquote, urlsplit
+
+from utils.faults import InjectedReset, reset_error
+from utils.records import to_json
+
+METHODS = ("GET", "POST", "PUT", "PATCH", "DELETE")
+
+_PARAM = re.compile(r"{(\w+)(?::(\w+))?}")
+_CONVERTERS = {
+    "int": (r"-?\d+", int),
+    "str": (r"[^/]+", str),
+}
+
+
+def json_response(payload=None, status=200, headers=None):
+    """Build a ``(status, headers, body)`` tuple with a JSON body"""
+    body = "" if payload is None else json.dumps(payload, default=to_json)
+    return status, {"Content-Type": "application/json", **(headers or {})}, body
+
+
+def normalize_path(path):
+    """Return the unquoted path without a trailing slash"""
+    path = unquote(path) or "/"
+    if len(path) > 1:
+        path = path.rstrip("/")
+    return path
+
+
+class RouteRequest:
+    """Transport-independent view of a request handed to route handlers"""
+
+    __slots__ = ("method", "path", "query", "body", "params")
+
+    def __init__(self, method, path, query=None, body=None, params=None):
+        self.method = method
+        self.path = path
+        self.query = query or {}
+        self.body = body
+        self.params = params or {}
+
+    def json(self):
+        """Decode the request body, returning None when it is empty"""
+        if not self.body:
+            return None
+        if isinstance(self.body, bytes):
+            return json.loads(self.body.decode("utf-8"))
+        return json.loads(self.body)
+
+
+class Route:
+    """A method + path template served by a handler or a canned JSON body"""
+
+    def __init__(self, method, template, handler=None, json=None, status=200):
+        self.method = method.upper()
+        self.template = normalize_path(template)
+        # Template without converters, e.g. ``/products/{id}``, for reports
+        self.display = _PARAM.sub(r"{\1}", self.template)
+        self.handler = handler
+        # Canned bodies are serialized once, when the route is compiled
+        self._canned = json_response(json, status=status)
+        self.segments = self.template.strip("/").split("/")
+        self._converters = {}
+        self._regex = None
+        if _PARAM.search(self.template):
+            self._regex = re.compile(
+                "^" + _PARAM.sub(self._compile_param, self.template) + "$"
+            )
+
+    def _compile_param(self, match):
+        name, kind = match.group(1), match.group(2) or "str"
+        pattern, converter = _CONVERTERS[kind]
+        self._converters[name] = converter
+        return f"(?P<{name}>{pattern})"
+
+    @property
+    def is_pattern(self):
+        return self._regex is not None
+
+    @property
+    def bucket(self):
+        """Key of the pattern table bucket this route belongs to"""
+        head = self.segments[0]
+        return self.method, len(self.segments), None if _PARAM.search(head) else head
+
+    def match(self, path):
+        """Return converted path parameters, or None when the path does not match"""
+        found = self._regex.match(path)
+        if found is None:
+            return None
+        return {
+            name: self._converters[name](value)
+            for name, value in found.groupdict().items()
+        }
+
+    def respond(self, request):
+        if self.handler is None:
+            status, headers, body = self._canned
+            return status, dict(headers), body
+        return self.handler(request)
+
+
+class _Layer:
+    """One level of routes; overlays stack on top of the session layer"""
+
+    __slots__ = ("exact", "patterns", "removed")
+
+    def __init__(self):
+        self.exact = {}
+        self.patterns = {}
+        self.removed = set()
+
+
+class MockRouter:
+    """Resolve requests against precompiled exact and patterned route tables"""
+
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip("/")
+        self._base_path = urlsplit(self.base_url).path.rstrip("/")
+        self._layers = [_Layer()]
+        self.faults = None
+        # Called with every route served (see ``utils.plugins.impact``)
+        self.observers = []
+
+    def add(self, method, template, handler=None, json=None, status=200):
+        """Register a route in the top-most layer"""
+        route = Route(method, template, handler=handler, json=json, status=status)
+        layer = self._layers[-1]
+        key = (route.method, route.template)
+        layer.removed.discard(key)
+        if route.is_pattern:
+            bucket = layer.patterns.setdefault(route.bucket, [])
+            bucket[:] = [r for r in bucket if r.template != route.template]
+            bucket.append(route)
+        else:
+            layer.exact[key] = route
+        return route
+
+    def remove(self, method, template):
+        """Hide a route in the top-most layer without touching lower layers"""
+        key = (method.upper(), normalize_path(template))
+        layer = self._layers[-1]
+        layer.exact.pop(key, None)
+        for bucket in layer.patterns.values():
+            bucket[:] = [r for r in bucket if (r.method, r.template) != key]
+        layer.removed.add(key)
+
+    @contextmanager
+    def overlay(self):
+        """Push a copy-on-write layer for the duration of the block"""
+        layer = _Layer()
+        self._layers.append(layer)
+        try:
+            yield self
+        finally:
+            self._layers.remove(layer)
+
+    @contextmanager
+    def inject_faults(self, profile):
+        """Serve requests through a ``FaultProfile`` for the duration of the block"""
+        previous, self.faults = self.faults, profile
+        try:
+            yield profile
+        finally:
+            self.faults = previous
+
+    def routes(self):
+        """Every registered route, session layer first"""
+        for layer in self._layers:
+            yield from layer.exact.values()
+            for bucket in layer.patterns.values():
+                yield from bucket
+
+    def match(self, method, path):
+        """Return ``(route, params)`` for a request path, or ``(None, None)``"""
+        method = method.upper()
+        path = normalize_path(path)
+        key = (method, path)
+        hidden = set()
+        for layer in reversed(self._layers):
+            route = layer.exact.get(key)
+            if route is not None and key not in hidden:
+                return route, {}
+            hidden |= layer.removed
+
+        segments = path.strip("/").split("/")
+        buckets = (
+            (method, len(segments), segments[0]),
+            (method, len(segments), None),
+        )
+        hidden = set()
+        for layer in reversed(self._layers):
+            for bucket in buckets:
+                for route in layer.patterns.get(bucket, ()):
+                    if (method, route.template) in hidden:
+                        continue
+                    params = route.match(path)
+                    if params is not None:
+                        return route, params
+            hidden |= layer.removed
+        return None, None
+
+    def template_for(self, method, path):
+        """Return the display template serving a path, falling back to the path"""
+        route, _ = self.match(method, path)
+        return route.display if route is not None else normalize_path(path)
+
+    def _relative_path(self, path):
+        if self._base_path and path.startswith(self._base_path):
+            return path[len(self._base_path) :]
+        return path
+
+    def endpoint_for(self, method, url):
+        """Return ``"METHOD /template"`` for a full request URL"""
+        path = self._relative_path(urlsplit(url).path)
+        return f"{method.upper()} {self.template_for(method, path)}"
+
+    def dispatch(self, method, url, body=None):
+        """Serve a request and return ``(status, headers, body)``
+
+        The injected fault profile, if any, applies: the call may be delayed,
+        answer with an injected failure or a slowly streamed body, or raise
+        ``InjectedReset``.
+        """
+        faults = self.faults
+        if faults is None:
+            return self.serve(method, url, body)
+        return faults.apply(
+            self.endpoint_for(method, url), lambda: self.serve(method, url, body)
+        )
+
+    async def dispatch_async(self, method, url, body=None):
+        """``dispatch`` for an event loop: injected latency is awaited"""
+        faults = self.faults
+        if faults is None:
+            return self.serve(method, url, body)
+        return await faults.apply_async(
+            self.endpoint_for(method, url), lambda: self.serve(method, url, body)
+        )
+
+    def serve(self, method, url, body=None):
+        """Serve a request from the routes alone, without injected faults"""
+        parts = urlsplit(url)
+        path = self._relative_path(parts.path)
+        route, params = self.match(method, path)
+        if route is None:
+            return 404, {}, ""
+        for observer in self.observers:
+            observer(route)
+        request = RouteRequest(
+            method.upper(),
+            normalize_path(path),
+            query=dict(parse_qsl(parts.query)),
+            body=body,
+            params=params,
+        )
+        return route.respond(request)
+
+    def install(self, rsps):
+        """Serve every request to ``base_url`` through this router"""
+        pattern = re.compile(re.escape(self.base_url) + r"(?:[/?#].*)?$")
+        for method in METHODS:
+            rsps.add_callback(method, pattern, callback=self._on_request)
+        return rsps
+
+    def _on_request(self, request):
+        try:
+            return self.dispatch(request.method, request.url, request.body)
+        except InjectedReset as exc:
+            return reset_error(exc, request)
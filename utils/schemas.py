@@ -0,0 +1,56 @@
+"""JSON schemas for FakeStore API resources"""
+
+PRODUCT_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "id": {"type": "integer"},
+        "title": {"type": "string"},
+        "price": {"type": "number"},
+        "category": {"type": "string"},
+        "image": {"type": "string"},
+        "description": {"type": "string"},
+    },
+    "required": ["id", "title", "price", "category", "image"],
+}
+
+CART_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "id": {"type": "integer"},
+        "userId": {"type": "integer"},
+        "date": {"type": "string"},
+        "products": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "productId": {"type": "integer"},
+                    "quantity": {"type": "integer"},
+                },
+                "required": ["productId", "quantity"],
+            },
+        },
+    },
+    "required": ["id", "userId", "date", "products"],
+}
+
+USER_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "id": {"type": "integer"},
+        "email": {"type": "string"},
+        "username": {"type": "string"},
+        "password": {"type": "string"},
+        "name": {
+            "type": "object",
+            "properties": {
+                "firstname": {"type": "string"},
+                "lastname": {"type": "string"},
+            },
+            "required": ["firstname", "lastname"],
+        },
+        "address": {"type": "object"},
+        "phone": {"type": "string"},
+    },
+    "required": ["id", "email", "username", "password", "name", "address", "phone"],
+}
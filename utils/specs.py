@@ -0,0 +1,242 @@
+"""Declarative endpoint specs that generate test cases and stand-in data.
+
+One JSON file per resource describes what the tests request and what the
+stand-in has to serve::
+
+    {
+      "resource": "products",
+      "schema": "PRODUCT_SCHEMA",
+      "ids": {"start": 1, "stop": 10},
+      "categories": ["electronics", "jewelery"],
+      "derive": {"title": "Test Product {id}", "category": "{category}"},
+      "endpoints": {
+        "get": {"path": "/products/{product_id}", "cases": {"product_id": "ids"}}
+      }
+    }
+
+``ids`` is the ID range the stand-in serves. ``seed_rows`` pads the seed
+records up to it with rows derived from the first seed, the ``derive``
+fields formatted with the row's ``id`` and a ``category`` cycling through
+``categories``, and checks every row against ``schema`` (a name in
+``utils.schemas``).
+
+Each endpoint expands to one ``Case`` per combination of its ``cases``
+values. A value list is a JSON list, an inclusive range
+(``{"start", "stop", "step"}``) or the name of the spec's ``ids`` or
+``categories``. Every case's path must resolve to a route of the stand-in.
+Expanding and checking tens of thousands of cases is redone only when a
+spec or the route table changes: ``SpecCatalog`` keeps the cases in a JSON
+cache keyed by their hash.
+"""
+
+import hashlib
+import itertools
+import json
+import os
+from collections import namedtuple
+
+from utils import schemas
+from utils.validation import validate_many
+
+ResourceSpec = namedtuple(
+    "ResourceSpec",
+    ["resource", "schema", "ids", "categories", "derive", "endpoints"],
+)
+EndpointSpec = namedtuple("EndpointSpec", ["name", "method", "path", "cases"])
+Case = namedtuple("Case", ["id", "method", "path", "values"])
+
+
+class SpecError(Exception):
+    """Raised for a spec that cannot generate its cases or stand-in data"""
+
+
+def _range(value, where):
+    try:
+        start, stop = value["start"], value["stop"]
+        step = value.get("step", 1)
+    except (KeyError, TypeError):
+        raise SpecError(f"{where}: expected a list or a start/stop range") from None
+    return range(start, stop + (1 if step > 0 else -1), step)
+
+
+def parse_spec(data, source="spec"):
+    """A ``ResourceSpec`` from the decoded JSON of a spec file"""
+    try:
+        resource = data["resource"]
+        schema = getattr(schemas, data["schema"])
+    except KeyError as e:
+        raise SpecError(f"{source}: missing {e}") from None
+    except AttributeError:
+        raise SpecError(f"{source}: unknown schema {data['schema']!r}") from None
+    endpoints = {}
+    for name, endpoint in data.get("endpoints", {}).items():
+        if "path" not in endpoint:
+            raise SpecError(f"{source}: endpoint {name!r} has no path")
+        endpoints[name] = EndpointSpec(
+            name,
+            endpoint.get("method", "GET").upper(),
+            endpoint["path"],
+            endpoint.get("cases", {}),
+        )
+    return ResourceSpec(
+        resource,
+        schema,
+        _range(data.get("ids", {"start": 1, "stop": 0}), f"{source}: ids"),
+        list(data.get("categories", [])),
+        dict(data.get("derive", {})),
+        endpoints,
+    )
+
+
+def _values(spec, name, value):
+    where = f"{spec.resource}: {name}"
+    if isinstance(value, list):
+        return value
+    if value == "ids":
+        return spec.ids
+    if value == "categories":
+        return spec.categories
+    if isinstance(value, str):
+        raise SpecError(f"{where}: unknown value list {value!r}")
+    return _range(value, where)
+
+
+def expand(spec, endpoint, router=None):
+    """The cases of one endpoint, checked against ``router`` when given"""
+    names = list(endpoint.cases)
+    columns = [_values(spec, name, endpoint.cases[name]) for name in names]
+    cases = []
+    for combination in itertools.product(*columns):
+        values = dict(zip(names, combination))
+        try:
+            path = endpoint.path.format(**values)
+        except KeyError as e:
+            raise SpecError(
+                f"{spec.resource}: {endpoint.name} path needs a value for {e}"
+            ) from None
+        route_path = path.partition("?")[0]
+        if router is not None and router.match(endpoint.method, route_path)[0] is None:
+            raise SpecError(
+                f"{spec.resource}: no stand-in route for {endpoint.method} {path}"
+            )
+        case_id = "-".join(str(value) for value in combination) or endpoint.name
+        cases.append(Case(case_id, endpoint.method, path, values))
+    return cases
+
+
+def seed_rows(spec, seeds):
+    """``seeds`` padded with derived rows so every ID in ``spec.ids`` exists"""
+    known = {seed["id"] for seed in seeds}
+    categories = spec.categories or [None]
+    rows = list(seeds)
+    for row_id in spec.ids:
+        if row_id in known:
+            continue
+        fields = {"id": row_id, "category": categories[(row_id - 1) % len(categories)]}
+        row = dict(seeds[0])
+        for key, template in spec.derive.items():
+            row[key] = template.format(**fields)
+        row["id"] = row_id
+        rows.append(row)
+    errors = validate_many(rows, spec.schema)
+    if errors:
+        error = errors[0]
+        raise SpecError(
+            f"{spec.resource}: derived row {rows[error.index]['id']} is invalid "
+            f"at {error.path}: {error.message}"
+        )
+    return rows
+
+
+def digest(data):
+    return hashlib.sha1(data).hexdigest()[:16]
+
+
+class SpecCatalog:
+    """The specs in a directory and their expanded cases, cached as JSON"""
+
+    VERSION = 1
+
+    def __init__(self, directory, router=None):
+        self.directory = directory
+        self.router = router
+        self.specs = {}
+        self.digests = {}
+        # Route table the cases were checked against, part of every digest
+        routes = ""
+        if router is not None:
+            routes = "\n".join(
+                sorted(f"{route.method} {route.display}" for route in router.routes())
+            )
+        for filename in sorted(os.listdir(directory)):
+            if not filename.endswith(".json"):
+                continue
+            path = os.path.join(directory, filename)
+            with open(path, "rb") as f:
+                raw = f.read()
+            try:
+                data = json.loads(raw)
+            except ValueError as e:
+                raise SpecError(f"{path}: {e}") from None
+            spec = parse_spec(data, path)
+            self.specs[spec.resource] = spec
+            self.digests[spec.resource] = digest(raw + routes.encode())
+        self._cases = {}
+        # Resources whose cases were expanded rather than loaded
+        self.expanded = set()
+
+    def endpoint(self, resource, name):
+        try:
+            return self.specs[resource].endpoints[name]
+        except KeyError:
+            raise SpecError(f"no spec for {resource} endpoint {name!r}") from None
+
+    def cases(self, resource, endpoint):
+        """The ``Case`` list of an endpoint, expanded on first use"""
+        key = (resource, endpoint)
+        if key not in self._cases:
+            spec_endpoint = self.endpoint(resource, endpoint)
+            self._cases[key] = expand(self.specs[resource], spec_endpoint, self.router)
+            self.expanded.add(resource)
+        return self._cases[key]
+
+    def values(self, resource, endpoint, name):
+        """One parameter's value in every case of an endpoint"""
+        return [case.values[name] for case in self.cases(resource, endpoint)]
+
+    def load(self, path):
+        """Take the cases of unchanged specs from the cache at ``path``"""
+        if not os.path.exists(path):
+            return
+        with open(path) as f:
+            data = json.load(f)
+        if data.get("version") != self.VERSION:
+            return
+        for resource, entry in data.get("specs", {}).items():
+            if entry.get("digest") != self.digests.get(resource):
+                continue
+            for endpoint, cases in entry["cases"].items():
+                self._cases[(resource, endpoint)] = [Case(*case) for case in cases]
+
+    def save(self, path):
+        """Expand every endpoint and write the cache, if anything changed"""
+        for resource, spec in self.specs.items():
+            for endpoint in spec.endpoints:
+                self.cases(resource, endpoint)
+        if not self.expanded:
+            return
+        specs = {
+            resource: {
+                "digest": self.digests[resource],
+                "cases": {
+                    endpoint: [list(case) for case in self.cases(resource, endpoint)]
+                    for endpoint in spec.endpoints
+                },
+            }
+            for resource, spec in self.specs.items()
+        }
+        # Written whole, so a reading pytest -n worker never sees half a file
+        temporary = f"{path}.tmp"
+        with open(temporary, "w") as f:
+            json.dump({"version": self.VERSION, "specs": specs}, f)
+        os.replace(temporary, path)
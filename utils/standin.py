@@ -0,0 +1,130 @@
+"""The mocked FakeStore API served over real HTTP.
+
+``StandInServer`` puts a ``MockRouter`` behind a local threaded HTTP server,
+so several processes (``pytest -n`` workers) can share one backend instead
+of each building its own in-process mock. Requests carrying a
+``X-FakeStore-Namespace`` header are served from that namespace's private
+fork of the ``FakeStore``, and ``DELETE /__standin__/namespaces/<name>``
+drops the fork again, so concurrent writers stay isolated.
+
+A fault profile injected into the router applies over HTTP as well: an
+injected reset aborts the connection and a slow body is streamed in chunks.
+"""
+
+import socket
+import struct
+import threading
+from contextlib import nullcontext
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from utils.faults import InjectedReset
+
+NAMESPACE_HEADER = "X-FakeStore-Namespace"
+NAMESPACES_PATH = "/__standin__/namespaces/"
+
+
+def namespace_url(base_url, name):
+    """URL that drops namespace ``name`` when sent a DELETE"""
+    return f"{base_url.rstrip('/')}{NAMESPACES_PATH}{name}"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes; do not wait for delayed ACKs
+    disable_nagle_algorithm = True
+
+    def _serve(self):
+        server = self.server
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else None
+        if self.command == "DELETE" and self.path.startswith(NAMESPACES_PATH):
+            name = self.path[len(NAMESPACES_PATH) :]
+            dropped = server.store is not None and server.store.drop_namespace(name)
+            self._reply(200 if dropped else 404, {}, "")
+            return
+        namespace = self.headers.get(NAMESPACE_HEADER)
+        scope = nullcontext()
+        if namespace and server.store is not None:
+            scope = server.store.namespace(namespace)
+        try:
+            with scope:
+                status, headers, payload = server.router.dispatch(
+                    self.command, f"{server.router.base_url}{self.path}", body
+                )
+        except InjectedReset:
+            self._reset()
+            return
+        self._reply(status, headers, payload)
+
+    def _reset(self):
+        # Close with SO_LINGER 0, so the client sees a RST rather than a FIN
+        self.connection.setsockopt(
+            socket.SOL_SOCKET, socket.SO_LINGER, struct.pack("ii", 1, 0)
+        )
+        self.close_connection = True
+
+    def _reply(self, status, headers, payload):
+        if hasattr(payload, "read"):
+            self._stream(status, headers, payload)
+            return
+        if isinstance(payload, str):
+            payload = payload.encode()
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _stream(self, status, headers, payload, size=64 * 1024):
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        while True:
+            chunk = payload.read(size)
+            if not chunk:
+                break
+            self.wfile.write(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+        self.wfile.write(b"0\r\n\r\n")
+
+    do_GET = do_POST = do_PUT = do_PATCH = do_DELETE = _serve
+
+    def log_message(self, *args):
+        pass
+
+
+class StandInServer:
+    """Serve ``router`` (and namespaces of ``store``) on a local port"""
+
+    def __init__(self, router, store=None, host="127.0.0.1", port=0):
+        self._server = ThreadingHTTPServer((host, port), _Handler)
+        self._server.daemon_threads = True
+        self._server.router = router
+        self._server.store = store
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name="fakestore-stand-in", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._thread is not None:
+            self._server.shutdown()
+            self._thread.join()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
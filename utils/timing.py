@@ -0,0 +1,178 @@
+"""Per-request timing instrumentation for the shared HTTP client.
+
+``InstrumentedAdapter`` is a drop-in ``HTTPAdapter`` that attaches a
+``RequestTiming`` to every response: DNS, TCP connect and TLS handshake time
+for newly opened connections (zero when a kept-alive connection is reused),
+time to first byte, total time, body size and, once the test calls
+``response.json()``, the JSON decode time. Timings are measured at the
+adapter so they are also recorded when ``responses`` serves the request.
+"""
+
+import socket
+import threading
+import time
+
+from requests import Response
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+_current = threading.local()
+
+
+class RequestTiming:
+    """Timings of one HTTP exchange, in seconds"""
+
+    __slots__ = (
+        "method",
+        "url",
+        "endpoint",
+        "status",
+        "bytes",
+        "dns",
+        "connect",
+        "tls",
+        "ttfb",
+        "total",
+        "decode",
+    )
+
+    def __init__(self, method, url):
+        self.method = method
+        self.url = url
+        self.endpoint = None
+        self.status = None
+        self.bytes = 0
+        self.dns = 0.0
+        self.connect = 0.0
+        self.tls = 0.0
+        self.ttfb = 0.0
+        self.total = 0.0
+        self.decode = 0.0
+
+    def as_dict(self):
+        """Return the record with durations converted to milliseconds"""
+        record = {}
+        for name in self.__slots__:
+            value = getattr(self, name)
+            if isinstance(value, float):
+                value = round(value * 1000, 3)
+            record[name] = value
+        return record
+
+
+class _TimedConnectionMixin:
+    """Record DNS, connect and TLS time into the in-flight ``RequestTiming``"""
+
+    def _new_conn(self):
+        timing = getattr(_current, "timing", None)
+        if timing is None:
+            return super()._new_conn()
+        host = self._dns_host
+        started = time.perf_counter()
+        try:
+            infos = socket.getaddrinfo(host, self.port, type=socket.SOCK_STREAM)
+        except OSError:
+            # Let urllib3 raise its own NameResolutionError
+            return super()._new_conn()
+        resolved = time.perf_counter()
+        timing.dns += resolved - started
+        # Connect to the address we just resolved instead of resolving again
+        self._dns_host = infos[0][4][0]
+        try:
+            sock = super()._new_conn()
+        finally:
+            self._dns_host = host
+        timing.connect += time.perf_counter() - resolved
+        return sock
+
+    def connect(self):
+        timing = getattr(_current, "timing", None)
+        if timing is None:
+            return super().connect()
+        before = timing.dns + timing.connect
+        started = time.perf_counter()
+        super().connect()
+        handshake = (
+            time.perf_counter() - started - (timing.dns + timing.connect - before)
+        )
+        if isinstance(self, HTTPSConnection):
+            timing.tls += max(handshake, 0.0)
+
+
+class TimedHTTPConnection(_TimedConnectionMixin, HTTPConnection):
+    pass
+
+
+class TimedHTTPSConnection(_TimedConnectionMixin, HTTPSConnection):
+    pass
+
+
+class TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = TimedHTTPConnection
+
+
+class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = TimedHTTPSConnection
+
+
+class TimedResponse(Response):
+    """``Response`` that adds its JSON decode time to ``timing.decode``"""
+
+    def json(self, **kwargs):
+        started = time.perf_counter()
+        try:
+            return super().json(**kwargs)
+        finally:
+            timing = getattr(self, "timing", None)
+            if timing is not None:
+                timing.decode += time.perf_counter() - started
+
+
+class InstrumentedAdapter(HTTPAdapter):
+    """``HTTPAdapter`` attaching a ``RequestTiming`` to every response
+
+    With a ``utils.ratelimit.RateLimiter`` every request sent over the network
+    holds one of its slots.
+    """
+
+    def __init__(self, *args, limiter=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.limiter = limiter
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": TimedHTTPConnectionPool,
+            "https": TimedHTTPSConnectionPool,
+        }
+
+    def build_response(self, req, resp):
+        response = super().build_response(req, resp)
+        response.__class__ = TimedResponse
+        return response
+
+    def send(self, request, stream=False, **kwargs):
+        if self.limiter is None:
+            return self._timed_send(request, stream, kwargs)
+        with self.limiter.slot(request.url) as record:
+            response = self._timed_send(request, stream, kwargs)
+            record(response)
+        return response
+
+    def _timed_send(self, request, stream, kwargs):
+        timing = RequestTiming(request.method, request.url)
+        _current.timing = timing
+        started = time.perf_counter()
+        try:
+            # Stream so that headers-received (TTFB) and body-read are separable
+            response = super().send(request, stream=True, **kwargs)
+        finally:
+            _current.timing = None
+        timing.ttfb = time.perf_counter() - started
+        if not stream:
+            timing.bytes = len(response.content)
+        timing.total = time.perf_counter() - started
+        timing.status = response.status_code
+        response.timing = timing
+        return response
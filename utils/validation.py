@@ -0,0 +1,171 @@
+"""Precompiled JSON-schema validators shared by the test modules.
+
+``jsonschema.validate`` re-checks the schema and builds a new validator on
+every call. Here each schema is checked and compiled once, and the validator
+is cached for the rest of the session. Schemas that only use ``type``,
+``properties``, ``required`` and ``items`` are additionally compiled into a
+plain Python predicate; ``validate_many`` runs that predicate over a whole
+list response in one pass and only failing items pay for jsonschema's
+detailed error collection. ``assert_stream_valid`` applies the same checks to
+items streamed from a response, stopping at the first bad one.
+"""
+
+from collections import namedtuple
+
+from jsonschema.validators import validator_for
+
+from utils.schemas import CART_SCHEMA, PRODUCT_SCHEMA, USER_SCHEMA
+
+ItemError = namedtuple("ItemError", ["index", "path", "message"])
+
+_VALIDATORS = {}
+_CHECKS = {}
+
+_SUPPORTED_KEYWORDS = {"type", "properties", "required", "items"}
+
+
+def _is_integer(value):
+    if isinstance(value, bool):
+        return False
+    return isinstance(value, int) or (isinstance(value, float) and value.is_integer())
+
+
+_TYPE_CHECKS = {
+    "object": lambda value: isinstance(value, dict),
+    "array": lambda value: isinstance(value, list),
+    "string": lambda value: isinstance(value, str),
+    "integer": _is_integer,
+    "number": lambda value: isinstance(value, (int, float))
+    and not isinstance(value, bool),
+    "boolean": lambda value: isinstance(value, bool),
+    "null": lambda value: value is None,
+}
+
+
+def _compile_check(schema):
+    """Compile a schema into a predicate, or return None if it is unsupported"""
+    if not isinstance(schema, dict) or not set(schema) <= _SUPPORTED_KEYWORDS:
+        return None
+    type_check = _TYPE_CHECKS.get(schema.get("type"), lambda value: True)
+    if "type" in schema and schema["type"] not in _TYPE_CHECKS:
+        return None
+    required = tuple(schema.get("required", ()))
+    properties = []
+    for name, subschema in schema.get("properties", {}).items():
+        check = _compile_check(subschema)
+        if check is None:
+            return None
+        properties.append((name, check))
+    items = None
+    if "items" in schema:
+        items = _compile_check(schema["items"])
+        if items is None:
+            return None
+
+    def check(value):
+        if not type_check(value):
+            return False
+        if isinstance(value, dict):
+            for name in required:
+                if name not in value:
+                    return False
+            for name, prop_check in properties:
+                if name in value and not prop_check(value[name]):
+                    return False
+        if items is not None and isinstance(value, list):
+            for item in value:
+                if not items(item):
+                    return False
+        return True
+
+    return check
+
+
+def get_validator(schema):
+    """Return the cached validator for ``schema``, compiling it on first use"""
+    cached = _VALIDATORS.get(id(schema))
+    if cached is not None and cached[0] is schema:
+        return cached[1]
+    cls = validator_for(schema)
+    cls.check_schema(schema)
+    validator = cls(schema)
+    # Keep a reference to the schema so its id() cannot be reused
+    _VALIDATORS[id(schema)] = (schema, validator)
+    return validator
+
+
+def get_check(schema):
+    """Return a fast ``is_valid`` predicate for ``schema``"""
+    cached = _CHECKS.get(id(schema))
+    if cached is not None and cached[0] is schema:
+        return cached[1]
+    validator = get_validator(schema)
+    check = _compile_check(schema) or validator.is_valid
+    _CHECKS[id(schema)] = (schema, check)
+    return check
+
+
+def validate(instance, schema):
+    """Raise ``ValidationError`` when ``instance`` does not match ``schema``"""
+    if not get_check(schema)(instance):
+        get_validator(schema).validate(instance)
+
+
+def validate_many(items, schema):
+    """Validate every item in one pass and return all errors as ``ItemError``"""
+    validator = get_validator(schema)
+    is_valid = get_check(schema)
+    errors = []
+    for index, item in enumerate(items):
+        if is_valid(item):
+            continue
+        for error in validator.iter_errors(item):
+            path = "/".join(str(part) for part in error.absolute_path)
+            errors.append(ItemError(index, path, error.message))
+    return errors
+
+
+def assert_all_valid(items, schema, max_reported=10):
+    """Fail with a readable summary when any item does not match ``schema``"""
+    errors = validate_many(items, schema)
+    if errors:
+        lines = [f"[{e.index}] {e.path or '<root>'}: {e.message}" for e in errors]
+        shown = "\n".join(lines[:max_reported])
+        more = len(errors) - max_reported
+        suffix = f"\n... and {more} more" if more > 0 else ""
+        raise AssertionError(f"{len(errors)} schema error(s):\n{shown}{suffix}")
+
+
+def assert_stream_valid(items, schema):
+    """Validate items as they arrive and fail on the first invalid one
+
+    Returns the number of items checked. Meant for ``iter_json_items`` so a
+    bad item is reported without waiting for the rest of the response.
+    """
+    validator = get_validator(schema)
+    is_valid = get_check(schema)
+    count = 0
+    for index, item in enumerate(items):
+        if not is_valid(item):
+            error = next(validator.iter_errors(item))
+            path = "/".join(str(part) for part in error.absolute_path)
+            raise AssertionError(
+                f"schema error in item [{index}] {path or '<root>'}: {error.message}"
+            )
+        count += 1
+    return count
+
+
+def validate_product_data(product):
+    """Validate product data against JSON schema"""
+    validate(product, PRODUCT_SCHEMA)
+
+
+def validate_cart_data(cart):
+    """Validate cart data against JSON schema"""
+    validate(cart, CART_SCHEMA)
+
+
+def validate_user_data(user):
+    """Validate user data against JSON schema"""
+    validate(user, USER_SCHEMA)